@@ -45,6 +45,8 @@ if 'bpy' in locals():
 import bpy
 from bpy.types import Panel
 from . import operators
+from . import blend
+from . import jobs
 from .properties import VIEW3D_PT_pos_panel_props
 
 # === Panel UI ===
@@ -94,13 +96,39 @@ class VIEW3D_PT_data_bake(ImportPanel, Panel):
         subrow.prop(props, "rng_filename")
         subrow.operator("atomblend.import_rngpath")
         col.operator("atomblend.load_posrng")
+        col.prop(props, "cache_budget")
+
+        # Background jobs
+        active = jobs.active()
+        if active:
+            col = layout.column(align=True)
+            for job in active:
+                col.label(text="%s: %s %d%%" % (job.name, job.message, 100*job.fraction))
+            col.operator("atomblend.job_cancel", icon='CANCEL')
 
         col = layout.column(align=True)
         col.label(text="Select file and plot type:")
         col.prop(props, "apdata_list", text="")
         col.prop(props, "plot_type", text="")
+        col.prop(props, "bake_mode", text="")
         col.operator("atomblend.bake_button")
 
+        col = layout.column(align=True)
+        subrow = col.row(align=True)
+        subrow.prop(props, "viewport_budget")
+        subrow.operator("atomblend.viewport_budget_apply")
+
+        col = layout.column(align=True)
+        col.label(text="Edit range of selected file:")
+        col.prop(props, "range_index")
+        subrow = col.row(align=True)
+        subrow.prop(props, "range_lower")
+        subrow.prop(props, "range_upper")
+        col.operator("atomblend.range_edit")
+
+        col = layout.column(align=True)
+        col.prop(props, "profile_trace")
+
         row = layout.row()
         row.operator("atomblend.clear_button")
 
@@ -148,6 +176,20 @@ class VIEW3D_PT_data_visualisation(VisualisationPanel, Panel):
             col.operator("atomblend.add_halomat")
             col.operator("atomblend.add_duplivert")
 
+        # === Species of single-mesh dataset ===
+        if is_species_mesh(obj):
+            col = layout.column(align=True)
+            col.label(text="Species:")
+            subrow = col.row(align=True)
+            subrow.prop(props, "plot_type", text="")
+            subrow.operator("atomblend.species_remap")
+            hidden = obj.aphidden.split("\n")
+            for name in obj.apspecies.split("\n"):
+                if not name:
+                    continue
+                icon = 'RESTRICT_VIEW_ON' if name in hidden else 'RESTRICT_VIEW_OFF'
+                col.operator("atomblend.species_toggle", text=name, icon=icon).species = name
+
         # === Boundbox ===
         row = layout.row()
         col = layout.column(align=True)
@@ -244,6 +286,7 @@ class VIEW3D_PT_data_analysis(AnalysisPanel, Panel):
         subrow = col.row(align=True)
         subrow.prop(props, "analysis_isosurf_rangefrom", text="Isorange")
         subrow.prop(props, "analysis_isosurf_rangeto", text="")
+        col.prop(props, "analysis_isosurf_species")
 
 # === Helper functions ===
 def has_halo(obj):
@@ -255,6 +298,11 @@ def has_duplivert(obj):
         return False
     return obj.children and (obj.dupli_type == 'VERTS')
 
+def is_species_mesh(obj):
+    if obj is None:
+        return False
+    return obj.datatype == 'DATA' and blend.object.has_vertex_layer_int(obj, "ap_range")
+
 def is_bound(obj):
     if obj is None:
         return False
@@ -268,12 +316,18 @@ def is_bound(obj):
 def register():
     bpy.utils.register_module(__name__)
     bpy.types.Scene.pos_panel_props = bpy.props.PointerProperty(type=VIEW3D_PT_pos_panel_props)
+    bpy.app.handlers.render_pre.append(operators.opexec.lod_render_pre)
+    bpy.app.handlers.render_post.append(operators.opexec.lod_render_post)
+    bpy.app.handlers.render_cancel.append(operators.opexec.lod_render_post)
 
     print("AtomBlend registered successfully!")
 
 def unregister():
     bpy.utils.unregister_module(__name__)
     del bpy.types.Scene.pos_panel_props
+    bpy.app.handlers.render_pre.remove(operators.opexec.lod_render_pre)
+    bpy.app.handlers.render_post.remove(operators.opexec.lod_render_post)
+    bpy.app.handlers.render_cancel.remove(operators.opexec.lod_render_post)
 
 if __name__ == "__main__":
     register()
@@ -1,2 +1,4 @@
 from . import voxelisation
 from . import isosurface
+from . import sampling
+from . import export
@@ -0,0 +1,213 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   analysis/export.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Mesh export (binary PLY, OBJ) of isosurfaces
+# =============================================================================
+
+import numpy as np
+
+# Number of vertices/faces encoded and written at once
+CHUNKSIZE = 2**20
+
+# Decimal places of OBJ coordinates and normals, and the bound on their
+# absolute values (so they fit 64-bit integer arithmetic)
+OBJ_DECIMALS = 6
+OBJ_MAX = 1e12
+
+def write_ply(path, verts, faces, normals=None, scalars=None, chunksize=CHUNKSIZE):
+    """
+    Write mesh to binary (little endian) PLY file
+
+    Input - 'path'    : Output file path
+          - 'verts'   : n x 3 vertex coordinates, eg. from isosurface.generate
+          - 'faces'   : m x 3 vertex indices of triangles
+          - 'normals' : n x 3 per-vertex normals (optional, see vertex_normals)
+          - 'scalars' : Dict of name -> n per-vertex values (optional), written
+          as float vertex properties in dict order
+
+    Records are packed into structured arrays and written one chunk at a
+    time, no per-element Python objects are created.
+    """
+    verts = np.asarray(verts)
+    faces = np.asarray(faces)
+    scalars = scalars or {}
+    _checkmesh(verts, faces, "write_ply")
+
+    fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+    if normals is not None:
+        normals = np.asarray(normals)
+        if normals.shape != verts.shape:
+            raise ValueError("export.write_ply: normals and vertices differ in shape.")
+        fields += [('nx', '<f4'), ('ny', '<f4'), ('nz', '<f4')]
+    for name, values in scalars.items():
+        if len(values) != len(verts):
+            raise ValueError("export.write_ply: scalar %s and vertices differ in length." % name)
+        fields.append((name, '<f4'))
+    vertdtype = np.dtype(fields)
+    facedtype = np.dtype([('n', 'u1'), ('v', '<i4', 3)])
+
+    header = ["ply",
+              "format binary_little_endian 1.0",
+              "comment AtomBlend isosurface",
+              "element vertex %d" % len(verts)]
+    header += ["property float %s" % name for name, dtype in fields]
+    header += ["element face %d" % len(faces),
+               "property list uchar int vertex_indices",
+               "end_header"]
+
+    with open(path, 'wb') as f:
+        f.write(("\n".join(header)+"\n").encode('ascii'))
+
+        for start in range(0, len(verts), chunksize):
+            stop = min(start+chunksize, len(verts))
+            block = np.empty(stop-start, dtype=vertdtype)
+            for axis, name in enumerate("xyz"):
+                block[name] = verts[start:stop, axis]
+                if normals is not None:
+                    block['n'+name] = normals[start:stop, axis]
+            for name, values in scalars.items():
+                block[name] = values[start:stop]
+            f.write(block.tobytes())
+
+        for start in range(0, len(faces), chunksize):
+            stop = min(start+chunksize, len(faces))
+            block = np.empty(stop-start, dtype=facedtype)
+            block['n'] = 3
+            block['v'] = faces[start:stop]
+            f.write(block.tobytes())
+
+def write_obj(path, verts, faces, normals=None, chunksize=CHUNKSIZE):
+    """
+    Write mesh to Wavefront OBJ file
+
+    Input - as in write_ply(). OBJ has no per-vertex scalar fields, use
+    write_ply() to export those
+
+    Lines are built a chunk at a time as fixed-width ASCII columns with
+    array arithmetic (see _text_rows), no per-element Python objects are
+    created. Coordinates are written with OBJ_DECIMALS decimals, values are
+    padded with spaces (OBJ separates values by any whitespace).
+    """
+    verts = np.asarray(verts)
+    faces = np.asarray(faces)
+    _checkmesh(verts, faces, "write_obj")
+    if normals is not None:
+        normals = np.asarray(normals)
+        if normals.shape != verts.shape:
+            raise ValueError("export.write_obj: normals and vertices differ in shape.")
+    for name, values in (("vertices", verts), ("normals", normals)):
+        if values is not None and len(values) and \
+                not (np.abs(values) < OBJ_MAX).all():
+            raise ValueError("export.write_obj: %s not finite or too large." % name)
+
+    with open(path, 'wb') as f:
+        f.write(b"# AtomBlend isosurface\n")
+        for start in range(0, len(verts), chunksize):
+            f.write(_text_rows(b"v", verts[start:start+chunksize], OBJ_DECIMALS))
+        if normals is not None:
+            for start in range(0, len(normals), chunksize):
+                f.write(_text_rows(b"vn", normals[start:start+chunksize], OBJ_DECIMALS))
+        # OBJ indices start at 1, "f v//vn" with normals
+        sep = b"//" if normals is not None else None
+        for start in range(0, len(faces), chunksize):
+            block = faces[start:start+chunksize].astype(np.int64) + 1
+            f.write(_text_rows(b"f", block, sep=sep))
+
+def vertex_normals(verts, faces):
+    """
+    Return n x 3 float32 unit vertex normals of mesh verts, faces: the
+    area-weighted sum of the normals of the triangles around each vertex
+    (0 for vertices in no triangle)
+    """
+    verts = np.asarray(verts, dtype=float)
+    faces = np.asarray(faces)
+    v0, v1, v2 = [verts[faces[:,n]] for n in range(3)]
+    facenormals = np.cross(v1 - v0, v2 - v0) # length = 2 * area
+
+    inds = faces.reshape(-1)
+    normals = np.empty(verts.shape)
+    for axis in range(3):
+        weights = np.repeat(facenormals[:,axis], 3)
+        normals[:,axis] = np.bincount(inds, weights=weights, minlength=len(verts))
+
+    length = np.sqrt((normals**2).sum(axis=1))
+    np.divide(normals, length[:,None], out=normals, where=(length[:,None] > 0))
+    return normals.astype(np.float32)
+
+def _text_rows(prefix, rows, decimals=0, sep=None):
+    # Helper function: rows (n x k array) as ASCII text lines, prefix then
+    # each value right-aligned in a fixed-width column, with decimals
+    # decimal places. With sep (integers only) each value is written twice,
+    # joined by sep, the second copy left-aligned ("  1//1  "). Digits are
+    # computed for all values at once
+    if decimals:
+        values = np.rint(np.asarray(rows, dtype=np.float64)*10**decimals).astype(np.int64)
+    else:
+        values = np.asarray(rows, dtype=np.int64)
+    n, k = values.shape
+    mags = np.abs(values).T # k x n, so each character column is contiguous
+    top = int(mags.max(initial=0))
+    if top < 2**31:
+        mags = mags.astype(np.int32) # Faster division
+    ndigits = max(len(str(top)), decimals+1)
+    point = 1 if decimals else 0
+    width = 1 + 1 + ndigits + point # separator, sign, digits, decimal point
+
+    # Characters of each value right to left: digits, decimal point. Number
+    # of digits shown: all significant ones, at least one before the point
+    cols = np.empty((width, k, n), dtype=np.uint8)
+    cols[0:2] = ord(' ')
+    digits = np.full((k, n), decimals+1, dtype=np.int8)
+    rest = mags
+    pos = width - 1
+    for d in range(ndigits):
+        if point and d == decimals:
+            cols[pos] = ord('.')
+            pos -= 1
+        rest, digit = np.divmod(rest, 10)
+        np.add(digit, ord('0'), out=cols[pos], casting='unsafe')
+        if d >= decimals:
+            digits += rest > 0
+        pos -= 1
+    length = digits + point
+
+    # Blank leading zeros, minus sign in front of negative values
+    cols[np.arange(width)[:,None,None] < (width - length)[None]] = ord(' ')
+    j, i = np.nonzero(values.T < 0)
+    cols[width - 1 - length[j, i], j, i] = ord('-')
+
+    if sep is not None:
+        # Left-aligned copy: values grouped by length (radix sort of the
+        # small lengths), each group's digits moved to the front at once
+        flat = cols.reshape(width, -1)
+        left = np.full((width, k*n), ord(' '), dtype=np.uint8)
+        order = np.argsort(length.reshape(-1), kind='stable')
+        bounds = np.searchsorted(length.reshape(-1)[order], np.arange(width+1))
+        for size in range(1, width):
+            group = order[bounds[size]:bounds[size+1]]
+            if len(group):
+                left[0:size, group] = flat[width-size:, group]
+        left = left.reshape(width, k, n)[0:width-1] # Sign at most, no separator
+        sep = np.frombuffer(sep, dtype=np.uint8)[:,None,None]
+        cols = np.concatenate((cols, np.broadcast_to(sep, (len(sep), k, n)), left), axis=0)
+
+    lines = np.empty((n, len(prefix) + k*cols.shape[0] + 1), dtype=np.uint8)
+    lines[:,0:len(prefix)] = np.frombuffer(prefix, dtype=np.uint8)
+    lines[:,len(prefix):-1] = cols.transpose(2, 1, 0).reshape(n, -1)
+    lines[:,-1] = ord('\n')
+    return lines.tobytes()
+
+def _checkmesh(verts, faces, funcname):
+    # Helper function: check verts are n x 3 and faces m x 3 in range
+    if verts.ndim != 2 or verts.shape[1] != 3:
+        raise ValueError("export.%s: Vertices not entered as columns X, Y, Z." % funcname)
+    if faces.ndim != 2 or faces.shape[1] != 3:
+        raise ValueError("export.%s: Faces must be triangles (m x 3 vertex indices)." % funcname)
+    if len(faces) and (faces.min() < 0 or faces.max() >= len(verts)):
+        raise ValueError("export.%s: Face vertex index out of range." % funcname)
@@ -13,6 +13,12 @@
 
 import numpy as np
 
+try:
+    from ..profiling import span
+except (ImportError, ValueError):
+    # Imported as top-level package (repo root on sys.path, eg. batch.py)
+    from profiling import span
+
 def generate(voxelarray, isorange):
     """
     Generate isosurface
@@ -23,933 +29,243 @@ def generate(voxelarray, isorange):
     Returns vertices, faces as 2D numpy array
     """
 
-    verts, faces = _get_lists(voxelarray, isorange)
+    with span("isosurface", voxels=voxelarray.size) as s:
+        verts, faces = _get_lists(voxelarray, isorange)
+        s.count(verts=len(verts), faces=len(faces))
 
     return verts, faces
 
 
 
+"""
+ISOSURFACES via the MARCHING CUBES ALGORITHM
+Original paper by W.E.Lorensen & H.E. Cline, 1987.
 
-def _get_frac(from_value, to_value, isorange):
-    if (to_value == from_value):
-        return 0 #either entire edge is mapped or unmapped - regardless, no mapped intercept
-    elif (to_value > from_value):
-        if from_value < isorange[0]: #if less than isomin
-            return ((isorange[0] - from_value)/(to_value - from_value))
-        if from_value >= isorange[0]: #if same as or greater than isomin
-            return ((isorange[1] - from_value)/(to_value - from_value))
-            #NOTE if both to and from values are IN the isorange, some number
-            #will be returned, but SHOULDN'T be be mapped at all. Test!
-    elif (to_value < from_value):
-        if from_value < isorange[0]: #if less than isomin
-            return ((isorange[0] - from_value)/(to_value - from_value))
-            #NOTE if both to and from values are OUT of the isorange, some number
-            #will be returned, but SHOULDN'T be be mapped at all. Test!
-        if from_value >= isorange[0]: #if same as or greater than isomin
-            return ((from_value - isorange[0])/(from_value - to_value))
-#Alternatively return something degenerate for stuff that is in and out.. ? Shouldn't matter,
-        #it's a bigger problem if it ends up being mapped.
-
-def _append_tris(face_list, index, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10, e11, e12):
-#Recursion for duplicated planes to conserve code
-    if (index == 1):
-        # front lower left corner
-        face_list.append([e1, e4, e9])
-    elif (index == 2):
-        # front lower right corner
-        face_list.append([e10, e2, e1])
-    elif (index == 3):
-        # front lower plane
-        face_list.append([e2, e4, e9])
-        face_list.append([e2, e9, e10])
-    elif (index == 4):
-        # front upper right corner
-        face_list.append([e12, e3, e2])
-    elif (index == 5):
-        # lower left, upper right corners
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 6):
-        # front right plane
-        face_list.append([e12, e3, e1])
-        face_list.append([e12, e1, e10])
-    elif (index == 7):
-        # Shelf including v1, v2, v3
-        face_list.append([e3, e4, e12])
-        face_list.append([e4, e9, e12])
-        face_list.append([e12, e9, e10])
-    elif (index == 8):
-        # front upper left corner
-        face_list.append([e3, e11, e4])
-    elif (index == 9):
-        # front left plane
-        face_list.append([e3, e11, e9])
-        face_list.append([e3, e9, e1])
-    elif (index == 10):
-        # upper left, lower right corners
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 11):
-        # Shelf including v4, v1, v2
-        face_list.append([e3, e11, e2])
-        face_list.append([e11, e10, e2])
-        face_list.append([e11, e9, e10])
-    elif (index == 12):
-        # front upper plane
-        face_list.append([e11, e4, e12])
-        face_list.append([e2, e4, e12])
-    elif (index == 13):
-        # Shelf including v1, v4, v3
-        face_list.append([e11, e9, e12])
-        face_list.append([e12, e9, e1])
-        face_list.append([e12, e1, e2])
-    elif (index == 14):
-        # Shelf including v2, v3, v4
-        face_list.append([e11, e10, e12])
-        face_list.append([e11, e4, e10])
-        face_list.append([e4, e1, e10])
-    elif (index == 15):
-        # Plane parallel to x-axis through middle
-        face_list.append([e11, e9, e12])
-        face_list.append([e12, e9, e10])
-    elif (index == 16):
-        # back lower left corner
-        face_list.append([e8, e9, e5])
-    elif (index == 17):
-        # lower left plane
-        face_list.append([e4, e1, e8])
-        face_list.append([e8, e1, e5])
-    elif (index == 18):
-        # lower left back, lower right front corners
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 19):
-        # Shelf including v1, v2, v5
-        face_list.append([e8, e4, e2])
-        face_list.append([e8, e2, e10])
-        face_list.append([e8, e10, e5])
-    elif (index == 20):
-        # lower left back, upper right front corners
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 21):
-        # lower left plane + upper right front corner, v1, v3, v5
-        _append_tris(face_list, 17, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 22):
-        # front right plane + lower left back corner, v2, v3, v5
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 6, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 23):
-        # Rotated case 14 in the paper
-        face_list.append([e3, e10, e8])
-        face_list.append([e3, e10, e12])
-        face_list.append([e8, e10, e5])
-        face_list.append([e3, e4, e8])
-    elif (index == 24):
-        # upper front left, lower back left corners
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 25):
-        # Shelf including v1, v4, v5
-        face_list.append([e1, e5, e3])
-        face_list.append([e3, e8, e11])
-        face_list.append([e3, e5, e8])
-    elif (index == 26):
-        # Three isolated corners
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 27):
-        # Full corner v1, index 9 in paper: (v1, v2, v4, v5)
-        face_list.append([e11, e3, e2])
-        face_list.append([e11, e2, e10])
-        face_list.append([e10, e11, e8])
-        face_list.append([e8, e5, e10])
-    elif (index == 28):
-        # upper front plane + corner v5
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 12, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 29):
-        # special case of 11 in the paper: (v1, v3, v4, v5)
-        face_list.append([e11, e5, e2])
-        face_list.append([e11, e12, e2])
-        face_list.append([e11, e5, e8])
-        face_list.append([e2, e1, e5])
-    elif (index == 30):
-        # Shelf (v2, v3, v4) and lower left back corner
-        _append_tris(face_list, 14, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 31):
-        # Shelf: (v6, v7, v8) by inversion
-        face_list.append([e11, e12, e10])
-        face_list.append([e11, e8, e10])
-        face_list.append([e8, e10, e5])
-    elif (index == 32):
-        # lower right back corner
-        face_list.append([e6, e5, e10])
-    elif (index == 33):
-        # lower right back, lower left front corners
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 34):
-        # lower right plane
-        face_list.append([e1, e2, e5])
-        face_list.append([e2, e6, e5])
-    elif (index == 35):
-        # Shelf: v1, v2, v6
-        face_list.append([e4, e2, e6])
-        face_list.append([e4, e9, e6])
-        face_list.append([e6, e9, e5])
-    elif (index == 36):
-        # upper right front, lower right back corners
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 37):
-        # lower left front, upper right front, lower right back corners
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 38):
-        # Shelf: v2, v3, v6
-        face_list.append([e3, e1, e5])
-        face_list.append([e3, e5, e12])
-        face_list.append([e12, e5, e6])
-    elif (index == 39):
-        # Full corner v2: (v1, v2, v3, v6)
-        face_list.append([e3, e4, e5])
-        face_list.append([e4, e9, e5])
-        face_list.append([e3, e5, e6])
-        face_list.append([e3, e12, e6])
-    elif (index == 40):
-        # upper left front, lower right back corners
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 41):
-        # front left plane, lower right back corner
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 9, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 42):
-        # lower right plane, upper front left corner
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 34, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 43):
-        # Rotated index 11 in paper
-        face_list.append([e11, e3, e9])
-        face_list.append([e3, e9, e6])
-        face_list.append([e3, e2, e6])
-        face_list.append([e9, e5, e6])
-    elif (index == 44):
-        # upper front plane, lower right back corner
-        _append_tris(face_list, 12, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 45):
-        # Shelf: (v1, v3, v4) + lower right back corner
-        _append_tris(face_list, 13, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 46):
-        # Rotated case 14 in paper
-        face_list.append([e4, e11, e12])
-        face_list.append([e4, e12, e5])
-        face_list.append([e12, e5, e6])
-        face_list.append([e4, e5, e1])
-    elif (index == 47):
-        # Shelf: (v5, v8, v7) by inversion
-        face_list.append([e11, e9, e12])
-        face_list.append([e12, e9, e5])
-        face_list.append([e12, e5, e6])
-    elif (index == 48):
-        # Back lower plane
-        face_list.append([e9, e10, e6])
-        face_list.append([e9, e6, e8])
-    elif (index == 49):
-        # Shelf: (v1, v5, v6)
-        face_list.append([e4, e8, e6])
-        face_list.append([e4, e6, e1])
-        face_list.append([e6, e1, e10])
-    elif (index == 50):
-        # Shelf: (v2, v5, v6)
-        face_list.append([e8, e6, e2])
-        face_list.append([e8, e2, e1])
-        face_list.append([e8, e9, e1])
-    elif (index == 51):
-        # Plane through middle of cube, parallel to x-z axis
-        face_list.append([e4, e8, e2])
-        face_list.append([e8, e2, e6])
-    elif (index == 52):
-        # Back lower plane, and front upper right corner
-        _append_tris(face_list, 48, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 53):
-        # Shelf (v1, v5, v6) and front upper right corner
-        _append_tris(face_list, 49, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 54):
-        # Rotated case 11 from paper (v2, v3, v5, v6)
-        face_list.append([e1, e9, e3])
-        face_list.append([e9, e3, e6])
-        face_list.append([e9, e8, e6])
-        face_list.append([e12, e3, e6])
-    elif (index == 55):
-        # Shelf: (v4, v8, v7) by inversion
-        face_list.append([e4, e8, e6])
-        face_list.append([e4, e6, e3])
-        face_list.append([e6, e3, e12])
-    elif (index == 56):
-        # Back lower plane + upper left front corner
-        _append_tris(face_list, 48, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 57):
-        # Rotated index 14 from paper (v4, v1, v5, v6)
-        face_list.append([e3, e11, e8])
-        face_list.append([e3, e8, e10])
-        face_list.append([e10, e6, e8])
-        face_list.append([e3, e1, e10])
-    elif (index == 58):
-        # Shelf: (v2, v6, v5) + upper left front corner
-        _append_tris(face_list, 50, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 59):
-        # Shelf: (v3, v7, v8) by inversion
-        face_list.append([e2, e6, e8])
-        face_list.append([e8, e2, e3])
-        face_list.append([e8, e3, e11])
-    elif (index == 60):
-        # AMBIGUOUS case: parallel planes (front upper, back lower)
-        _append_tris(face_list, 48, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 12, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 61):
-        # Upper back plane + lower right front corner by inversion
-        _append_tris(face_list, 63, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 62):
-        # Upper back plane + lower left front corner by inversion
-        _append_tris(face_list, 63, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 63):
-        # Upper back plane
-        face_list.append([e11, e12, e6])
-        face_list.append([e11, e8, e6])
-    elif (index == 64):
-        # Upper right back corner
-        face_list.append([e12, e7, e6])
-    elif (index == 65):
-        # upper right back, lower left front corners
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 66):
-        # upper right back, lower right front corners
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 67):
-        # lower front plane + upper right back corner
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 3, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 68):
-        # upper right plane
-        face_list.append([e3, e2, e6])
-        face_list.append([e3, e7, e6])
-    elif (index == 69):
-        # Upper right plane, lower left front corner
-        _append_tris(face_list, 68, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 70):
-        # Shelf: (v2, v3, v7)
-        face_list.append([e1, e3, e7])
-        face_list.append([e1, e10, e7])
-        face_list.append([e7, e10, e6])
-    elif (index == 71):
-        # Rotated version of case 11 in paper (v1, v2, v3, v7)
-        face_list.append([e10, e7, e4])
-        face_list.append([e4, e3, e7])
-        face_list.append([e10, e4, e9])
-        face_list.append([e7, e10, e6])
-    elif (index == 72):
-        # upper left front, upper right back corners
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 73):
-        # front left plane, upper right back corner
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 9, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 74):
-        # Three isolated corners, exactly case 7 in paper
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 75):
-        # Shelf: (v1, v2, v4) + upper right back corner
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 11, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 76):
-        # Shelf: (v4, v3, v7)
-        face_list.append([e4, e2, e6])
-        face_list.append([e4, e11, e7])
-        face_list.append([e4, e7, e6])
-    elif (index == 77):
-        # Rotated case 14 in paper (v1, v4, v3, v7)
-        face_list.append([e11, e9, e1])
-        face_list.append([e11, e1, e6])
-        face_list.append([e1, e6, e2])
-        face_list.append([e11, e6, e7])
-    elif (index == 78):
-        # Full corner v3: (v2, v3, v4, v7)
-        face_list.append([e1, e4, e7])
-        face_list.append([e1, e7, e6])
-        face_list.append([e4, e11, e7])
-        face_list.append([e1, e10, e6])
-    elif (index == 79):
-        # Shelf: (v6, v5, v8) by inversion
-        face_list.append([e9, e11, e10])
-        face_list.append([e11, e7, e10])
-        face_list.append([e7, e10, e6])
-    elif (index == 80):
-        # lower left back, upper right back corners (v5, v7)
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 81):
-        # lower left plane, upper right back corner
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 17, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 82):
-        # isolated corners (v2, v5, v7)
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 83):
-        # Shelf: (v1, v2, v5) + upper right back corner
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 19, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 84):
-        # upper right plane, lower left back corner
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 68, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 85):
-        # AMBIGUOUS index: upper right and lower left parallel planes
-        _append_tris(face_list, 17, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 68, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 86):
-        # Shelf: (v2, v3, v7) + lower left back corner
-        _append_tris(face_list, 70, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 87):
-        # Upper left plane + lower right back corner, by inversion
-        _append_tris(face_list, 119, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 88):
-        # Isolated corners v4, v5, v7
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 89):
-        # Shelf: (v1, v4, v5) + isolated corner v7
-        _append_tris(face_list, 25, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 90):
-        # Four isolated corners v2, v4, v5, v7
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 64, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 91):
-        # Three isolated corners, v3, v6, v8 by inversion
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 92):
-        # Shelf (v4, v3, v7) + isolated corner v5
-        _append_tris(face_list, 76, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 16, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 93):
-        # Lower right plane + isolated corner v8 by inversion
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 34, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 94):
-        # Isolated corners v1, v6, v8 by inversion
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 95):
-        # Isolated corners v6, v8 by inversion
-        _append_tris(face_list, 32, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 96):
-        # back right plane
-        face_list.append([e7, e12, e5])
-        face_list.append([e5, e10, e12])
-    elif (index == 97):
-        # back right plane + isolated corner v1
-        _append_tris(face_list, 96, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 98):
-        # Shelf: (v2, v6, v7)
-        face_list.append([e1, e7, e5])
-        face_list.append([e7, e1, e12])
-        face_list.append([e1, e12, e2])
-    elif (index == 99):
-        # Rotated index 14 in paper: (v1, v2, v6, v7)
-        face_list.append([e9, e2, e7])
-        face_list.append([e9, e2, e4])
-        face_list.append([e2, e7, e12])
-        face_list.append([e7, e9, e5])
-    elif (index == 100):
-        # Shelf: (v3, v6, v7)
-        face_list.append([e3, e7, e5])
-        face_list.append([e3, e5, e2])
-        face_list.append([e2, e5, e10])
-    elif (index == 101):
-        # Shelf: (v3, v6, v7) + isolated corner v1
-        _append_tris(face_list, 100, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 102):
-        # Plane bisecting left-right halves of cube
-        face_list.append([e1, e3, e7])
-        face_list.append([e1, e7, e5])
-    elif (index == 103):
-        # Shelf: (v4, v5, v8) by inversion
-        face_list.append([e3, e7, e5])
-        face_list.append([e3, e5, e4])
-        face_list.append([e4, e5, e9])
-    elif (index == 104):
-        # Back right plane + isolated corner v4
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 96, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 105):
-        # AMBIGUOUS case: back right and front left planes
-        _append_tris(face_list, 96, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 9, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 106):
-        # Shelf: (v2, v6, v7) + isolated corner v4
-        _append_tris(face_list, 98, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 107):
-        # Back left plane + isolated corner v3 by inversion
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 111, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 108):
-        # Rotated case 11 from paper: (v4, v3, v7, v6)
-        face_list.append([e4, e10, e7])
-        face_list.append([e4, e10, e2])
-        face_list.append([e4, e11, e7])
-        face_list.append([e7, e10, e5])
-    elif (index == 109):
-        # Back left plane + isolated corner v2 by inversion
-        _append_tris(face_list, 111, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 110):
-        # Shelf: (v1, v5, v8) by inversion
-        face_list.append([e1, e5, e7])
-        face_list.append([e1, e7, e11])
-        face_list.append([e1, e11, e4])
-    elif (index == 111):
-        # Back left plane
-        face_list.append([e11, e9, e7])
-        face_list.append([e9, e7, e5])
-    elif (index == 112):
-        # Shelf: (v5, v6, v7)
-        face_list.append([e9, e10, e12])
-        face_list.append([e9, e12, e7])
-        face_list.append([e9, e7, e8])
-    elif (index == 113):
-        # Exactly case 11 from paper: (v1, v5, v6, v7)
-        face_list.append([e1, e8, e12])
-        face_list.append([e1, e8, e4])
-        face_list.append([e8, e7, e12])
-        face_list.append([e12, e1, e10])
-    elif (index == 114):
-        # Full corner v6: (v2, v6, v7, v5)
-        face_list.append([e1, e9, e7])
-        face_list.append([e1, e7, e12])
-        face_list.append([e1, e12, e2])
-        face_list.append([e9, e8, e7])
-    elif (index == 115):
-        # Shelf: (v3, v4, v8)
-        face_list.append([e2, e4, e8])
-        face_list.append([e2, e12, e7])
-        face_list.append([e2, e8, e7])
-    elif (index == 116):
-        # Rotated case 14 in paper: (v5, v6, v7, v3)
-        face_list.append([e9, e2, e7])
-        face_list.append([e9, e2, e10])
-        face_list.append([e9, e8, e7])
-        face_list.append([e2, e3, e7])
-    elif (index == 117):
-        # upper left plane + isolated corner v2 by inversion
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 119, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 118):
-        # Shelf: (v1, v4, v8)
-        face_list.append([e1, e3, e7])
-        face_list.append([e7, e1, e8])
-        face_list.append([e1, e8, e9])
-    elif (index == 119):
-        # Upper left plane
-        face_list.append([e4, e3, e7])
-        face_list.append([e4, e8, e7])
-    elif (index == 120):
-        # Shelf: (v5, v6, v7) + isolated corner v4
-        _append_tris(face_list, 112, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 8, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 121):
-        # Front right plane + isolated corner v8
-        _append_tris(face_list, 6, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 122):
-        # Isolated corners v1, v3, v8
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 123):
-        # Isolated corners v3, v8
-        _append_tris(face_list, 4, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 124):
-        # Front lower plane + isolated corner v8
-        _append_tris(face_list, 3, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 125):
-        # Isolated corners v2, v8
-        _append_tris(face_list, 2, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 126):
-        # Isolated corners v1, v8
-        _append_tris(face_list, 1, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 127, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 127):
-        # Isolated corner v8
-        face_list.append([e11, e7, e8])
-    elif (index == 150):
-        # AMBIGUOUS case: back right and front left planes
-        # In these index > 127 indexs, the vertices are identical BUT
-        # they are connected in the opposite fashion.
-        _append_tris(face_list, 6, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 111, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 170):
-        # AMBIGUOUS case: upper left and lower right planes
-        # In these index > 127 indexs, the vertices are identical BUT
-        # they are connected in the opposite fashion.
-        _append_tris(face_list, 119, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 34, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-    elif (index == 195):
-        # AMBIGUOUS case: back upper and front lower planes
-        # In these index > 127 indexs, the vertices are identical BUT
-        # they are connected in the opposite fashion.
-        _append_tris(face_list, 63, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-        _append_tris(face_list, 3, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10,
-                     e11, e12)
-
-    return
+Our marching cube of 2x2x2 voxels:
 
-def _marching_cubes(voxelvolume, isorange):
-    #Checks
-    if voxelvolume.ndim != 3:
-        raise ValueError("A 3D matrix required as input.")
-    if voxelvolume.shape[0] < 2 or voxelvolume.shape[1] < 2 or voxelvolume.shape[2] < 2:
-        raise ValueError("The 3D matrix must contain 2 or more voxels.")
-    if isorange[0] < voxelvolume.min() or isorange[1] > voxelvolume.max()+1:
-        raise ValueError("Isovalue range is outside values of the data set.")
-
-    """
-    ISOSURFACES via the MARCHING CUBES ALGORITHM
-    Original paper by W.E.Lorensen & H.E. Cline, 1987.
 
-    Our marching cube of 2x2x2 voxels:
+           v8 ------ v7
+          / |       / |        z
+         /  |      /  |        ^  y
+       v4 ------ v3   |        | /
+        |  v5 ----|- v6        |/          (note: right handed)
+        |  /      |  /          ----> x
+        | /       | /
+        v1 ------ v2
 
 
-               v8 ------ v7
-              / |       / |        z
-             /  |      /  |        ^  y
-           v4 ------ v3   |        | /
-            |  v5 ----|- v6        |/          (note: right handed)
-            |  /      |  /          ----> x
-            | /       | /
-            v1 ------ v2
+CONVENTIONS:
+Voxel values are in voxelvolume[y,z,x] as a result of Python's ordering in
+"Voxelisation.py" (voxelvalue = voxelvolume[j,k,i]). Output vertices are in
+xyz voxel index units: the voxel value stored in [j,k,i] sits at (i,j,k).
 
+A cube vertex is "in" when isorange[0] <= value < isorange[1]. Cube index bit
+n is set when vertex v(n+1) is in, giving 2^8=256 cases. The triangles of
+every case are looked up in _TRIS, which is generated once on import from
+the cube faces (see _build_tables) rather than written out by hand.
+"""
 
-    CONVENTIONS:
-    To differentiate from voxel index ijk, marching cube coordinates are in xyz,
-    s.t. currentcoord = [x,y,z].
-    x,y,z=0,0,0 refers to the voxelvalue stored in 0i,0j,0k and xyz:ijk.
+# Cube vertex offsets (dx, dy, dz) of v1..v8
+_CORNERS = np.array([[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1],
+                     [0, 1, 0], [1, 1, 0], [1, 1, 1], [0, 1, 1]])
 
-    Right-handed convention used throughout code -
-    In "Voxelisation.py", voxelvalue = voxelvolume[j,k,i] as a result of Python's ordering,
-    so the voxelvalue is called here in 'voxelvolume[y,z,x]'.
+# Cube edges e1..e12 as (from, to) vertex indices, from is the lower corner
+_EDGES = np.array([[0, 1], [1, 2], [3, 2], [0, 3],
+                   [4, 5], [5, 6], [7, 6], [4, 7],
+                   [0, 4], [1, 5], [3, 7], [2, 6]])
 
+def _build_tables():
     """
+    Generate the 256-case triangle table.
+
+    For every cube face the in-vertices are cut off from the out-vertices by
+    segments between the crossed edges. On ambiguous faces (two diagonally
+    opposite in-vertices) the in-vertices are always kept apart. The decision
+    only depends on the face itself, so neighbouring cubes agree and the
+    surface is closed. Segments are chained into loops around the cube and
+    each loop is fanned into triangles, oriented with normals pointing away
+    from the in-region.
+
+    Returns (tris, ntris): tris is 256 x maxtris x 3 edge indices (-1 padded),
+    ntris the number of triangles per case.
+    """
+    edgeind = {frozenset(e): n for n, e in enumerate(_EDGES.tolist())}
+
+    # Cube faces as vertex loops, counter-clockwise seen from outside
+    faces = []
+    for axis in range(3):
+        for side in (0, 1):
+            verts = [v for v in range(8) if _CORNERS[v, axis] == side]
+            normal = np.zeros(3)
+            normal[axis] = 1 if side else -1
+            centre = _CORNERS[verts].mean(axis=0)
+            u = _CORNERS[verts[0]] - centre
+            w = np.cross(normal, u)
+            angle = [np.arctan2(np.dot(_CORNERS[v]-centre, w), np.dot(_CORNERS[v]-centre, u))
+                     for v in verts]
+            faces.append([verts[n] for n in np.argsort(angle)])
+
+    cases = []
+    for index in range(256):
+        isin = [bool(index >> v & 1) for v in range(8)]
+
+        # Segments on each face: exit edge -> entry edge around each run of
+        # in-vertices (walking the face counter-clockwise)
+        segments = {}
+        for face in faces:
+            for n in range(4):
+                prev, cur = face[n-1], face[n]
+                if isin[cur] and not isin[prev]:
+                    entry = edgeind[frozenset((prev, cur))]
+                    m = n
+                    while isin[face[m % 4]]:
+                        m += 1
+                    exit = edgeind[frozenset((face[(m-1) % 4], face[m % 4]))]
+                    segments[exit] = entry
+
+        # Chain segments into loops and fan triangulate
+        tris = []
+        while segments:
+            start, nxt = segments.popitem()
+            loop = [start]
+            while nxt != start:
+                loop.append(nxt)
+                nxt = segments.pop(nxt)
+            for n in range(1, len(loop)-1):
+                tris.append([loop[0], loop[n+1], loop[n]])
+        cases.append(tris)
+
+    ntris = np.array([len(c) for c in cases])
+    table = np.full((256, ntris.max(), 3), -1, dtype=np.intp)
+    for index, tris in enumerate(cases):
+        if tris:
+            table[index, 0:len(tris)] = tris
+    return table, ntris
+
+_TRIS, _NTRIS = _build_tables()
 
-    #Place the first marching cube so v1 is at the bottom left of Voxel Volume [0, 0, 0]
-    currentcoord = np.array([0, 0, 0]) #x, y, z
-
-    #Calculate no of iterations needed
-    no_marches = (voxelvolume.shape[0] -1)*(voxelvolume.shape[1] -1)*(voxelvolume.shape[2] -1)
-
-    #Declaring variables before march
-    plus_z = False
-    e5, e6, e7, e8 = [0,0,0], [0,0,0], [0,0,0], [0,0,0]
-    face_list = []
-
-    for n in range(no_marches): #begin march, starting at zero
-
-        #Set local coordinates
-        x0, y0, z0 = currentcoord[0], currentcoord[1], currentcoord[2]
-        x1, y1, z1 = x0+1, y0+1, z0+1
-
-        r0, c0, d0, r1, c1, d1 = x0, y0, z0, x1, y1, z1
-
-
-        #Stores the Voxel Volume's value # at v1, v2, v3, v4, v5, v6, v7 & v8
-        v_coord = np.array([voxelvolume[y0,z0,x0], voxelvolume[y0,z0,x1], voxelvolume[y0,z1,x1], voxelvolume[y0,z1,x0], voxelvolume[y1,z0,x0], voxelvolume[y1,z0,x1],voxelvolume[y1,z1,x1],voxelvolume[y1,z1,x0]])
-
-        #Calculate cube index
-        index=0
-        for i in np.arange(8):
-            if isorange[0] <= v_coord[i] < isorange[1]:
-                index = index + (2**i)
-
-        """
-        There are 2^8=256 unique vertex selection combinations.
-        The first state (0) occurs when none of the vertices are within the isorange.
-        The last state (255) occurs when all the vertices are within the isorange.
-
-        By considering complementary cases, the number of states can be halved to 128 -
-        vertices left out become vertices included.
-        Furthermore, by considering rotational symmetry, the number of states is reduced to 15.
-        """
-
-        if index!=0 and index !=255: #if a plane intersects the cube
-
-            if index > 127:
-                if index != 150 and index != 170 and index != 195:
-                    index = 255 - index #reverse the cube
-
-            if plus_z: #if edge intercept coord has already been calculated, reassign
-                e1=e5
-                e2=e6
-                e3=e7
-                e4=e8
-            else: #calculate edge intercept coord
-                e1=r0 + _get_frac(v_coord[0], v_coord[1], isorange), c0, d0
-                e2=r1, c0 + _get_frac(v_coord[1], v_coord[2], isorange), d0
-                e3=r0 + _get_frac(v_coord[3], v_coord[2], isorange), c1, d0
-                e4=r0, c0 + _get_frac(v_coord[0], v_coord[3], isorange), d0
-            e5= r0 + _get_frac(v_coord[4], v_coord[5], isorange), c0, d1
-            e6= r1, c0 + _get_frac(v_coord[5], v_coord[6], isorange), d1
-            e7= r0 + _get_frac(v_coord[7], v_coord[6], isorange), c1, d1
-            e8= r0, c0 + _get_frac(v_coord[4], v_coord[7], isorange), d1
-            e9= r0, c0, d0 + _get_frac(v_coord[0], v_coord[4], isorange)
-            e10= r1, c0, d0 + _get_frac(v_coord[1], v_coord[5], isorange)
-            e11= r0, c1, d0 + _get_frac(v_coord[3], v_coord[7], isorange)
-            e12= r1, c1, d0 + _get_frac(v_coord[2], v_coord[6], isorange)
-
-            _append_tris(face_list, index, e1, e2, e3, e4, e5, e6, e7, e8, e9, e10, e11, e12)
-
-        #Advance to the next cube
-
-        if currentcoord[2] < voxelvolume.shape[1] -2: #if z is within Voxel Volume's z-dimension
-            currentcoord[2] += 1 #advance z (x y z+1)
-            plus_z = True #reassign top face to the next bottom face
-            #"001, 002, 003, ..."
-
-        elif currentcoord[1] < voxelvolume.shape[0] -2: # then when z hits max, move to (x y+1 0)
-            currentcoord[1] += 1
-            currentcoord[2] =0
-            plus_z = False
-            #"010, 011, 012, 013...; 020, ..."
-
-        else:
-            currentcoord[0] += 1 #when both z and y hit max, move to (x+1 0 0) and repeat z and y iterations.
-            currentcoord[1] = 0
-            currentcoord[2] = 0
-            plus_z = False
-            #"100, 101, 102, 103...; 111, 112, 113..., 121, ...; 200, ..."
+def _marching_cubes(voxelvolume, isorange):
+    """
+    Return the isosurface triangles as tris x 3 array of grid edge IDs. All
+    cubes are classified at once and the triangles of each cube the surface
+    passes through are looked up in _TRIS.
 
+    Grid edge ID = 3 * flat index of the edge's lower voxel [y,z,x] + axis
+    (0: x, 1: y, 2: z), so every edge shared by neighbouring cubes has a
+    single ID.
+    """
+    #Checks
+    if voxelvolume.ndim != 3:
+        raise ValueError("A 3D matrix required as input.")
+    if voxelvolume.shape[0] < 2 or voxelvolume.shape[1] < 2 or voxelvolume.shape[2] < 2:
+        raise ValueError("The 3D matrix must contain 2 or more voxels.")
+    if isorange[0] < voxelvolume.min() or isorange[1] > voxelvolume.max()+1:
+        raise ValueError("Isovalue range is outside values of the data set.")
 
-    return face_list
+    lo, hi = isorange
+    isin = (voxelvolume >= lo) & (voxelvolume < hi)
+    Ny, Nz, Nx = voxelvolume.shape
+
+    # Cube index of every cube, indexed by its v1 voxel [y,z,x]
+    index = np.zeros((Ny-1, Nz-1, Nx-1), dtype=np.uint8)
+    for v, (dx, dy, dz) in enumerate(_CORNERS):
+        index |= isin[dy:Ny-1+dy, dz:Nz-1+dz, dx:Nx-1+dx].astype(np.uint8) << v
+
+    # Triangles of all cubes the surface passes through
+    ntris = _NTRIS[index]
+    y0, z0, x0 = np.nonzero(ntris)
+    cubeindex = index[y0, z0, x0]
+    counts = ntris[y0, z0, x0]
+    tri = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cube = np.repeat(np.arange(len(cubeindex)), counts)
+    edges = _TRIS[cubeindex[cube], tri] # tris x 3 cube edge indices
+
+    # Cube edge -> grid edge ID relative to the cube's v1 voxel
+    v1 = np.ravel_multi_index((y0, z0, x0), voxelvolume.shape)
+    return 3*v1[cube][:,None] + _edgeoffsets(voxelvolume.shape)[edges]
+
+def _edgeoffsets(shape):
+    # Helper function: grid edge ID offset of each cube edge from the ID of
+    # the cube's v1 voxel (times 3) for a volume of given shape
+    Ny, Nz, Nx = shape
+    lower = _CORNERS[_EDGES[:,0]]
+    axis = np.argmax(_CORNERS[_EDGES[:,1]] - lower, axis=1)
+    voxel = (lower[:,1]*Nz + lower[:,2])*Nx + lower[:,0]
+    return 3*voxel + axis
+
+def _edgeverts(edgeids, voxelvolume, isorange):
+    """
+    Interpolate the isorange crossing on each grid edge in edgeids.
 
-def _uniqueverts(tri_list):
-    vert_index = {}
-    vert_list = []
-    face_list = []
-    no_tris = len(tri_list)
-    idx=0
+    Returns (verts, nodes): verts is n x 3 xyz coordinates, nodes the flat
+    voxel index where a crossing falls exactly on a voxel (-1 elsewhere).
+    """
+    lo, hi = isorange
+    shape = voxelvolume.shape
+    axis = edgeids % 3
+    p = np.stack(np.unravel_index(edgeids//3, shape), axis=-1) # [y,z,x]
+    q = p.copy()
+    q[np.arange(len(q)), np.array([2, 0, 1])[axis]] += 1 # xyz axis -> [y,z,x]
+
+    vp = voxelvolume[p[:,0], p[:,1], p[:,2]].astype(float)
+    vq = voxelvolume[q[:,0], q[:,1], q[:,2]].astype(float)
+
+    # The crossed bound is the one the out-vertex lies beyond
+    pin = (vp >= lo) & (vp < hi)
+    vout = np.where(pin, vq, vp)
+    level = np.where(vout < lo, lo, hi)
+    frac = (level - vp)/(vq - vp)
+
+    nodes = np.full(len(edgeids), -1, dtype=edgeids.dtype)
+    nodes[frac == 0] = (edgeids//3)[frac == 0]
+    nodes[frac == 1] = np.ravel_multi_index(tuple(q[frac == 1].T), shape)
+
+    verts = (p + frac[:,None]*(q - p))[:,(2, 0, 1)] # [y,z,x] -> xyz
+    return verts, nodes
+
+def _uniqueverts(tri_list, voxelvolume, isorange):
+    """
+    Weld triangles tri_list (tris x 3 grid edge IDs) into a mesh and return
+    (verts, faces) as float32 n x 3 and int32 m x 3 arrays.
 
-    for i in range(no_tris): #Iterate
-        templist =[]
+    Each vertex is keyed by the integer ID of the grid edge it lies on, or
+    by its voxel if it falls exactly on one, so welding is an integer
+    unique and is not affected by floating point noise. Triangles collapsed
+    by vertices on the same voxel are dropped.
+    """
+    edgeids, inverse = np.unique(tri_list, return_inverse=True)
+    edgeverts, nodes = _edgeverts(edgeids, voxelvolume, isorange)
 
-        #Parse vertices from non-degenerate triangles only
-        if not ((tri_list[i][0] == tri_list[i][1]) or (tri_list[i][0] == tri_list[i][2]) or (tri_list[i][1] == tri_list[i][2])):
-            for j in range(3): #For each vertex within a triangle
-                vert = tri_list[i][j]
+    # Vertex keys: 4*edge voxel + axis on edges, 4*voxel + 3 on voxels
+    keys = np.where(nodes >= 0, 4*nodes + 3, 4*(edgeids//3) + edgeids%3)
+    keys, first, vertinds = np.unique(keys, return_index=True, return_inverse=True)
+    faces = vertinds[inverse.reshape(-1)].reshape(-1, 3)
 
-                if vert not in vert_index: #check if a unique vertex is found
-                    vert_index[vert] = idx
-                    templist.append(idx)
-                    vert_list.append(vert)
-                    idx +=1
-                else:
-                    templist.append(vert_index[vert])
+    # Parse vertices from non-degenerate triangles only
+    keep = ((faces[:,0] != faces[:,1]) & (faces[:,0] != faces[:,2]) &
+            (faces[:,1] != faces[:,2]))
+    faces = faces[keep]
+    used = np.zeros(len(keys), dtype=bool)
+    used[faces.reshape(-1)] = True
+    remap = np.cumsum(used) - 1
 
-            face_list.append(templist)
-
-
-    return vert_list, face_list
+    verts = edgeverts[first[used]].astype(np.float32)
+    return verts, remap[faces].astype(np.int32)
 
 
 def _get_lists(voxelvolume, isorange):
     """
-    Return list of length-3 lists. Each sublist contains three tuples:
-    (x,y,z) coords for all triangle vertices, including repeats.
+    Return vertices (n x 3) and faces (m x 3) of the isosurface.
     """
-    raw_faces = _marching_cubes(voxelvolume, isorange)
+    with span("marching cubes") as s:
+        raw_faces = _marching_cubes(voxelvolume, isorange)
+        s.count(triangles=len(raw_faces))
     """
     Finds and collects unique vertices, storing as indices.
     Returns a true mesh with no degenerate faces.
     """
-    verts, faces = _uniqueverts(raw_faces)
-
-    return np.asarray(verts), np.asarray(faces)
-
+    with span("welding") as s:
+        verts, faces = _uniqueverts(raw_faces, voxelvolume, isorange)
+        s.count(verts=len(verts), faces=len(faces))
 
+    return verts, faces
@@ -0,0 +1,103 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   analysis/sampling.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Point subsampling for viewport level of detail
+# =============================================================================
+
+import numpy as np
+
+from . import voxelisation
+
+# Average number of subsample points per voxel of stratified()
+STRATUM = 8
+
+def shares(counts, budget):
+    """
+    Split a point budget over several pointclouds in proportion to their
+    sizes.
+
+    Input - 'counts': Number of points in each pointcloud
+          - 'budget': Total number of points to keep
+
+    Output - 'shares': int64 array, number of points to keep of each
+    pointcloud. Sums to min(budget, sum(counts)), no share exceeds its count
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    total = counts.sum()
+    if total <= budget:
+        return counts.copy()
+
+    # Floor of the exact shares, the points left over go to the largest
+    # remainders
+    exact = counts*(budget/total)
+    share = np.floor(exact).astype(np.int64)
+    left = int(budget - share.sum())
+    order = np.argsort(share - exact, kind='mergesort')
+    share[order[0:left]] += 1
+    return share
+
+def stratified(coords, size, bin=None, seed=0):
+    """
+    Return sorted indices of a spatially stratified subsample of size
+    points of the pointcloud coords.
+
+    Points are binned into voxels (see analysis.voxelisation) and ordered
+    voxel by voxel, then indices() samples that order. Every voxel of c
+    points so keeps c*size/len(coords) points to within two points: dense
+    and sparse regions keep their relative density and no region of the
+    volume is left out. The same seed gives the same subsample.
+
+    Input - 'coords': The pointcloud as [x1 y1 z1; x2 y2 z2; ...]
+          - 'size'  : Number of points to keep
+          - 'bin'   : Voxel size in nanometres (default: about STRATUM
+          subsample points per voxel of the bounding box)
+    """
+    n = len(coords)
+    if size >= n or size <= 0:
+        return indices(n, size, seed)
+
+    origin = np.nanmin(coords, axis=0)
+    extent = np.nanmax(coords, axis=0) - origin
+    if bin is None:
+        # Over the axes the points extend along (flat or linear data too)
+        axes = extent[extent > 0]
+        bin = (float(np.prod(axes))*STRATUM/size)**(1/len(axes)) if len(axes) else 1
+    origin, shape = voxelisation.grid(coords, bin, origin, extent)
+
+    # Voxel of each point, points outside the grid (NaN) in a stratum of
+    # their own. Stable sort keeps acquisition order within each voxel
+    ids, inside = voxelisation._voxelids(coords, origin, bin, shape, valid=True)
+    strata = np.full(n, np.prod(shape), dtype=np.intp)
+    strata[inside] = ids
+    order = np.argsort(strata, kind='stable')
+
+    inds = order[indices(n, size, seed)]
+    inds.sort()
+    return inds
+
+def indices(n, size, seed=0):
+    """
+    Return sorted indices of a subsample of size points out of n.
+
+    The index range is cut into size equal strides and one point is drawn
+    at random from each (jittered stride sampling). Over points in
+    acquisition order the subsample covers the whole analysis depth evenly
+    but is not spatially stratified within a depth slice, see stratified().
+    Unlike a random choice it needs no permutation of all n indices. The
+    same seed gives the same subsample.
+    """
+    if size >= n:
+        return np.arange(n)
+    if size <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    stride = np.arange(size+1, dtype=np.int64)*n//size
+    jitter = np.random.RandomState(seed).random_sample(size)
+    inds = stride[:-1] + (jitter*(stride[1:] - stride[:-1])).astype(np.int64)
+    return inds.astype(np.intp)
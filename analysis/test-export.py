@@ -0,0 +1,112 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis import export
+
+def savetxt(prefix, rows, fmt):
+    # Reference: lines as written by np.savetxt, whitespace separated tokens
+    out = io.StringIO()
+    np.savetxt(out, rows, fmt=prefix+" "+" ".join([fmt]*rows.shape[1]))
+    return [line.split() for line in out.getvalue().splitlines()]
+
+def tokens(text, prefix):
+    # Whitespace separated tokens of the lines of text starting with prefix
+    return [line.split() for line in text.splitlines() if line.split()[0] == prefix]
+
+def unsigned_zero(rows):
+    # '%.6f' keeps the sign of values rounded to zero, OBJ output does not
+    return [[("0"+tok[2:] if tok.startswith("-0") and float(tok) == 0 else tok)
+             for tok in row] for row in rows]
+
+rs = np.random.RandomState(4)
+verts = np.concatenate((rs.uniform(-50, 50, (3000, 3)),
+                        rs.uniform(-1, 1, (3000, 3))*10.0**rs.randint(-7, 6, (3000, 1)),
+                        [[0, -0.5, 12.25], [1e-7, -4e-7, 999999.5], [-123456.75, 0.0000005, 1]]))
+verts = verts.astype(np.float32)
+faces = rs.randint(0, len(verts), (5000, 3))
+faces[0] = [0, 9, len(verts)-1]
+normals = export.vertex_normals(verts, faces)
+
+tmp = tempfile.mkdtemp()
+
+# === OBJ ===
+path = os.path.join(tmp, "mesh.obj")
+export.write_obj(path, verts, faces, normals=normals, chunksize=1000)
+with open(path) as f:
+    text = f.read()
+assert text.startswith("# AtomBlend isosurface\n")
+assert tokens(text, "v")  == unsigned_zero(savetxt("v", verts.astype(np.float64), "%.6f"))
+assert tokens(text, "vn") == unsigned_zero(savetxt("vn", normals.astype(np.float64), "%.6f"))
+ref = savetxt("f", np.repeat(faces+1, 2, axis=1), "%d")
+assert tokens(text, "f") == [[row[0]] + ["%s//%s" % tuple(row[n:n+2]) for n in (1, 3, 5)]
+                             for row in ref]
+print("OBJ matches np.savetxt %.6f/%d:", len(verts), "vertices,", len(faces), "faces")
+
+# Without normals, faces are plain indices
+export.write_obj(path, verts, faces)
+with open(path) as f:
+    text = f.read()
+assert tokens(text, "f") == savetxt("f", faces+1, "%d")
+assert not tokens(text, "vn")
+
+# Columns are fixed width
+lines = [line for line in text.splitlines() if line.startswith("v ")]
+assert len(set(map(len, lines))) == 1
+
+try:
+    export.write_obj(path, verts*np.float32(1e13), faces)
+    assert False
+except ValueError as e:
+    print("Too large:", e)
+
+# === PLY ===
+path = os.path.join(tmp, "mesh.ply")
+scalars = {'conc': rs.uniform(0, 1, len(verts))}
+export.write_ply(path, verts, faces, normals=normals, scalars=scalars, chunksize=1000)
+with open(path, 'rb') as f:
+    raw = f.read()
+end = raw.index(b"end_header\n") + len(b"end_header\n")
+header = raw[:end].decode('ascii').splitlines()
+assert header == ["ply",
+                  "format binary_little_endian 1.0",
+                  "comment AtomBlend isosurface",
+                  "element vertex %d" % len(verts),
+                  "property float x", "property float y", "property float z",
+                  "property float nx", "property float ny", "property float nz",
+                  "property float conc",
+                  "element face %d" % len(faces),
+                  "property list uchar int vertex_indices",
+                  "end_header"]
+
+vertdtype = np.dtype([(name, '<f4') for name in ("x", "y", "z", "nx", "ny", "nz", "conc")])
+facedtype = np.dtype([('n', 'u1'), ('v', '<i4', 3)])
+vertrecs = np.frombuffer(raw, dtype=vertdtype, count=len(verts), offset=end)
+facerecs = np.frombuffer(raw, dtype=facedtype, offset=end+vertrecs.nbytes)
+assert len(facerecs) == len(faces)
+assert np.array_equal(np.column_stack([vertrecs[n] for n in "xyz"]), verts)
+assert np.array_equal(np.column_stack([vertrecs["n"+n] for n in "xyz"]), normals)
+assert np.array_equal(vertrecs['conc'], scalars['conc'].astype(np.float32))
+assert np.all(facerecs['n'] == 3) and np.array_equal(facerecs['v'], faces)
+print("PLY header and payload round-trip")
+
+# Geometry only
+export.write_ply(path, verts, faces)
+with open(path, 'rb') as f:
+    raw = f.read()
+end = raw.index(b"end_header\n") + len(b"end_header\n")
+assert b"property float nx" not in raw[:end]
+assert len(raw) - end == len(verts)*12 + len(faces)*13
+
+try:
+    export.write_ply(path, verts, faces+len(verts))
+    assert False
+except ValueError as e:
+    print("Out of range:", e)
+
+shutil.rmtree(tmp)
+print("OK")
@@ -0,0 +1,70 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis import isosurface
+
+def sphere(shape, centre, radius):
+    # Voxel volume [y,z,x] of radius - distance from centre (xyz voxel units)
+    y, z, x = np.indices(shape, dtype=float)
+    return radius - np.sqrt((x-centre[0])**2 + (y-centre[1])**2 + (z-centre[2])**2)
+
+def volume(verts, faces):
+    # Signed volume enclosed by triangles (positive: normals point outwards)
+    a, b, c = verts[faces[:,0]], verts[faces[:,1]], verts[faces[:,2]]
+    return np.einsum('ij,ij->i', a, np.cross(b, c)).sum()/6
+
+def check_closed(faces):
+    # Every directed edge once and its reverse once: closed and consistently
+    # oriented. faces may hold any integer vertex keys
+    directed = np.concatenate((faces[:,[0, 1]], faces[:,[1, 2]], faces[:,[2, 0]]))
+    keys = set(map(tuple, directed.tolist()))
+    assert len(keys) == len(directed), "edge used twice in the same direction"
+    assert all((b, a) in keys for a, b in keys), "open edge"
+
+CENTRE = np.array([10.3, 9.6, 11.2])
+RADIUS = 6.4
+voxels = sphere((21, 23, 22), CENTRE, RADIUS)
+isorange = [0, voxels.max()+1]
+
+# Raw marching cubes triangles (grid edge IDs)
+tris = isosurface._marching_cubes(voxels, isorange)
+print("Triangles:", len(tris))
+check_closed(tris)
+print("Triangles closed and consistently oriented")
+
+edgeids, inverse = np.unique(tris, return_inverse=True)
+verts = isosurface._edgeverts(edgeids, voxels, isorange)[0]
+faces = inverse.reshape(-1, 3)
+dist = np.linalg.norm(verts - CENTRE, axis=1)
+assert np.all(np.abs(dist - RADIUS) < 0.1)
+vol = volume(verts, faces)
+print("Volume:", vol, "sphere:", 4/3*np.pi*RADIUS**3)
+assert vol > 0 and abs(vol/(4/3*np.pi*RADIUS**3) - 1) < 0.05
+print("Normals point out of the isorange region")
+
+# Inverted isorange: hollow region, normals point into the sphere
+tris = isosurface._marching_cubes(voxels, [voxels.min(), 0])
+check_closed(tris)
+edgeids, inverse = np.unique(tris, return_inverse=True)
+verts = isosurface._edgeverts(edgeids, voxels, [voxels.min(), 0])[0]
+assert volume(verts, inverse.reshape(-1, 3)) < 0
+print("Inverted region oriented inwards")
+
+# Welded mesh: one vertex per crossing, closed sphere (V - E + F = 2) for
+# distance and count fields (crossings on voxels with isorange [1, 2])
+counts = (voxels >= 0).astype(int)
+for vol_, iso in ((voxels, isorange), (counts, [1, 2]), (counts, [0.5, 2])):
+    verts, faces = isosurface.generate(vol_, iso)
+    print("Welded verts:", len(verts), "faces:", len(faces))
+    assert verts.dtype == np.float32 and faces.dtype == np.int32
+    assert len(np.unique(verts, axis=0)) == len(verts)
+    assert np.all(np.bincount(faces.ravel(), minlength=len(verts)) > 0)
+    assert np.all((faces[:,0] != faces[:,1]) & (faces[:,1] != faces[:,2]) &
+                  (faces[:,2] != faces[:,0]))
+    check_closed(faces)
+    assert len(verts) - len(faces)*3//2 + len(faces) == 2
+    assert volume(verts.astype(float), faces) > 0
+print("Welded meshes closed, oriented, without duplicate vertices")
+print("OK")
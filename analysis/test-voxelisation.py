@@ -0,0 +1,69 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis import voxelisation
+
+def reference(coords, bin, origin, shape):
+    # Reference: numpy histogram over the (Nj, Nk, Ni) = (y, z, x) grid
+    Nj, Nk, Ni = shape
+    edges = [origin[axis] + bin*np.arange(n+1) for axis, n in ((1, Nj), (2, Nk), (0, Ni))]
+    hist, e = np.histogramdd(coords[:,[1, 2, 0]], bins=edges)
+    return hist.astype(int)
+
+rs = np.random.RandomState(2)
+coords = rs.uniform(-10, 30, (50000, 3))*[1, 0.5, 2]
+BIN = 0.7
+
+# Whole dataset
+origin, shape = voxelisation.grid(coords, BIN)
+vox = voxelisation.generate(coords, BIN)
+print("Grid:", origin, shape, "points:", vox.sum())
+assert vox.shape == shape and vox.sum() == len(coords)
+assert np.array_equal(vox, reference(coords, BIN, origin, shape))
+print("generate matches histogram")
+
+# Subset on a given grid: points outside are not counted
+sub_origin = origin + 5
+sub_extent = np.array([10, 4, 20])
+sub_grid = voxelisation.grid(coords, BIN, sub_origin, sub_extent)
+vox = voxelisation.generate(coords, BIN, sub_origin, sub_extent)
+assert np.array_equal(vox, reference(coords, BIN, *sub_grid))
+print("generate on fixed grid matches histogram")
+
+# Streamed blocks, both bounds passes and fixed grid
+chunks = [(coords[start:start+7000], None) for start in range(0, len(coords), 7000)]
+assert np.array_equal(voxelisation.generate_stream(chunks, BIN),
+                      reference(coords, BIN, origin, shape))
+assert np.array_equal(voxelisation.generate_stream(chunks, BIN, sub_origin, sub_extent),
+                      reference(coords, BIN, *sub_grid))
+print("generate_stream matches histogram")
+
+# Species channels: ranges 0..5, range 3 shared by two species, range 5 in none
+posmap = rs.randint(0, 7, len(coords)).astype(np.uint8)
+species = [np.array([0, 1]), np.array([2, 3]), np.array([3, 4])]
+counts = voxelisation.generate_species(coords, posmap, species, BIN)
+assert counts.shape == (len(species)+1,) + shape
+for s, inds in enumerate(species):
+    member = np.isin(posmap, inds+1)
+    assert np.array_equal(counts[s], reference(coords[member], BIN, origin, shape))
+assert np.array_equal(counts[-1], reference(coords, BIN, origin, shape))
+print("generate_species matches histogram per species")
+
+conc = voxelisation.concentration(counts)
+assert np.all((conc >= 0) & (conc <= 1))
+
+# Range edits: points moved between ranges (and in and out of unranged),
+# counts updated from the changed points only on the dataset's grid
+for edit in range(3):
+    newmap = posmap.copy()
+    moved = rs.choice(len(coords), 2000, replace=False)
+    newmap[moved] = rs.randint(0, 7, len(moved))
+    changed = np.flatnonzero(newmap != posmap)
+    voxelisation.update_species(counts, coords[changed], posmap[changed], newmap[changed],
+                                species, origin, BIN)
+    posmap = newmap
+    assert np.array_equal(counts, voxelisation.generate_species(coords, posmap, species, BIN))
+print("update_species matches generate_species after edits")
+print("OK")
@@ -13,54 +13,261 @@
 
 import numpy as np
 
-def generate(coords, bin=1):
+try:
+    from ..profiling import span
+except (ImportError, ValueError):
+    # Imported as top-level package (repo root on sys.path, eg. batch.py)
+    from profiling import span
+
+# Number of points binned at once (bounds memory used by temporaries)
+CHUNKSIZE = 2**22
+
+def generate(coords, bin=1, origin=None, extent=None):
     """
     Voxelise the data in XYZ and return the volume in each voxel
-    as a 3D matrix of Ni x Nj x Nk.
+    as a 3D matrix of Nj x Nk x Ni.
 
     Input - 'coords': The pointcloud as [x1 y1 z1; x2 y2 z2; ...] where each row is
-    the xyz coordinate of each point
+    the xyz coordinate of each point. float32 input is binned in float32
           - 'bin'   : Bin (division) size in nanometres. Must be greater than
           or equal to the smallest measurable division of XYZ (ie: one atom
           cannot be in two voxels)
+          - 'origin': XYZ of the grid's lower corner (default: min of XYZ)
+          - 'extent': XYZ size of the grid (default: max - min of XYZ).
+          Points outside origin + extent are not counted. Pass the same
+          origin/extent to voxelise subsets of a dataset on the same grid
 
     Output - 'voxelarray': Voxelized pointcloud as a 3D matrix, tallying the number of
     points per voxel (bin) across the volume of the pointcloud
     """
 
-    if coords.shape[1] != 3:
-        raise ValueError("voxelisation.generate: Positions not entered as columns X, Y, Z.")
+    _checkcoords(coords, "generate")
+    origin, shape = grid(coords, bin, origin, extent)
+
+    # Tally voxel IDs of all points with a flat bincount, a block at a time
+    voxelarray = np.zeros(np.prod(shape), dtype=np.intp)
+    with span("voxelisation", points=len(coords), voxels=len(voxelarray)):
+        for start in range(0, len(coords), CHUNKSIZE):
+            block = coords[start:start+CHUNKSIZE]
+            voxelarray += _bincount(block, origin, bin, shape)
+
+    return voxelarray.reshape(shape)
+
+def generate_stream(chunks, bin=1, origin=None, extent=None):
+    """
+    Voxelise a stream of point blocks without holding the whole pointcloud
+    in memory. Output matches generate() on the concatenated points.
+
+    Input - 'chunks': Re-iterable of (xyz, mc) blocks, eg. apread.posload.POSStream.
+    Unless both origin and extent are given it is iterated twice: once for
+    the bounds of XYZ, once for binning
+          - 'bin', 'origin', 'extent' : As in generate()
+
+    Output - 'voxelarray': Voxelized pointcloud as a 3D matrix of Nj x Nk x Ni
+    """
+
+    # First pass: min and max of XYZ
+    if origin is None or extent is None:
+        with span("voxelisation bounds"):
+            min_, max_ = _bounds(chunks)
+        if min_ is None:
+            raise ValueError("voxelisation.generate_stream: No points to voxelise.")
+        if origin is None:
+            origin = min_
+        if extent is None:
+            extent = max_ - np.asarray(origin, dtype=max_.dtype)
+
+    origin, shape = grid(np.empty((0, 3), dtype=np.asarray(origin).dtype),
+                         bin, origin, extent)
+
+    # Second pass: tally points per voxel, one block at a time
+    voxelarray = np.zeros(np.prod(shape), dtype=np.intp)
+    with span("voxelisation", voxels=len(voxelarray)) as s:
+        npoints = 0
+        for coords, mc in chunks:
+            voxelarray += _bincount(coords, origin, bin, shape)
+            npoints += len(coords)
+        s.count(points=npoints)
+
+    return voxelarray.reshape(shape)
+
+def generate_species(coords, posmap, species, bin=1, origin=None, extent=None):
+    """
+    Voxelise the data in XYZ per species in a single pass over the points.
+
+    Input - 'coords' : The pointcloud as in generate()
+          - 'posmap' : Range index + 1 of each point (0 for unranged points),
+          eg. apread.rngload.ORNLRNG._posmap
+          - 'species': List of range index arrays, one per species, eg.
+          [rng._atoms[name] for name in rng.atomlist]. A range may belong to
+          several species (eg. molecular ions for atoms), its points are
+          then counted in each of them
+          - 'bin', 'origin', 'extent' : As in generate()
+
+    Output - 'counts': (nspecies + 1) x Nj x Nk x Ni count tensor. counts[s] is
+    the voxelised pointcloud of species[s], counts[-1] is the total of all
+    points (ranged or not) as in generate()
+    """
+
+    _checkcoords(coords, "generate_species")
+    if len(posmap) != len(coords):
+        raise ValueError("voxelisation.generate_species: posmap and positions differ in length.")
+    origin, shape = grid(coords, bin, origin, extent)
+    nvox = np.prod(shape)
+    nspecies = len(species)
+
+    # Range index + 1 -> channel lookup tables. Total channel is last.
+    luts = _species_luts(species, int(posmap.max(initial=0)))
+
+    counts = np.zeros((nspecies+1)*nvox, dtype=np.intp)
+    with span("voxelisation species", points=len(coords), voxels=len(counts)):
+        for start in range(0, len(coords), CHUNKSIZE):
+            stop = start + CHUNKSIZE
+            ids, inside = _voxelids(coords[start:stop], origin, bin, shape, valid=True)
+            labels = np.asarray(posmap[start:stop])[inside]
+
+            # Flat (channel, j, k, i) ids: one bincount for all species
+            keys = [nspecies*nvox + ids]
+            for lut in luts:
+                chan = lut[labels]
+                member = chan >= 0
+                keys.append(chan[member]*nvox + ids[member])
+            counts += np.bincount(np.concatenate(keys), minlength=(nspecies+1)*nvox)
+
+    return counts.reshape((nspecies+1,) + shape)
+
+def update_species(counts, coords, oldmap, newmap, species, origin, bin=1):
+    """
+    Update generate_species() output in place for points whose range
+    changed (eg. apread.rngload.RNG.setrange), in time proportional to the
+    number of changed points.
+
+    Input - 'counts' : generate_species() output, modified in place
+          - 'coords' : Positions of the changed points only
+          - 'oldmap', 'newmap': Previous and new range index + 1 of each of
+          these points (eg. RangeEdit.old, RangeEdit.new)
+          - 'species', 'bin': As passed to generate_species()
+          - 'origin': Grid origin counts was generated with, as returned by
+          grid(). Required: the changed points alone do not determine it
+
+    Output - 'counts'
+    """
+
+    _checkcoords(coords, "update_species")
+    if not (len(coords) == len(oldmap) == len(newmap)):
+        raise ValueError("voxelisation.update_species: maps and positions differ in length.")
+    origin = np.asarray(origin, dtype=np.result_type(coords.dtype, np.float32))
+    shape = counts.shape[1:]
+    nvox = np.prod(shape)
 
-    # Calculate min, max and range of XYZ
-    min_ = np.empty(3)
-    max_ = np.empty(3)
-    range_ = np.empty(3)
-    for i in np.arange(3):
-        min_[i] = np.nanmin(coords[:,i])
-        max_[i] = np.nanmax(coords[:,i])
-        range_[i] = max_[i] - min_[i]
+    luts = _species_luts(species, int(max(oldmap.max(initial=0), newmap.max(initial=0))))
+    flat = counts.reshape(-1)
+    with span("voxelisation update", points=len(coords)):
+        ids, inside = _voxelids(coords, origin, bin, shape, valid=True)
+        # Totals are unchanged: move points between species channels only
+        for labels, sign in ((oldmap[inside], -1), (newmap[inside], 1)):
+            for lut in luts:
+                chan = lut[labels]
+                member = chan >= 0
+                np.add.at(flat, chan[member]*nvox + ids[member], sign)
 
+    return counts
+
+def concentration(counts):
+    """
+    Return per-voxel concentration grids from generate_species() output.
+
+    Input - 'counts': (nspecies + 1) x Nj x Nk x Ni count tensor, total last
+
+    Output - 'conc': nspecies x Nj x Nk x Ni array of species count / total
+    count per voxel (0 in empty voxels). Each conc[s] can be passed to
+    analysis.isosurface.generate with a fractional isorange
+    """
+    total = counts[-1]
+    conc = np.zeros(counts[:-1].shape)
+    np.divide(counts[:-1], total, out=conc, where=(total > 0))
+    return conc
+
+def grid(coords, bin=1, origin=None, extent=None):
+    """
+    Return (origin, shape) of the voxel grid used to voxelise coords.
+
+    origin is cast to the float type coords are binned in, shape is
+    (Nj, Nk, Ni), the layout of generate()'s output.
+    """
+    dtype = np.result_type(coords.dtype, np.float32)
+
+    if origin is None:
+        origin = np.nanmin(coords, axis=0)
+    origin = np.asarray(origin, dtype=dtype)
+    if extent is None:
+        extent = np.nanmax(coords, axis=0) - origin
+    extent = np.asarray(extent, dtype=dtype)
 
     # Calculate the number of voxels in IJK via rounding range in XYZ up
     # to an integer value
-    N = np.zeros(3)
-    for x in np.arange(3):
-        N[x] = (range_[x]//bin) + 1 # IJK
-
-
-    # Create the voxel volume (3D matrix)
-    voxelarray = np.zeros((N[1], N[2], N[0]))
-    voxelID = np.zeros(3) #per record
-    voxelIDarray = np.empty([coords.shape[0], 3])
-
-    # Per record: iterate through all coord values and calculate their
-    # appropriate voxel bin
-    # Store the voxel's index in voxelID
-    # At that voxelID, increase the count by 1 in the 3D matrix
-    # Return completed voxel volume
-    for record in np.arange(coords.shape[0]):
-        for xyz in np.arange(3):
-            voxelID[xyz] =(( coords[record, xyz] - min_[xyz]) // bin) #brackets important
-        voxelarray[voxelID[1], voxelID[2], voxelID[0]] = voxelarray[voxelID[1], voxelID[2], voxelID[0]] + 1 #add 1 to count at this index
-
-    return voxelarray
+    N = (extent // dtype.type(bin)).astype(int) + 1 # IJK
+    return origin, (N[1], N[2], N[0])
+
+def _bounds(chunks):
+    # Helper function: (min, max) XYZ over all blocks of chunks ignoring
+    # NaNs, (None, None) if there are no points
+    min_ = None
+    max_ = None
+    for coords, mc in chunks:
+        _checkcoords(coords, "generate_stream")
+        if not len(coords):
+            continue
+        bmin = np.nanmin(coords, axis=0)
+        bmax = np.nanmax(coords, axis=0)
+        min_ = bmin if min_ is None else np.fmin(min_, bmin)
+        max_ = bmax if max_ is None else np.fmax(max_, bmax)
+    return min_, max_
+
+def _species_luts(species, maxlabel):
+    # Helper function: range index + 1 -> channel lookup tables of species
+    # (list of range index arrays) for labels 0..maxlabel, one row per
+    # species a range belongs to (-1: range not in that many species)
+    members = {}
+    for s, inds in enumerate(species):
+        for r in np.unique(inds):
+            members.setdefault(int(r)+1, []).append(s)
+    nlabels = max([maxlabel] + list(members)) + 1
+    depth = max([len(chans) for chans in members.values()], default=0)
+    luts = np.full((depth, nlabels), -1, dtype=np.intp)
+    for label, chans in members.items():
+        luts[0:len(chans), label] = chans
+    return luts
+
+def _bincount(coords, origin, bin, shape):
+    # Helper function: counts of points in coords per voxel of the grid
+    # defined by origin, bin and shape, as flat (j, k, i) array
+    flat = _voxelids(coords, origin, bin, shape)
+    return np.bincount(flat, minlength=np.prod(shape))
+
+def _voxelids(coords, origin, bin, shape, valid=False):
+    # Helper function: flat (j, k, i) voxel index of each point in coords
+    # that lies inside the grid. With valid=True returns (ids, mask) where
+    # mask selects the points of coords that ids belong to
+    Nj, Nk, Ni = shape
+    b = origin.dtype.type(bin)
+
+    inside = np.ones(len(coords), dtype=bool)
+    ijk = []
+    for axis, n in enumerate((Ni, Nj, Nk)):
+        # float floor division keeps float32 input in float32,
+        # NaN coordinates fail both comparisons
+        f = (coords[:,axis] - origin[axis]) // b
+        inside &= (f >= 0) & (f < n)
+        ijk.append(f)
+
+    i, j, k = [f[inside].astype(np.intp) for f in ijk]
+    ids = (j*Nk + k)*Ni + i
+    if valid:
+        return ids, inside
+    return ids
+
+def _checkcoords(coords, funcname):
+    # Helper function: check coords are columns X, Y, Z
+    if coords.ndim != 2 or coords.shape[1] != 3:
+        raise ValueError("voxelisation.%s: Positions not entered as columns X, Y, Z." % funcname)
@@ -1 +1,2 @@
-__all__ = ["apload", "posload", "rngload"]
+__all__ = ["apload", "aptload", "atoload", "posload", "registry", "rngload",
+           "textload"]
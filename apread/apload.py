@@ -11,10 +11,17 @@
 # APT data loader
 # =============================================================================
 
+import os
+import threading
+import collections
 import numpy as np
 
 from . import posload as pl
 from . import rngload as rl
+from . import registry
+
+# Default APDataCache memory budget in bytes
+CACHE_BUDGET = 4*2**30
 
 # === Exceptions ===
 class APReadError(Exception): pass
@@ -39,18 +46,168 @@ class APData():
         data.rng.atomlist       # List of all atoms defined in rng file
         data.rng.getatom("Si")  # Return all points in pos file matching Si's range
 
+        # Memory-map pos file instead of reading it into memory
+        data = APData(pospath, rngpath, mmap=True)
+
+        # Memory-map native-endian decoded copy of pos file (see posload.POS)
+        data = APData(pospath, rngpath, cache=True)
+
+        # Formats are detected by apread.registry: .pos, .epos, .apt, .ato and
+        # .csv/.xyz pos files, ORNL .rng, IVAS .rrng and .env range files
+        data = APData("/path/to/run.apt", "/path/to/ranges.rrng", mmap=True)
+        data.pos.section("tof") # Extra .apt sections (.epos/.ato: pos.column)
+
     """
-    def __init__(self, pospath, rngpath):
+    def __init__(self, pospath, rngpath, mmap=False, cache=False):
+        # Loaders of both files are picked by format (see apread.registry)
         try:
-            self.pos = pl.POS(pospath)
-        except pl.ReadError:
-            raise APReadError('Error opening pos file %s' % pospath)
+            self.pos = registry.load(pospath, 'pos', mmap=mmap, cache=cache)
+        except (pl.ReadError, registry.FormatError) as err:
+            raise APReadError('Error opening pos file %s: %s' % (pospath, err))
             return
         try:
-            self.rng = rl.ORNLRNG(rngpath)
-        except rl.ReadError:
-            raise APReadError('Error opening rng file %s' % rngpath)
+            self.rng = registry.load(rngpath, 'rng')
+        except (rl.ReadError, registry.FormatError) as err:
+            raise APReadError('Error opening rng file %s: %s' % (rngpath, err))
             return
 
         # Range all points in posfile
         self.rng.loadpos(self.pos)
+
+        # Arrays derived from this dataset (eg. voxelised count grids), kept
+        # and freed with it and counted in APDataCache's budget
+        self.grids = {}
+
+class APDataCache():
+    """
+    Process-wide LRU cache of loaded APData objects
+
+    Datasets are keyed by their pos/rng paths, the files' mtimes and the
+    APData load options, so editing either file on disk invalidates the
+    entry. When the in-memory size of all cached datasets exceeds budget
+    bytes, least recently used datasets are evicted (the most recently used
+    one is always kept). Memory-mapped arrays are not counted towards the
+    budget as their pages can be reclaimed by the OS.
+
+    Usage::
+
+        data = apload.cache.get(pospath, rngpath, cache=True)
+        data = apload.cache.get(pospath, rngpath, cache=True) # No reload
+
+        apload.cache.budget = 2*2**30 # 2 GB
+    """
+    def __init__(self, budget=CACHE_BUDGET):
+        self.budget = budget #: Memory budget in bytes
+        self._entries = collections.OrderedDict() # key -> (APData, nbytes)
+        self._loading = {} # key -> threading.Event set when its load ends
+        self._lock = threading.RLock()
+
+    def get(self, pospath, rngpath, **kwargs) -> APData:
+        """
+        Return APData for pospath/rngpath, loading it on a cache miss
+
+        Keyword arguments are passed on to APData. Files are read without
+        holding the cache lock, so other datasets stay accessible while
+        one loads; concurrent gets of the same dataset wait for a single
+        load.
+        """
+        key = self._key(pospath, rngpath, kwargs)
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Loaded by another thread: wait, then look again (and load
+            # here if that load failed)
+            loading.wait()
+
+        try:
+            data = APData(pospath, rngpath, **kwargs)
+            nbytes = _nbytes(data)
+            with self._lock:
+                # Drop stale entries for older versions of the same files
+                for oldkey in [k for k in self._entries
+                               if k[0:2] == key[0:2] and k[2:4] != key[2:4]]:
+                    del self._entries[oldkey]
+                self._entries[key] = (data, nbytes)
+                self._evict()
+            return data
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def resize(self, data):
+        """
+        Recount the size of cached dataset data after arrays were added to
+        it (eg. data.grids), evicting other datasets to stay within budget
+        """
+        with self._lock:
+            for key, (cached, nbytes) in self._entries.items():
+                if cached is data:
+                    self._entries[key] = (data, _nbytes(data))
+                    self._entries.move_to_end(key)
+                    self._evict()
+                    return
+
+    def clear(self):
+        """Remove all cached datasets"""
+        with self._lock:
+            self._entries.clear()
+
+    def nbytes(self) -> int:
+        """Return total in-memory size of cached datasets"""
+        with self._lock:
+            return sum(nbytes for data, nbytes in self._entries.values())
+
+    def _evict(self):
+        # Pop least recently used entries until within budget
+        while len(self._entries) > 1 and self.nbytes() > self.budget:
+            self._entries.popitem(last=False)
+
+    def _key(self, pospath, rngpath, kwargs):
+        try:
+            posmtime = os.stat(pospath).st_mtime_ns
+        except OSError:
+            raise APReadError('Error opening pos file %s' % pospath)
+        try:
+            rngmtime = os.stat(rngpath).st_mtime_ns
+        except OSError:
+            raise APReadError('Error opening rng file %s' % rngpath)
+        return (os.path.abspath(pospath), os.path.abspath(rngpath),
+                posmtime, rngmtime, tuple(sorted(kwargs.items())))
+
+    def __contains__(self, paths):
+        pospath, rngpath = paths
+        with self._lock:
+            return any(k[0:2] == (os.path.abspath(pospath), os.path.abspath(rngpath))
+                       for k in self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+#: Process-wide dataset cache
+cache = APDataCache()
+
+
+
+# === Helper functions ===
+def _nbytes(data):
+    # Helper function: in-memory (not memory-mapped) size of APData arrays
+    pos = data.pos
+    if isinstance(pos, pl.EPOS):
+        # Records and columns decoded so far, without decoding any
+        arrays = [pos._records] + list(pos._columns.values())
+    else:
+        arrays = [pos.xyz, pos.mc]
+    arrays += [data.rng._posmap, data.rng._order, data.rng._offsets]
+    # m/c sort index, built by the first range edit
+    arrays += list(data.rng._mcindex or ())
+    for grid in list(data.grids.values()):
+        arrays += grid if isinstance(grid, (tuple, list)) else [grid]
+    return sum(a.nbytes for a in arrays
+               if isinstance(a, np.ndarray) and not isinstance(a, np.memmap))
@@ -0,0 +1,201 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   aptload.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# CAMECA AP Suite .apt data loader
+# =============================================================================
+
+import os
+import collections
+import numpy as np
+
+from .posload import ReadError, CHUNKSIZE, span
+
+# .apt file header (little-endian): signature "APT\0", header size, header
+# version, file name (UTF-16, 256 chars), creation time (FILETIME), ion count
+APT_HEADER = np.dtype([('signature', 'S4'), ('headersize', '<i4'), ('version', '<i4'),
+                       ('filename', 'V512'), ('created', '<u8'), ('ions', '<u8')])
+
+# Section header, followed by bytecount bytes of records at offset
+# headersize from the start of the section
+SEC_HEADER = np.dtype([('signature', 'S4'), ('headersize', '<i4'), ('version', '<i4'),
+                       ('type', 'V64'), ('secversion', '<i4'), ('relation', '<u4'),
+                       ('recordtype', '<u4'), ('datatype', '<u4'), ('typebits', '<i4'),
+                       ('recordsize', '<i4'), ('unit', 'V32'), ('records', '<u8'),
+                       ('bytecount', '<u8')])
+
+# Section record data type -> numpy kind
+_KINDS = {1: 'i', 2: 'u', 3: 'f', 4: 'S'}
+
+#: Table of contents entry of one section: name, unit, numpy dtype of one
+#: value, record shape, number of records and byte offset of the records
+Section = collections.namedtuple('Section', 'name unit dtype shape records offset')
+
+class APT():
+    """
+    CAMECA AP Suite .apt file loader
+
+    Usage::
+
+      apt = APT("/path/to/file.apt")   # Reads section headers only
+
+      apt.sections                     # Table of contents (name -> Section)
+      apt.section("tof")               # Memory-mapped section records
+      apt.xyz, apt.mc, len(apt)        # As for posload.POS
+
+    Opening a file only reads its header and the header of every section,
+    seeking past the section records. Sections are memory-mapped when
+    first asked for (or read into memory with mmap=False) and kept.
+
+    Sections are named as in the file, eg. "Position" (n x 3 float32 xyz),
+    "Mass" (m/c), "tof", "XDet_mm", "YDet_mm", "Voltage", "Multiplicity".
+    cache is accepted for compatibility with POS and has no effect.
+    """
+
+    def __init__(self, aptpath, mmap=True, cache=False):
+        self._path = aptpath
+        self._mmap = mmap
+        self._arrays = {}
+
+        with span("apt index") as s:
+            self._n, self.sections = self._parsefile(aptpath)
+            s.count(points=self._n, sections=len(self.sections))
+
+        for name in ('Position', 'Mass'):
+            if name not in self.sections:
+                raise ReadError('No %s section in apt file %s' % (name, aptpath))
+
+    def _parsefile(self, path: str) -> (int, collections.OrderedDict):
+        """
+        Read file and section headers of input apt file
+
+        Arguments:
+
+        * **path** - Path to apt file
+
+        Returns (number of ions, OrderedDict of section name -> Section)
+        """
+        sections = collections.OrderedDict()
+        try:
+            size = os.path.getsize(path)
+            with open(path, 'rb') as f:
+                header = _readheader(f, APT_HEADER, 0)
+                if header is None or header['signature'] != b'APT':
+                    raise ReadError('Not an apt file %s' % path)
+                n = int(header['ions'])
+
+                offset = int(header['headersize'])
+                while offset < size:
+                    sec = _readheader(f, SEC_HEADER, offset)
+                    if sec is None or sec['signature'] != b'SEC':
+                        raise ReadError('Invalid section header at byte %d in apt file %s' % \
+                                (offset, path))
+                    start = offset + int(sec['headersize'])
+                    offset = start + int(sec['bytecount'])
+                    if offset > size:
+                        raise ReadError('Truncated section in apt file %s' % path)
+
+                    section = _section(sec, start)
+                    if section is not None:
+                        sections[section.name] = section
+        except (IOError, FileNotFoundError):
+            raise ReadError('Error opening apt file %s' % path)
+            return
+        return n, sections
+
+    def section(self, name: str) -> np.ndarray:
+        """
+        Return records of section name as array of records x shape, mapped
+        (or read) on first use
+        """
+        if name not in self._arrays:
+            try:
+                sec = self.sections[name]
+            except KeyError:
+                raise ReadError('No %s section in apt file %s' % (name, self._path))
+            shape = (sec.records,) + sec.shape
+            if not sec.records:
+                data = np.empty(shape, dtype=sec.dtype)
+            elif self._mmap:
+                data = np.memmap(self._path, dtype=sec.dtype, mode='r',
+                                 offset=sec.offset, shape=shape)
+            else:
+                with open(self._path, 'rb') as f:
+                    f.seek(sec.offset)
+                    data = np.fromfile(f, dtype=sec.dtype,
+                                       count=int(np.prod(shape))).reshape(shape)
+            self._arrays[name] = data
+        return self._arrays[name]
+
+    @property
+    def xyz(self):
+        """n x 3 array of xyz points in apt file"""
+        return self.section('Position')
+
+    @property
+    def mc(self):
+        """n x 1 array of mass-to-charge ratios"""
+        mc = self.section('Mass')
+        return mc.reshape(-1)
+
+    def chunks(self, chunksize=CHUNKSIZE):
+        """Yield (xyz, mc) views of consecutive blocks of chunksize points"""
+        xyz = self.xyz
+        mc = self.mc
+        for start in range(0, len(mc), chunksize):
+            stop = start + chunksize
+            yield xyz[start:stop], mc[start:stop]
+
+    def __iter__(self):
+        return self.chunks()
+
+    def __len__(self):
+        """Return number of points in apt file"""
+        return self._n
+
+
+
+# === Helper functions ===
+def _readheader(f, dtype, offset):
+    # Helper function: read one dtype header at offset of open file f
+    # (None if the file ends first)
+    f.seek(offset)
+    raw = f.read(dtype.itemsize)
+    if len(raw) < dtype.itemsize:
+        return None
+    return np.frombuffer(raw, dtype=dtype)[0]
+
+def _section(sec, offset):
+    # Helper function: Section from parsed section header sec, records
+    # starting at byte offset. None for sections of variable size records,
+    # which can not be mapped as an array
+    name = _wcstr(sec['type'])
+    if int(sec['recordtype']) != 1:
+        print("Skipping variable size apt section %s" % name)
+        return None
+
+    kind = _KINDS.get(int(sec['datatype']))
+    nbytes = int(sec['typebits'])//8
+    recordsize = int(sec['recordsize'])
+    if kind is None or not nbytes or recordsize % nbytes:
+        print("Skipping apt section %s of unknown data type" % name)
+        return None
+
+    if kind == 'S':
+        dtype = np.dtype('S%d' % recordsize)
+        shape = ()
+    else:
+        dtype = np.dtype('<%s%d' % (kind, nbytes))
+        width = recordsize // nbytes
+        shape = (width,) if width > 1 else ()
+    return Section(name, _wcstr(sec['unit']), dtype, shape,
+                   int(sec['records']), offset)
+
+def _wcstr(raw):
+    # Helper function: decode null-terminated UTF-16 (wchar) field
+    return bytes(raw).decode('utf-16-le', errors='replace').split('\x00')[0]
@@ -0,0 +1,94 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   atoload.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Rouen/GPM .ato (version 3) data loader
+# =============================================================================
+
+import os
+import numpy as np
+
+from .posload import EPOS, ReadError, span
+
+# .ato file header: reserved int32 and format version (3)
+ATO_HEADER = 8
+ATO_VERSION = 3
+
+# .ato v3 record: position and mass-to-charge, cluster ID, pulse number, DC
+# voltage (kV), time of flight (ns), detector x/y (cm), pulse voltage (kV),
+# virtual voltage and Fourier intensities, all little-endian float32
+ATO_DTYPE = np.dtype([('x',        '<f4'), ('y',     '<f4'), ('z',    '<f4'),
+                      ('mc',       '<f4'), ('cluster', '<f4'), ('pulse', '<f4'),
+                      ('vdc',      '<f4'), ('tof',   '<f4'),
+                      ('detx',     '<f4'), ('dety',  '<f4'), ('vpulse', '<f4'),
+                      ('vvirtual', '<f4'), ('fourier_r', '<f4'), ('fourier_i', '<f4')])
+ATO_RECORD = ATO_DTYPE.itemsize
+
+class ATO(EPOS):
+    """
+    .ato (version 3) file loader
+
+    Usage::
+
+      ato = ATO("/path/to/file.ato")             # Read whole file into memory
+      ato = ATO("/path/to/file.ato", mmap=True)  # Memory-map file
+
+      ato.xyz, ato.mc, len(ato)       # As for POS
+      ato.column("tof")               # Extra fields, as for EPOS
+
+    Records are kept as one structured array and columns decoded on first
+    use, as for posload.EPOS. Coordinates are as stored in the file.
+    """
+
+    def __init__(self, atopath, mmap=False, cache=False):
+        with span("ato load") as s:
+            self._records = self._parsefile(atopath, mmap or cache)
+            s.count(points=len(self._records))
+        self._columns = {}
+
+        self.fields = ('xyz',) + ATO_DTYPE.names #: Names of available columns
+
+    def _parsefile(self, path: str, mmap: bool=False) -> np.ndarray:
+        """
+        Parse input ato file into structured record array
+
+        Arguments:
+
+        * **path** - Path to ato file
+        * **mmap** - Memory-map file instead of reading it into memory
+        """
+        try:
+            size = os.path.getsize(path)
+            with open(path, 'rb') as content_file:
+                header = np.frombuffer(content_file.read(ATO_HEADER), dtype='<i4')
+                if len(header) < 2 or header[1] != ATO_VERSION:
+                    raise ReadError('Unsupported ato file version %s' % path)
+                if (size-ATO_HEADER) % ATO_RECORD:
+                    raise ReadError('Invalid ato file size %s' % path)
+
+                n = (size-ATO_HEADER)//ATO_RECORD
+                if mmap and n:
+                    return np.memmap(path, dtype=ATO_DTYPE, mode='r', offset=ATO_HEADER)
+
+                records = np.empty(n, dtype=ATO_DTYPE)
+                content_file.readinto(records)
+                return records
+        except (IOError, FileNotFoundError):
+            raise ReadError('Error opening ato file %s' % path)
+            return
+
+    def view(self, name: str) -> np.ndarray:
+        """
+        Return zero-copy view of column name onto the records ("xyz": n x 3
+        view of the x, y, z fields)
+        """
+        if name == 'xyz':
+            return np.ndarray((len(self._records), 3), dtype='<f4',
+                              buffer=self._records, offset=0,
+                              strides=(ATO_RECORD, 4))
+        return self._records[name]
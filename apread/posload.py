@@ -11,46 +11,513 @@
 # POS data loader classes
 # =============================================================================
 
+import os
+import glob
+import queue
+import hashlib
+import tempfile
+import threading
 import numpy as np
 
+try:
+    from ..profiling import span
+except (ImportError, ValueError):
+    # Imported as top-level package (repo root on sys.path, eg. batch.py)
+    from profiling import span
+
 class ReadError(Exception): pass
 
+# Size of a single pos record (4 big-endian float32: x, y, z, m/c)
+POS_RECORD = 16
+
+# Default number of points per streamed chunk (16 MB of pos records)
+CHUNKSIZE = 2**20
+
+# .epos record: pos fields followed by time of flight (ns), DC and pulse
+# voltage (V), detector x/y (mm), pulses since the previous event and ions
+# in this pulse (multiplicity), all big-endian
+EPOS_DTYPE = np.dtype([('x',      '>f4'), ('y',      '>f4'), ('z', '>f4'),
+                       ('mc',     '>f4'), ('tof',    '>f4'),
+                       ('vdc',    '>f4'), ('vpulse', '>f4'),
+                       ('detx',   '>f4'), ('dety',   '>f4'),
+                       ('dpulse', '>i4'), ('ipp',    '>i4')])
+EPOS_RECORD = EPOS_DTYPE.itemsize
+
+# Directory holding native-endian decoded pos sidecar files (see POS cache)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "atomblend")
+
+# Maximum total size of sidecar files in CACHE_DIR (bytes). Least recently
+# used sidecars are removed beyond it when new ones are written
+CACHE_LIMIT = 16*2**30
+
 class POSInterface():
     xyz = None #: n x 3 numpy array of xyz points in input posfile
     mc  = None #: n x 1 numpy array of mass-to-charge ratios corresponding to all points
 
+    def chunks(self, chunksize=CHUNKSIZE):
+        """Yield (xyz, mc) blocks of at most chunksize points"""
+        return
+
+    def __iter__(self):
+        """Iterate over (xyz, mc) blocks of default chunk size"""
+        return
+
     def __len__(self):
         """Number of points in pos file"""
         return
 
 class POS():
-    """.pos file loader"""
+    """
+    .pos file loader
+
+    Usage::
+
+      pos = POS("/path/to/file.pos")             # Read whole file into memory
+      pos = POS("/path/to/file.pos", mmap=True)  # Memory-map file
+      pos = POS("/path/to/file.pos", cache=True) # Memory-map decoded sidecar
+
+    In memory-mapped mode xyz and mc are lazy big-endian views onto the file
+    on disk, pages are only read in when the corresponding points are
+    accessed.
+
+    In cached mode the file is decoded once into native-endian contiguous
+    float32 sidecar files in CACHE_DIR, keyed by the source path, size and
+    mtime. Later loads memory-map the sidecars, so reopening is near-instant
+    and xyz/mc need no byteswapping. Sidecars are kept up to CACHE_LIMIT
+    bytes in total, least recently used ones are removed first.
+    """
 
-    def __init__(self, pospath):
-        data = self._parsefile(pospath)
+    def __init__(self, pospath, mmap=False, cache=False):
+        with span("pos load") as s:
+            if cache:
+                data = self._loadcache(pospath)
+            else:
+                data = self._parsefile(pospath, mmap)
+            s.count(points=data[0])
 
         self._n  = data[0]
         self.xyz = data[1] #: n x 3 numpy array of xyz points in pos file
         self.mc  = data[2] #: n x 1 numpy array of corresponding mass-to-charge ratios
 
     # TODO more informative errors
-    # TODO check it's actually a pos file
-    def _parsefile(self, path: str) -> (int, np.ndarray, np.ndarray):
-        """Parse input pos file"""
+    def _parsefile(self, path: str, mmap: bool=False) -> (int, np.ndarray, np.ndarray):
+        """
+        Parse input pos file
+
+        Arguments:
+
+        * **path** - Path to pos file
+        * **mmap** - Memory-map file instead of reading it into memory
+        """
         try:
-            with open(path, 'rb') as content_file:
-                pos_raw = content_file.read()
+            size = os.path.getsize(path)
+            if size % POS_RECORD:
+                raise ReadError('Invalid pos file size %s' % path)
+
+            if mmap and size:
+                pos_array = np.memmap(path, dtype='>f', mode='r')
+            else:
+                # Read straight into the array buffer and byteswap in place
+                pos_array = np.empty(size//4, dtype='>f')
+                with open(path, 'rb') as content_file:
+                    content_file.readinto(pos_array)
+                pos_array = _tonative(pos_array)
         except (IOError, FileNotFoundError):
             raise ReadError('Error opening pos file %s' % path)
             return
 
-        pos_array = np.ndarray((len(pos_raw)/4,), dtype='>f', buffer=pos_raw)
         pos = np.reshape(pos_array, (-1, 4))
         npoints = len(pos)
         xyz = pos[:,0:3]
         mc = pos[:,3]
         return npoints, xyz, mc
 
+    def _loadcache(self, path: str) -> (int, np.ndarray, np.ndarray):
+        """
+        Memory-map native-endian sidecars of input pos file, decoding the
+        pos file into new sidecars first if none are cached for its
+        current size and mtime
+
+        Arguments:
+
+        * **path** - Path to pos file
+        """
+        try:
+            xyzpath, mcpath = _sidecar_paths(path)
+        except (IOError, FileNotFoundError):
+            raise ReadError('Error opening pos file %s' % path)
+            return
+
+        try:
+            # Mark sidecars as used (their mtime orders cache cleanup)
+            os.utime(xyzpath)
+            os.utime(mcpath)
+        except OSError:
+            try:
+                _write_sidecars(path, xyzpath, mcpath)
+                _trim_cache((xyzpath, mcpath))
+            except (IOError, OSError) as err:
+                # Cache dir not writable: fall back to an uncached load
+                print("Cannot write pos cache for %s: %s" % (path, err))
+                return self._parsefile(path)
+
+        xyz = _loadnpy(xyzpath)
+        mc  = _loadnpy(mcpath)
+        return len(mc), xyz, mc
+
+    def chunks(self, chunksize=CHUNKSIZE):
+        """Yield (xyz, mc) views of consecutive blocks of chunksize points"""
+        for start in range(0, self._n, chunksize):
+            stop = start + chunksize
+            yield self.xyz[start:stop], self.mc[start:stop]
+
+    def __iter__(self):
+        return self.chunks()
+
+    def __len__(self):
+        """Return number of points in pos file"""
+        return self._n
+
+class POSStream():
+    """
+    Chunked .pos file reader
+
+    Reads the pos file in fixed-size blocks so only chunksize points (plus
+    readahead blocks read in the background) are held in memory at once.
+    Every iteration reopens the file, so a stream can be consumed more than
+    once (eg. one pass for bounds, one pass for binning).
+
+    Usage::
+
+      stream = POSStream("/path/to/file.pos", chunksize=2**20, readahead=2)
+      for xyz, mc in stream:
+          ...
+
+      posload.bounds(stream)                # Bounding box of all points
+    """
+
+    def __init__(self, pospath, chunksize=CHUNKSIZE, readahead=0):
+        try:
+            size = os.path.getsize(pospath)
+        except (IOError, FileNotFoundError):
+            raise ReadError('Error opening pos file %s' % pospath)
+            return
+        if size % POS_RECORD:
+            raise ReadError('Invalid pos file size %s' % pospath)
+
+        self._path = pospath
+        self._n    = size // POS_RECORD
+
+        self.chunksize = chunksize #: Number of points per yielded block
+        self.readahead = readahead #: Number of blocks read ahead in a background thread
+
+    def chunks(self, chunksize=None):
+        """Yield (xyz, mc) blocks of chunksize points read from file"""
+        if chunksize is None:
+            chunksize = self.chunksize
+        blocks = self._readblocks(chunksize)
+        if self.readahead > 0:
+            blocks = _readahead(blocks, self.readahead)
+        return blocks
+
+    def _readblocks(self, chunksize):
+        try:
+            content_file = open(self._path, 'rb')
+        except (IOError, FileNotFoundError):
+            raise ReadError('Error opening pos file %s' % self._path)
+            return
+
+        with content_file:
+            while True:
+                pos_raw = content_file.read(chunksize*POS_RECORD)
+                if not pos_raw:
+                    break
+                pos = np.frombuffer(pos_raw, dtype='>f').astype(np.float32)
+                pos = pos.reshape(-1, 4)
+                yield pos[:,0:3], pos[:,3]
+
+    def __iter__(self):
+        return self.chunks()
+
     def __len__(self):
         """Return number of points in pos file"""
         return self._n
+
+
+
+class EPOS():
+    """
+    .epos file loader
+
+    Usage::
+
+      epos = EPOS("/path/to/file.epos")             # Read whole file into memory
+      epos = EPOS("/path/to/file.epos", mmap=True)  # Memory-map file
+
+      epos.xyz, epos.mc, len(epos)    # As for POS
+      epos.fields                     # Names of all record fields
+      epos.view("tof")                # Zero-copy big-endian column view
+      epos.column("tof")              # Native-endian column, decoded once
+
+    Records are kept as a single big-endian structured array (memory-mapped
+    or read in one go). Columns are only decoded to native-endian arrays
+    when first asked for and then cached, so fields that are never used
+    (eg. voltages when only positions are drawn) cost nothing. xyz is the
+    "xyz" column: the x, y and z fields as one n x 3 array.
+
+    cache is accepted for compatibility with POS: decoded columns are always
+    cached (in memory), the file is then memory-mapped.
+    """
+
+    def __init__(self, epospath, mmap=False, cache=False):
+        with span("epos load") as s:
+            self._records = self._parsefile(epospath, mmap or cache)
+            s.count(points=len(self._records))
+        self._columns = {}
+
+        self.fields = ('xyz',) + EPOS_DTYPE.names #: Names of available columns
+
+    def _parsefile(self, path: str, mmap: bool=False) -> np.ndarray:
+        """
+        Parse input epos file into structured record array
+
+        Arguments:
+
+        * **path** - Path to epos file
+        * **mmap** - Memory-map file instead of reading it into memory
+        """
+        try:
+            size = os.path.getsize(path)
+            if size % EPOS_RECORD:
+                raise ReadError('Invalid epos file size %s' % path)
+
+            if mmap and size:
+                return np.memmap(path, dtype=EPOS_DTYPE, mode='r')
+
+            records = np.empty(size//EPOS_RECORD, dtype=EPOS_DTYPE)
+            with open(path, 'rb') as content_file:
+                content_file.readinto(records)
+            return records
+        except (IOError, FileNotFoundError):
+            raise ReadError('Error opening epos file %s' % path)
+            return
+
+    def view(self, name: str) -> np.ndarray:
+        """
+        Return zero-copy big-endian view of column name onto the records
+        ("xyz": n x 3 view of the x, y, z fields)
+        """
+        if name == 'xyz':
+            return np.ndarray((len(self._records), 3), dtype='>f4',
+                              buffer=self._records, offset=0,
+                              strides=(EPOS_RECORD, 4))
+        return self._records[name]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Return native-endian contiguous copy of column name, decoded on first
+        use and cached
+        """
+        if name not in self._columns:
+            col = np.ascontiguousarray(self.view(name))
+            self._columns[name] = _tonative(col)
+        return self._columns[name]
+
+    @property
+    def xyz(self):
+        """n x 3 float32 array of xyz points in epos file"""
+        return self.column('xyz')
+
+    @property
+    def mc(self):
+        """n x 1 float32 array of mass-to-charge ratios"""
+        return self.column('mc')
+
+    def chunks(self, chunksize=CHUNKSIZE):
+        """
+        Yield (xyz, mc) blocks of chunksize points. Columns that are not
+        decoded yet are decoded block by block and not cached.
+        """
+        for start in range(0, len(self._records), chunksize):
+            stop = start + chunksize
+            yield self._block('xyz', start, stop), self._block('mc', start, stop)
+
+    def _block(self, name, start, stop):
+        # Helper function: native-endian rows start:stop of column name
+        if name in self._columns:
+            return self._columns[name][start:stop]
+        return self.view(name)[start:stop].astype(np.float32)
+
+    def __iter__(self):
+        return self.chunks()
+
+    def __len__(self):
+        """Return number of points in epos file"""
+        return len(self._records)
+
+
+
+# === Stream reductions ===
+def bounds(chunks) -> (np.ndarray, np.ndarray):
+    """
+    Return (min, max) xyz coordinates over all points in chunks
+
+    Arguments:
+
+    * **chunks** - Iterable of (xyz, mc) blocks (POSStream or POS.chunks())
+    """
+    xyzmin = np.full(3, np.inf)
+    xyzmax = np.full(3, -np.inf)
+    for xyz, mc in chunks:
+        if len(xyz):
+            xyzmin = np.minimum(xyzmin, xyz.min(axis=0))
+            xyzmax = np.maximum(xyzmax, xyz.max(axis=0))
+    return xyzmin, xyzmax
+
+def centroid(chunks) -> np.ndarray:
+    """
+    Return mean xyz coordinate over all points in chunks
+
+    Arguments:
+
+    * **chunks** - Iterable of (xyz, mc) blocks (POSStream or POS.chunks())
+    """
+    total = np.zeros(3)
+    n = 0
+    for xyz, mc in chunks:
+        total += xyz.sum(axis=0, dtype=np.float64)
+        n += len(xyz)
+    return total/n
+
+
+
+# === Helper functions ===
+def _tonative(a):
+    # Helper function: byteswap array in place to native byte order
+    if a.dtype.isnative:
+        return a
+    return a.byteswap(inplace=True).view(a.dtype.newbyteorder())
+
+def _sidecar_paths(path):
+    # Helper function: returns (xyz, mc) sidecar paths for pos file at path,
+    # keyed by its absolute path, size and mtime
+    st = os.stat(path)
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    stem = os.path.join(CACHE_DIR, "%s-%d-%d" % (key, st.st_size, st.st_mtime_ns))
+    return stem+".xyz.npy", stem+".mc.npy"
+
+def _write_sidecars(path, xyzpath, mcpath):
+    # Helper function: decode pos file at path block by block into
+    # native-endian xyz and mc .npy files, replacing stale sidecars. Writes
+    # to temporary files of its own first, so concurrent writers (other
+    # processes) never see or remove each other's partial files
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    key = os.path.basename(xyzpath).split("-")[0]
+    for stale in glob.glob(os.path.join(CACHE_DIR, key+"-*.npy")):
+        if stale not in (xyzpath, mcpath):
+            _remove(stale)
+
+    stream = POSStream(path)
+    n = len(stream)
+    tmppaths = []
+    try:
+        for target in (xyzpath, mcpath):
+            fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix=os.path.basename(target)+".",
+                                       suffix=".tmp")
+            os.close(fd)
+            tmppaths.append(tmp)
+        xyztmp, mctmp = tmppaths
+        xyz = np.lib.format.open_memmap(xyztmp, mode='w+', dtype=np.float32, shape=(n, 3))
+        mc  = np.lib.format.open_memmap(mctmp,  mode='w+', dtype=np.float32, shape=(n,))
+
+        start = 0
+        for xyzblock, mcblock in stream:
+            stop = start + len(mcblock)
+            xyz[start:stop] = xyzblock
+            mc[start:stop] = mcblock
+            start = stop
+        xyz.flush()
+        mc.flush()
+        del xyz, mc
+
+        # Only publish complete sidecars
+        os.replace(xyztmp, xyzpath)
+        os.replace(mctmp, mcpath)
+    finally:
+        for tmp in tmppaths:
+            _remove(tmp)
+
+def _trim_cache(keep=()):
+    # Helper function: remove least recently used (oldest mtime) sidecars
+    # until those in CACHE_DIR total at most CACHE_LIMIT bytes. Paths in
+    # keep are never removed
+    files = []
+    for path in glob.glob(os.path.join(CACHE_DIR, "*.npy")):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue # Removed by another process meanwhile
+        files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for mtime, size, path in files)
+    for mtime, size, path in sorted(files):
+        if total <= CACHE_LIMIT:
+            break
+        if path not in keep:
+            _remove(path)
+            total -= size
+
+def _remove(path):
+    # Helper function: remove file at path if it (still) exists
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _loadnpy(path):
+    # Helper function: memory-map .npy file (empty arrays can't be mapped)
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path)
+
+def _readahead(blocks, depth):
+    # Helper generator: consumes blocks in a background thread, keeping up to
+    # depth blocks queued ahead of the consumer
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Returns False if the consumer has gone away
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def worker():
+        try:
+            for block in blocks:
+                if not put(block):
+                    break
+            else:
+                put(done)
+        except Exception as err:
+            put(err)
+        finally:
+            blocks.close()
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            block = q.get()
+            if block is done:
+                break
+            if isinstance(block, Exception):
+                raise block
+            yield block
+    finally:
+        stop.set()
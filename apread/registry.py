@@ -0,0 +1,165 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   registry.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Reader registry: detects pos and range file formats by extension and
+# content checks, importing format modules only when first used
+# =============================================================================
+
+import os
+import re
+import importlib
+import collections
+import numpy as np
+
+# Bytes read from the start of a file for content checks
+HEADSIZE = 4096
+
+# === Exceptions ===
+class FormatError(Exception): pass
+
+#: Registered reader: format name, kind ("pos" or "rng"), file extensions,
+#: module (relative to apread) and class name of the loader, content check
+#: sniff(head, size) -> bool and whether the check is a reliable signature
+#: (magic) that may identify files with an unknown extension
+Reader = collections.namedtuple('Reader', 'name kind extensions module attr sniff magic')
+
+# Format name -> Reader, in order of registration
+_readers = collections.OrderedDict()
+
+def register(name, kind, extensions, module, attr, sniff=None, magic=False):
+    """
+    Register loader attr of apread module for files of kind ("pos" or "rng")
+
+    The module is not imported until a file of this format is loaded, so
+    registering formats costs nothing at import time. Loader classes are
+    called as attr(path, **kwargs).
+
+    Arguments:
+
+    * **name** - Format name (eg. "pos")
+    * **extensions** - Lowercase file extensions including the dot
+    * **sniff** - sniff(head, size): True if the first HEADSIZE bytes of a
+      file of size bytes look like this format (None: extension only)
+    * **magic** - sniff checks a signature, also try it on files whose
+      extension is not registered
+    """
+    _readers[name] = Reader(name, kind, tuple(extensions), module, attr, sniff, magic)
+
+def readers(kind=None):
+    """Return list of registered readers (of kind "pos" or "rng")"""
+    return [r for r in _readers.values() if kind is None or r.kind == kind]
+
+def detect(path, kind) -> Reader:
+    """
+    Return reader of file path of kind ("pos" or "rng")
+
+    Readers registered for the file's extension are tried first, in order
+    of registration, then readers with a signature check. Raises
+    FormatError if no reader's content check accepts the file.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(HEADSIZE)
+    except (IOError, FileNotFoundError):
+        raise FormatError('Error opening %s file %s' % (kind, path))
+        return
+
+    ext = os.path.splitext(path)[1].lower()
+    byext = [r for r in readers(kind) if ext in r.extensions]
+    for reader in byext:
+        if reader.sniff is None or reader.sniff(head, size):
+            return reader
+    for reader in readers(kind):
+        if reader.magic and reader not in byext and reader.sniff(head, size):
+            return reader
+
+    if byext:
+        raise FormatError('Not a valid %s file %s' % (byext[0].name, path))
+    raise FormatError('Unknown %s file format %s' % (kind, path))
+
+def loader(reader):
+    """Return loader class of reader, importing its module on first use"""
+    module = importlib.import_module('.'+reader.module, __package__)
+    return getattr(module, reader.attr)
+
+def load(path, kind, **kwargs):
+    """Detect format of path and return loaded object (see detect())"""
+    return loader(detect(path, kind))(path, **kwargs)
+
+
+
+# === Content checks ===
+def _pos(head, size):
+    # Big-endian float32 x, y, z, m/c records, first record finite
+    if size % 16 or not size:
+        return False
+    rec = np.frombuffer(head[0:16], dtype='>f4')
+    return bool(np.isfinite(rec).all())
+
+def _epos(head, size):
+    # 44 byte records (pos fields + 7 more)
+    return size > 0 and not size % 44 and _pos(head[0:16], 16)
+
+def _apt(head, size):
+    return head[0:4] == b'APT\x00'
+
+def _ato(head, size):
+    # 8 byte header: reserved int32, version 3, then 56 byte records
+    return size >= 8 and not (size-8) % 56 and head[4:8] == b'\x03\x00\x00\x00'
+
+def _lines(head):
+    # Leading non-empty, non-comment lines of text head (None if binary)
+    if b'\x00' in head:
+        return None
+    lines = head.decode('latin-1').splitlines()
+    if len(head) == HEADSIZE:
+        lines = lines[0:-1] # Last line may be cut off
+    return [l.strip() for l in lines if l.strip() and not l.lstrip().startswith('#')]
+
+_NUMBER = r'[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?'
+_ROW = re.compile(r'^\s*%s(\s*[,;\s]\s*%s){3,}\s*$' % (_NUMBER, _NUMBER))
+
+def _text(head, size):
+    # Delimited text with at least 4 numeric columns (after a header line)
+    lines = _lines(head)
+    return bool(lines) and any(_ROW.match(l) for l in lines[0:2])
+
+def _ornl(head, size):
+    # "natoms nranges", then atom name on a line of its own
+    lines = _lines(head)
+    if not lines or len(lines) < 2:
+        return False
+    first = lines[0].split()
+    return len(first) == 2 and all(v.isdigit() for v in first) and len(lines[1].split()) == 1
+
+def _rrng(head, size):
+    lines = _lines(head)
+    return bool(lines) and lines[0].lower() in ('[ions]', '[ranges]')
+
+def _env(head, size):
+    # "nions nranges", then "name r g b" lines
+    lines = _lines(head)
+    if not lines or len(lines) < 2:
+        return False
+    first = lines[0].split()
+    return len(first) == 2 and all(v.isdigit() for v in first) and len(lines[1].split()) == 4
+
+
+
+# === Available formats ===
+register("pos",  "pos", (".pos",),  "posload", "POS",  _pos)
+register("epos", "pos", (".epos",), "posload", "EPOS", _epos)
+register("apt",  "pos", (".apt",),  "aptload", "APT",  _apt, magic=True)
+register("ato",  "pos", (".ato",),  "atoload", "ATO",  _ato, magic=True)
+register("text", "pos", (".csv", ".xyz", ".txt"), "textload", "TextPOS", _text, magic=True)
+
+register("rng",  "rng", (".rng",),  "rngload", "ORNLRNG", _ornl, magic=True)
+register("rrng", "rng", (".rrng",), "rngload", "RRNG",    _rrng, magic=True)
+register("env",  "rng", (".env",),  "rngload", "ENV",     _env,  magic=True)
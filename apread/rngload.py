@@ -11,13 +11,38 @@
 # Available range loader classes
 # =============================================================================
 
+import re
+import abc
+import hashlib
+import threading
+import collections
 import numpy as np
 
+try:
+    from ..profiling import span
+except (ImportError, ValueError):
+    # Imported as top-level package (repo root on sys.path, eg. batch.py)
+    from profiling import span
+
 class ReadError(Exception): pass
+class OverlapError(ReadError): pass
+class InvalidRngError(Exception): pass
+
+# Number of parsed range files kept in the parse cache
+PARSE_CACHE_SIZE = 64
+
+#: Result of RNG.setrange: indices of the points whose range changed, their
+#: old and new range index + 1 (0: unranged), and the names of the atoms,
+#: ions and ranges (str of range index) whose points changed
+RangeEdit = collections.namedtuple('RangeEdit', 'points old new atoms ions ranges')
 
-class ORNLRNG():
+class RNG(abc.ABC):
     """
-    ORNL range file loader
+    Range loader base class
+
+    Subclasses implement the abstract _parsefile for one range file format,
+    everything else (range/atom/ion structures, ranging and point lookup)
+    is shared.
 
     Usage::
 
@@ -27,16 +52,22 @@ class ORNLRNG():
       range.atomlist                       # List of all atoms ranged
       range.getatom("Si")                  # Returns a list of loaded pos
                                            # points matching ion "Si"
+
+    Parsed range files are cached by content hash, so loading the same
+    range file again (eg. a shared range library) skips parsing.
     """
     def __init__(self, rngpath):
         # Load raw rangefile information
-        self._rawdata = self._parsefile(rngpath)
+        with span("rng parse") as s:
+            self._rawdata = _parsecached(self, rngpath)
+            s.count(ranges=self._rawdata['nranges'])
 
         self.natoms  = self._rawdata['natoms']
         self.nranges = self._rawdata['nranges']
 
         # Internal use range/atom/ion structures
         self._ranges = None #: Internal range list (np.ndarray shape (2,nranges))
+        self._edges  = None #: Range (lower, upper, index) arrays sorted by lower bound
         self._atoms  = None #: Internal atom dictionary (atom name -> range indices)
         self._ions   = None #: Internal ion dictionary (ion name -> range indices)
 
@@ -52,14 +83,26 @@ class ORNLRNG():
 
         # Initialise loadable pos information (used by loadpos)
         self._pos    = None #: Linked pos object reference
-        self._posmap = None #: Array mapping pos points to ranges (1:1)
+        self._posmap = None #: Array mapping pos points to range index + 1 (1:1),
+                            #: 0 for unranged points (smallest fitting uint dtype)
+        self._order   = None #: Point indices grouped by posmap value (stable)
+        self._offsets = None #: Start of each posmap value's group in self._order
+
+        self.rangecounts = None #: Number of loaded points in each range
+
+        self._mcindex = None #: (point indices, m/c) of loaded pos sorted by m/c,
+                             #: built on the first setrange
+
+        self.edits = 0 #: Count of changes to the ranging of the loaded pos
+                       #: (loadpos, setrange), odd while one is in progress
 
 
 
     # === RNG file parser ===
+    @abc.abstractmethod
     def _parsefile(self, rngpath: str) -> dict:
         """
-        Parse and return input rangefile as dict
+        Parse and return input rangefile as dict (implemented by subclasses)
 
         Arguments:
 
@@ -68,43 +111,11 @@ class ORNLRNG():
         Returns:
 
         * **ranges** - nranges x 2 array of floats of defined ranges in rng
-        * **atoms** - natoms x 2 array of atom shortnames and colours
-        * **composition** - Boolean ion composition array (nranges x natoms)
-        * **natoms, nragnes** - Number of atoms and ranges in rngfile
+        * **atoms** - natoms x 4 array of atom shortnames and colours (str)
+        * **comp** - Ion composition array (nranges x natoms, atom counts)
+        * **natoms, nranges** - Number of atoms and ranges in rngfile
         """
 
-        # TODO check it's a rng file (avoid utf-8 encoding errors)
-        try:
-            with open(rngpath, 'r') as file:
-                r = [v.split() for v in file]
-        except (IOError, FileNotFoundError):
-            raise ReadError('Error opening rng file %s' % rngpath)
-            return
-
-        natoms = int(r[0][0])
-        nranges = int(r[0][1])
-        end = int((1+natoms)*2)
-
-        # shortname + colour (3 floats)
-        atoms = np.array(r[2:end:2])
-        rngs = r[int(end):int(end+nranges)] # ranges
-
-        # Read rows as numpy string array
-        rngsconv = np.array(rngs, dtype='S10')
-
-        ranges = rngsconv[:,1:3].astype('f8') # Extract ranges as
-                                              # 2 col array of floats
-        composition = rngsconv[:,3:3+natoms].astype('b') # Extract ion
-                                                         # composition array
-                                                         # as bool
-
-        return {'ranges':ranges,
-                'atoms':atoms,
-                'comp':composition,
-                'nranges':nranges,
-                'natoms':natoms,
-                }
-
 
 
     # === Range data processing functions ===
@@ -112,9 +123,15 @@ class ORNLRNG():
         # Generate internal and external range list structure
         # ===
         # Uses self._rawdata
-        # Sets self._ranges, self.rangelist
+        # Sets self._ranges, self._edges, self.rangelist
+        # ===
+        # Raises ReadError on inverted ranges, OverlapError on overlapping
+        # ranges (a point can only be mapped to a single range)
 
-        self._ranges   = self._rawdata['ranges']
+        ranges = self._rawdata['ranges']
+
+        self._ranges   = ranges
+        self._edges    = _sortranges(ranges)
         self.rangelist = range(len(self._ranges))
 
     def _genatoms(self):
@@ -151,18 +168,22 @@ class ORNLRNG():
 
         # Unique ions in omposition array from .rng file
         boolcomp = self._rawdata['comp'].astype(bool)
-        ionscomp = _unique_rows(boolcomp)
+        ionscomp, inverse = _unique_rows(boolcomp, return_inverse=True)
+
+        # Range indices grouped by ion (ascending within each ion)
+        order = np.argsort(inverse, kind='stable')
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(ionscomp)))))
 
         ions = {} # Ions string ID -> range index dictionary
         ionnames = []
+        atomnames = self._rawdata['atoms'][:,0]
 
         # Gen list of rnglist indices corresponding to the unique ions
-        for ion in ionscomp:
+        for i, ion in enumerate(ionscomp):
             # rnginds: all indices in self._ranges corresponding to current ion
-            rnginds = np.where((boolcomp == ion).all(axis=1))[0]
+            rnginds = order[offsets[i]:offsets[i+1]]
 
             # Get list of atom names in ion
-            atomnames = self._rawdata['atoms'][:,0]
             atoms = atomnames[ion]
             # Concat atom names -> ion name string
             ionname = "".join(atoms)
@@ -170,10 +191,6 @@ class ORNLRNG():
             ions[ionname] = rnginds
             ionnames.append(ionname)
 
-            print("ION", ion)
-            print("IONNAME", ions[ionname])
-            print()
-
         self._ions   = ions
         self.ionlist = ionnames
 
@@ -181,11 +198,22 @@ class ORNLRNG():
 
     # === POS ranging functions ===
     def loadpos(self, pos):
-        """Link new pos object to range file"""
-        # Sets self._pos, self._posmap
+        """
+        Link new pos object to range file
+
+        pos may be any loader providing chunks() (POS or POSStream), only
+        fully loaded POS objects support the get* point return functions.
+        """
+        # Sets self._pos, self._posmap, self._order, self._offsets,
+        # self.rangecounts
 
-        self._pos = pos
-        self._genposmap() # Map range information to loaded pos info
+        self.edits += 1
+        try:
+            self._pos = pos
+            self._mcindex = None
+            self._genposmap() # Map range information to loaded pos info
+        finally:
+            self.edits += 1
 
     def _genposmap(self):
         """
@@ -193,51 +221,247 @@ class ORNLRNG():
 
         | Called by: self.loadpos()
         | Requires: self._pos
-        | Sets: self._posmap
+        | Sets: self._posmap, self._order, self._offsets, self.rangecounts
         """
-        mc = self._pos.mc
-
-        rngmap = np.zeros(mc.shape)
-        for rngind, rng in enumerate(self._ranges):
-            rng = self._ranges[rngind,:]
-            # rngarray: 1 where mc matches current range, 0 where not
-            rngarray = ((mc > rng[0]) & (mc < rng[1])).astype(int)
-            rngarray *= (rngind + 1) # add one to differentiate between 0 indeces and
-                                     # unranged points
-            rngmap += rngarray
+        rngmap = np.zeros(len(self._pos), dtype=_posmap_dtype(self.nranges))
+        counts = np.zeros(self.nranges+1, dtype=np.intp)
+
+        # Map block by block so temporaries stay bounded by the chunk size
+        with span("ranging", points=len(self._pos)):
+            start = 0
+            for xyz, mc in self._pos.chunks():
+                stop = start + len(mc)
+                rngmap[start:stop] = self._mapmc(mc)
+                counts += np.bincount(rngmap[start:stop], minlength=self.nranges+1)
+                start = stop
 
         self._posmap = rngmap
 
+        # Grouped (CSR-style) index: points of range r are
+        # self._order[self._offsets[r+1]:self._offsets[r+2]], in file order.
+        # Stable sort of small uints is a linear radix sort.
+        with span("range index", points=len(rngmap)):
+            self._order = np.argsort(rngmap, kind='stable')
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.rangecounts = counts[1:]
+
+    def _mapmc(self, mc: np.ndarray) -> np.ndarray:
+        """
+        Return array mapping each mass-to-charge ratio in mc to its range
+        index + 1 (0 for unranged points)
+
+        Ranges are non-overlapping and sorted by lower bound, so the only
+        candidate range for a point is the last one with lower < mc: one
+        O(log nranges) search per point instead of a pass per range.
+
+        | Called by: self._genposmap(), self.rangestream()
+        """
+        lower, upper, order = self._edges
+        dtype = _posmap_dtype(self.nranges)
+        if not len(lower):
+            return np.zeros(mc.shape, dtype=dtype)
+
+        # cand: sorted index of last range with lower < mc (-1 if none)
+        cand = np.searchsorted(lower, mc, side='left') - 1
+        inrange = (cand >= 0) & (mc < upper[cand])
+
+        # add one to differentiate between 0 indeces and unranged points
+        rngmap = np.where(inrange, order[cand] + 1, 0)
+        return rngmap.astype(dtype)
+
+    def rangestream(self, chunks):
+        """
+        Range a stream of pos blocks without materialising the whole pos file
+
+        Yields (xyz, mc, rngmap) for every (xyz, mc) block in chunks, where
+        rngmap holds range index + 1 of each point (0 for unranged points).
+
+        Arguments:
+
+        * **chunks** - Iterable of (xyz, mc) blocks (eg. posload.POSStream)
+        """
+        for xyz, mc in chunks:
+            yield xyz, mc, self._mapmc(mc)
+
+
+
+    # === Range editing functions ===
+    def setrange(self, rngind: int, lower: float, upper: float) -> RangeEdit:
+        """
+        Move range rngind to lower-upper and re-range the loaded pos
+        incrementally. Returns RangeEdit of the points that changed range.
+
+        Only points whose mass-to-charge ratio lies in the old or new range
+        window are looked up (in a m/c-sorted index of the loaded pos, built
+        on first use) and mapped again. Posmap, range counts and the grouped
+        range index are patched for those points, so an edit costs time
+        proportional to the points in the windows rather than a full
+        loadpos. Without a loaded pos only the range table is updated.
+
+        Raises InvalidRngError for an unknown range, ReadError/OverlapError
+        if the new range is inverted or overlaps another (nothing changed).
+
+        Arguments:
+
+        * **rngind** - index of range in self.rangelist
+        * **lower, upper** - New range bounds
+        """
+        if not isinstance(rngind, (int, np.integer)) or not 0 <= rngind < self.nranges:
+            raise InvalidRngError('RNG.setrange: no range %s' % rngind)
+            return None
+
+        old = tuple(self._ranges[rngind])
+        ranges = self._ranges.copy()
+        ranges[rngind] = (lower, upper)
+        edges = _sortranges(ranges)
+        if self._posmap is not None and self._mcindex is None:
+            self._genmcindex()
+
+        self._rawdata['ranges'] = ranges
+        self._ranges = ranges
+        self._edges  = edges
+
+        if self._posmap is None:
+            empty = np.empty(0, dtype=np.intp)
+            return RangeEdit(empty, empty, empty, [], [], [])
+
+        self.edits += 1
+        try:
+            with span("re-ranging") as s:
+                points, oldmap, newmap = self._rerange([old, (lower, upper)])
+                s.count(points=len(points))
+        finally:
+            self.edits += 1
+
+        # Species made up of the ranges points moved in or out of
+        moved = np.bincount(oldmap, minlength=self.nranges+1) + \
+                np.bincount(newmap, minlength=self.nranges+1)
+        changed = np.flatnonzero(moved[1:])
+        atoms = [name for name in self.atomlist
+                 if np.intersect1d(self._atoms[name], changed).size]
+        ions  = [name for name in self.ionlist
+                 if np.intersect1d(self._ions[name], changed).size]
+        return RangeEdit(points, oldmap, newmap, atoms, ions, [str(r) for r in changed.tolist()])
+
+    def _rerange(self, windows):
+        """
+        Map points with mass-to-charge ratio in any (lower, upper) window of
+        windows again and patch self._posmap, self.rangecounts and the
+        grouped range index. Returns (points, old, new) of the points whose
+        posmap value changed, points in ascending order.
+
+        | Called by: self.setrange()
+        | Requires: self._posmap, self._mcindex
+        """
+        mcorder, mcsorted = self._mcindex
+
+        # Candidate points: m/c in any window, bounds inclusive. Overlapping
+        # windows are merged first so no point is taken twice
+        merged = []
+        for lo, hi in sorted(windows):
+            if merged and lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        # (bounds cast outwards to the m/c dtype: searching with float64
+        # bounds would cast the whole index)
+        t = mcsorted.dtype.type
+        cands = []
+        for lo, hi in merged:
+            start = np.searchsorted(mcsorted, np.nextafter(t(lo), t(-np.inf)), side='left')
+            stop  = np.searchsorted(mcsorted, np.nextafter(t(hi), t(np.inf)), side='right')
+            cands.append(mcorder[start:stop])
+        cands = np.concatenate(cands)
+        cands.sort()
+
+        oldmap = self._posmap[cands]
+        newmap = self._mapmc(np.asarray(self._pos.mc)[cands])
+        moved = oldmap != newmap
+        points, oldmap, newmap = cands[moved], oldmap[moved], newmap[moved]
+        if not len(points):
+            return points, oldmap, newmap
+
+        self._posmap[points] = newmap
+
+        # Patch groups of the changed posmap values in the grouped index
+        nlabels = self.nranges+1
+        removed = np.bincount(oldmap, minlength=nlabels)
+        added = np.bincount(newmap, minlength=nlabels)
+        counts = np.diff(self._offsets) - removed + added
+
+        pieces = []
+        prev = 0
+        for label in np.flatnonzero(removed + added):
+            start, stop = self._offsets[label], self._offsets[label+1]
+            pieces.append(self._order[prev:start])
+            pieces.append(_splice(self._order[start:stop],
+                                  points[oldmap == label], points[newmap == label]))
+            prev = stop
+        pieces.append(self._order[prev:])
+
+        self._order = np.concatenate(pieces)
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.rangecounts = counts[1:]
+        return points, oldmap, newmap
+
+
+
+    def _genmcindex(self):
+        # Generate m/c-sorted index of the loaded pos
+        # ===
+        # Uses self._pos
+        # Sets self._mcindex
+        # ===
+        # Raises InvalidRngError if the pos has no m/c array (streams)
+        mc = getattr(self._pos, 'mc', None)
+        if mc is None:
+            raise InvalidRngError('RNG.setrange: loaded pos has no m/c array (stream?)')
+        with span("m/c index", points=len(mc)):
+            mcorder = np.argsort(mc)
+            self._mcindex = (mcorder, np.asarray(mc)[mcorder])
+
 
 
     # === POS point return functions ===
-    # TODO find a cleaner way to vectorize this?
-    def getrange(self, rnginds: 'int or list of ints') -> np.ndarray:
+    def _pointinds(self, rnginds: 'int or list of ints') -> np.ndarray:
         """
-        Returns all xyz points matching the selected range reference(s).
+        Returns indices of all points matching the selected range
+        reference(s), grouped by range in ascending range order.
 
         Arguments:
 
         * **rnginds** - indexes of wanted range in self.ranges (int or array_like)
-        * **mc** - array of mass to charge ratios to operate on
         """
-        mc  = self._pos.mc
-        xyz = self._pos.xyz
+        if isinstance(rnginds, (int, np.integer)):
+            rnginds = [rnginds]
+        elif not isinstance(rnginds, (list, range, np.ndarray)):
+            raise InvalidRngError('APTloader.getrange input "rnginds" is not a valid int or list')
+            return None
 
         # rnginds indexing starts from 1 internally
         # 0 points in rngmap are unranged points
-        rnginds += 1
-        ind = np.zeros(mc.shape, dtype=bool)
-        if isinstance(rnginds, int):
-            ind = (self._posmap == rnginds)
-        elif isinstance(rnginds, list) or isinstance(rnginds, np.ndarray):
-            for ri in rnginds:
-                ind = np.logical_xor(ind, (self._posmap == ri))
-        else:
-            raise InvalidRngError('APTloader.getrange input "rnginds" is not a valid int or list')
-            return None
+        groups = [self._order[self._offsets[ri+1]:self._offsets[ri+2]]
+                  for ri in np.unique(np.asarray(rnginds, dtype=np.intp))]
+        if len(groups) == 1:
+            return groups[0]
+        return np.concatenate(groups) if groups else self._order[0:0]
+
+    def getrange(self, rnginds: 'int or list of ints') -> np.ndarray:
+        """
+        Returns all xyz points matching the selected range reference(s).
+
+        Points are looked up in the grouped range index, so this takes time
+        proportional to the number of points returned. Points are grouped by
+        range (ascending range index), in file order within each range.
+
+        Arguments:
 
-        return xyz[ind]
+        * **rnginds** - indexes of wanted range in self.ranges (int or array_like)
+        """
+        with span("point lookup") as s:
+            points = self._pos.xyz[self._pointinds(rnginds)]
+            s.count(points=len(points))
+        return points
 
     def getion(self, ionname: str) -> np.ndarray:
         """ Returns all points that match the selected ion.
@@ -246,9 +470,6 @@ class ORNLRNG():
 
         * **ionname** - Ion name reference in ionlist
         """
-        mc  = self._pos.mc
-        xyz = self._pos.xyz
-
         rnginds = self._ions[ionname]
         return self.getrange(rnginds)
 
@@ -259,17 +480,326 @@ class ORNLRNG():
 
         * **atomname** - Atom name reference in atomlist
         """
-        mc  = self._pos.mc
-        xyz = self._pos.xyz
-
         rnginds = self._atoms[atomname]
         return self.getrange(rnginds)
 
 
 
+    # === POS point count functions ===
+    def countrange(self, rnginds: 'int or list of ints') -> int:
+        """ Returns number of points matching the selected range reference(s).
+
+        Arguments:
+
+        * **rnginds** - indexes of wanted range in self.ranges (int or array_like)
+        """
+        rnginds = np.unique(np.asarray(rnginds, dtype=np.intp))
+        return int(self.rangecounts[rnginds].sum())
+
+    def countion(self, ionname: str) -> int:
+        """ Returns number of points that match the selected ion.
+
+        Arguments:
+
+        * **ionname** - Ion name reference in ionlist
+        """
+        return self.countrange(self._ions[ionname])
+
+    def countatom(self, atomname: str) -> int:
+        """ Returns number of points that match the selected atom.
+
+        Arguments:
+
+        * **atomname** - Atom name reference in atomlist
+        """
+        return self.countrange(self._atoms[atomname])
+
+
+
+class ORNLRNG(RNG):
+    """
+    ORNL range file loader
+
+    Usage::
+
+      range = ORNLRNG("/path/to/file.rng") # Loads and parses rangefile
+      range.loadpos(posloader_object)      # Ranges posfile
+
+      range.atomlist                       # List of all atoms ranged
+      range.getatom("Si")                  # Returns a list of loaded pos
+                                           # points matching ion "Si"
+    """
+
+    def _parsefile(self, rngpath: str) -> dict:
+        """
+        Parse and return input ORNL rng file as dict (see RNG._parsefile)
+
+        All range rows are converted to numbers in a single array
+        conversion, atom names are kept at full length.
+
+        Arguments:
+
+        * **rngpath** - Path to rng file
+        """
+        r = _readlines(rngpath, 'rng')
+
+        try:
+            natoms, nranges = (int(v) for v in r[0].split()[0:2])
+            end = int((1+natoms)*2)
+
+            # shortname + colour (3 floats)
+            atoms = np.array([v.split()[0:4] for v in r[2:end:2]]).reshape(natoms, 4)
+
+            # Range rows "index lower upper composition...", index dropped
+            rngs = r[end:end+nranges]
+            values = np.array(" ".join(v.split(None, 1)[1] for v in rngs).split(), dtype='f8')
+            if len(rngs) != nranges or len(values) != nranges*(2+natoms):
+                raise ValueError
+        except (IndexError, ValueError):
+            raise ReadError('Invalid rng file %s' % rngpath)
+            return
+
+        values = values.reshape(nranges, 2+natoms)
+        ranges = values[:,0:2].copy()            # 2 col array of floats
+        composition = values[:,2:].astype('b')   # Ion composition array
+
+        return {'ranges':ranges,
+                'atoms':atoms,
+                'comp':composition,
+                'nranges':nranges,
+                'natoms':natoms,
+                }
+
+
+
+class RRNG(RNG):
+    """
+    IVAS .rrng range file loader
+
+    Usage as for ORNLRNG. Atoms are the elements listed under [Ions], range
+    compositions are read from the "Fe:1 O:1" entries of each range and
+    atom colours from the Color of the atom's first single-atom range.
+    """
+
+    def _parsefile(self, rngpath: str) -> dict:
+        """
+        Parse and return input rrng file as dict (see RNG._parsefile)
+
+        Sections and range lines are matched with regular expressions over
+        the whole file, range bounds converted in one array conversion.
+
+        Arguments:
+
+        * **rngpath** - Path to rrng file
+        """
+        text = "\n".join(_readlines(rngpath, 'rrng'))
+
+        # [section] -> section body
+        parts = _RRNG_SECTION.split(text)
+        sections = {name.lower(): body for name, body in zip(parts[1::2], parts[2::2])}
+
+        atomnames = _RRNG_ION.findall(sections.get('ions', ''))
+        rngs = _RRNG_RANGE.findall(sections.get('ranges', ''))
+        nranges = len(rngs)
+
+        try:
+            ranges = np.array([v[0:2] for v in rngs], dtype='f8').reshape(nranges, 2)
+        except ValueError:
+            raise ReadError('Invalid range bounds in rrng file %s' % rngpath)
+            return
+
+        # Composition and colour entries of each range
+        atominds = {name: i for i, name in enumerate(atomnames)}
+        rows, cols, counts = [], [], []
+        colours = {}
+        for i, (lower, upper, fields) in enumerate(rngs):
+            entries = _RRNG_FIELD.findall(fields)
+            colour = None
+            atoms = []
+            for key, value in entries:
+                if key.lower() == 'color':
+                    colour = value
+                elif key.lower() not in ('vol', 'name'):
+                    if key not in atominds:
+                        atominds[key] = len(atomnames)
+                        atomnames.append(key)
+                    try:
+                        counts.append(int(value))
+                    except ValueError:
+                        raise ReadError('Invalid composition in rrng file %s: %s:%s' % \
+                                (rngpath, key, value))
+                    rows.append(i)
+                    cols.append(atominds[key])
+                    atoms.append(key)
+            if colour is not None and len(atoms) == 1:
+                colours.setdefault(atoms[0], colour)
+
+        natoms = len(atomnames)
+        composition = np.zeros((nranges, natoms), dtype='b')
+        composition[rows, cols] = counts
+
+        atoms = np.array([[name] + _hexcolour(colours.get(name)) for name in atomnames])
+        atoms = atoms.reshape(natoms, 4)
+
+        return {'ranges':ranges,
+                'atoms':atoms,
+                'comp':composition,
+                'nranges':nranges,
+                'natoms':natoms,
+                }
+
+
+
+class ENV(RNG):
+    """
+    IVAS/3Depict .env range file loader
+
+    Usage as for ORNLRNG. The file lists "nions nranges", then one
+    "name r g b" line per ion and one "name lower upper" line per range
+    ("#" starts a comment). Env files carry no ion compositions, so every
+    ion name is an atom of its own.
+    """
+
+    def _parsefile(self, rngpath: str) -> dict:
+        """
+        Parse and return input env file as dict (see RNG._parsefile)
+
+        Arguments:
+
+        * **rngpath** - Path to env file
+        """
+        r = [v.split('#')[0].split() for v in _readlines(rngpath, 'env')]
+        r = [v for v in r if v]
+
+        try:
+            natoms, nranges = int(r[0][0]), int(r[0][1])
+            atoms = np.array([v[0:4] for v in r[1:1+natoms]]).reshape(natoms, 4)
+            atominds = {name: i for i, name in enumerate(atoms[:,0])}
+
+            rngs = r[1+natoms:1+natoms+nranges]
+            ranges = np.array([v[1:3] for v in rngs], dtype='f8').reshape(nranges, 2)
+            cols = [atominds[v[0]] for v in rngs]
+        except (IndexError, KeyError, ValueError):
+            raise ReadError('Invalid env file %s' % rngpath)
+            return
+
+        composition = np.zeros((nranges, natoms), dtype='b')
+        composition[np.arange(nranges), cols] = 1
+
+        return {'ranges':ranges,
+                'atoms':atoms,
+                'comp':composition,
+                'nranges':nranges,
+                'natoms':natoms,
+                }
+
+
+
 # === Helper functions ===
-def _unique_rows(a):
-    # Helper function: returns unique rows in np 2d array
+def _posmap_dtype(nranges):
+    # Helper function: smallest unsigned int dtype holding 0..nranges
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if nranges <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+def _sortranges(ranges):
+    # Helper function: (lower, upper, index) arrays of ranges (nranges x 2)
+    # sorted by lower bound, so each point can be matched to its range with
+    # a single binary search (see RNG._mapmc).
+    # Raises ReadError on inverted ranges, OverlapError on overlapping
+    # ranges (a point can only be mapped to a single range)
+    inverted = (ranges[:,0] >= ranges[:,1]).nonzero()[0]
+    if len(inverted):
+        raise ReadError('Invalid ranges in rng file: %s' % list(inverted))
+
+    order = np.argsort(ranges[:,0], kind='stable')
+    lower = ranges[order,0]
+    upper = ranges[order,1]
+
+    overlaps = (lower[1:] < upper[:-1]).nonzero()[0]
+    if len(overlaps):
+        pairs = [(int(order[i]), int(order[i+1])) for i in overlaps]
+        raise OverlapError('Overlapping ranges in rng file: %s' % pairs)
+    return lower, upper, order
+
+def _splice(group, remove, add):
+    # Helper function: sorted array group without the indices remove (all in
+    # group) and with the indices add (none in group); remove/add sorted
+    keep = np.ones(len(group), dtype=bool)
+    keep[np.searchsorted(group, remove)] = False
+    group = group[keep]
+    return np.insert(group, np.searchsorted(group, add), add)
+
+def _unique_rows(a, return_inverse=False):
+    # Helper function: returns unique rows in np 2d array (and the index of
+    # each row of a in them if return_inverse)
     a = np.ascontiguousarray(a)
-    unique_a = np.unique(a.view([('', a.dtype)]*a.shape[1]))
-    return unique_a.view(a.dtype).reshape((unique_a.shape[0], a.shape[1]))
+    if a.dtype == bool and a.shape[1] < 64:
+        # Bool rows as integers (first column most significant) sort in the
+        # same order as the rows, far faster than sorting structured rows
+        weights = np.uint64(1) << np.arange(a.shape[1]-1, -1, -1, dtype=np.uint64)
+        keys = a.astype(np.uint64).dot(weights)
+        keys, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        unique_a = a[index]
+    else:
+        unique_a, inverse = np.unique(a.view([('', a.dtype)]*a.shape[1]).reshape(-1),
+                                      return_inverse=True)
+        unique_a = unique_a.view(a.dtype).reshape((unique_a.shape[0], a.shape[1]))
+    if return_inverse:
+        return unique_a, inverse.reshape(-1)
+    return unique_a
+
+def _readlines(rngpath, kind):
+    # Helper function: lines of range file rngpath (undecodable bytes
+    # replaced), ReadError naming file kind if it can't be opened
+    try:
+        with open(rngpath, 'r', errors='replace') as file:
+            return file.read().splitlines()
+    except (IOError, FileNotFoundError):
+        raise ReadError('Error opening %s file %s' % (kind, rngpath))
+        return
+
+# rrng "[Section]" header, "IonN=name" and "RangeN=lower upper fields..."
+# lines and "key:value" range fields
+_RRNG_SECTION = re.compile(r'^[ \t]*\[(\w+)\][ \t]*$', re.M)
+_RRNG_ION     = re.compile(r'^[ \t]*Ion\d+[ \t]*=[ \t]*(\S+)', re.M | re.I)
+_RRNG_RANGE   = re.compile(r'^[ \t]*Range\d+[ \t]*=[ \t]*(\S+)[ \t]+(\S+)(.*)$', re.M | re.I)
+_RRNG_FIELD   = re.compile(r'([^\s:]+):(\S+)')
+
+def _hexcolour(colour):
+    # Helper function: ["r", "g", "b"] strings (0-1) of rrng hex colour
+    # "FF8000", grey if None
+    try:
+        return ["%.4f" % (int(colour[i:i+2], 16)/255) for i in (0, 2, 4)]
+    except (TypeError, ValueError):
+        return ["0.5000"]*3
+
+# Parse cache: (loader class, file content SHA-1) -> raw range data
+_parsecache = collections.OrderedDict()
+_parselock = threading.Lock()
+
+def _parsecached(loader, rngpath):
+    # Helper function: loader._parsefile(rngpath), reusing the result for
+    # files of identical contents (up to PARSE_CACHE_SIZE files). Returns a
+    # copy, so loaders may modify their raw data
+    try:
+        with open(rngpath, 'rb') as file:
+            key = (type(loader), hashlib.sha1(file.read()).hexdigest())
+    except (IOError, FileNotFoundError):
+        raise ReadError('Error opening rng file %s' % rngpath)
+        return
+
+    with _parselock:
+        rawdata = _parsecache.get(key)
+        if rawdata is not None:
+            _parsecache.move_to_end(key)
+    if rawdata is None:
+        rawdata = loader._parsefile(rngpath)
+        with _parselock:
+            _parsecache[key] = rawdata
+            while len(_parsecache) > PARSE_CACHE_SIZE:
+                _parsecache.popitem(last=False)
+
+    return {k: v.copy() if isinstance(v, np.ndarray) else v
+            for k, v in rawdata.items()}
@@ -0,0 +1,127 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from apread import aptload, registry
+from apread.aptload import APT, APT_HEADER, SEC_HEADER
+from apread.posload import ReadError
+
+def wchar(text, nchars):
+    # Null-padded UTF-16 (wchar) field of nchars characters
+    return np.void(text.encode('utf-16-le').ljust(2*nchars, b'\0'))
+
+def section(name, datatype, typebits, values, unit="", recordtype=1):
+    # Section header then records of values (records x ...)
+    header = np.zeros(1, dtype=SEC_HEADER)
+    header['signature'] = b'SEC'
+    header['headersize'] = SEC_HEADER.itemsize
+    header['version'] = 2
+    header['type'] = wchar(name, 32)
+    header['secversion'] = 1
+    header['relation'] = 1
+    header['recordtype'] = recordtype
+    header['datatype'] = datatype
+    header['typebits'] = typebits
+    header['recordsize'] = values[0].nbytes
+    header['unit'] = wchar(unit, 16)
+    header['records'] = len(values)
+    header['bytecount'] = values.nbytes
+    return header.tobytes() + values.tobytes()
+
+class ReadCounter():
+    # Stands in for open() in aptload, counting the bytes read from files
+    def __init__(self):
+        self.nbytes = 0
+
+    def __call__(self, path, mode='r'):
+        f = io.open(path, mode)
+        read = f.read
+        def counted(size=-1):
+            data = read(size)
+            self.nbytes += len(data)
+            return data
+        f.read = counted
+        return f
+
+# Synthetic apt file: fixed size sections of every data type plus a
+# variable size one, which is skipped
+rs = np.random.RandomState(6)
+n = 50000
+xyz = rs.uniform(-30, 30, (n, 3)).astype('<f4')
+mc = rs.uniform(0, 100, n).astype('<f4')
+tof = rs.uniform(0, 1000, n).astype('<f8')
+multiplicity = rs.randint(1, 4, n).astype('<u4')
+pulse = rs.randint(-2**40, 2**40, n).astype('<i8')
+
+header = np.zeros(1, dtype=APT_HEADER)
+header['signature'] = b'APT'
+header['headersize'] = APT_HEADER.itemsize
+header['version'] = 2
+header['filename'] = wchar("synthetic.apt", 256)
+header['ions'] = n
+sections = [section("tof", 3, 64, tof, "ns"),
+            section("Position", 3, 32, xyz, "nm"),
+            section("Comment", 4, 8, np.array([b"variable"]), recordtype=2),
+            section("Multiplicity", 2, 32, multiplicity),
+            section("pulse", 1, 64, pulse),
+            section("Mass", 3, 32, mc, "Da")]
+
+tmp = tempfile.mkdtemp()
+path = os.path.join(tmp, "synthetic.apt")
+with open(path, 'wb') as f:
+    f.write(header.tobytes() + b"".join(sections))
+
+# Opening reads the file and section headers only
+counter = ReadCounter()
+aptload.open = counter
+try:
+    apt = APT(path)
+finally:
+    del aptload.open
+headers = APT_HEADER.itemsize + len(sections)*SEC_HEADER.itemsize
+print("Opened reading", counter.nbytes, "of", os.path.getsize(path), "bytes")
+assert counter.nbytes == headers
+assert not apt._arrays
+
+assert len(apt) == n
+assert list(apt.sections) == ["tof", "Position", "Multiplicity", "pulse", "Mass"]
+assert apt.sections["Position"].shape == (3,) and apt.sections["Position"].unit == "nm"
+assert apt.sections["tof"].dtype == np.dtype('<f8')
+assert apt.sections["pulse"].dtype == np.dtype('<i8')
+
+# Section values, memory-mapped or read, and kept
+for mmap in (True, False):
+    apt = APT(path, mmap=mmap)
+    assert isinstance(apt.xyz, np.memmap) == mmap
+    assert np.array_equal(apt.xyz, xyz) and np.array_equal(apt.mc, mc)
+    assert np.array_equal(apt.section("tof"), tof)
+    assert np.array_equal(apt.section("Multiplicity"), multiplicity)
+    assert np.array_equal(apt.section("pulse"), pulse)
+    assert apt.section("tof") is apt.section("tof")
+    blocks = list(apt.chunks(7000))
+    assert np.array_equal(np.concatenate([m for x, m in blocks]), mc)
+print("Sections match written values")
+
+assert isinstance(registry.load(path, 'pos'), APT)
+
+# Truncated payloads, missing sections, other files
+raw = open(path, 'rb').read()
+bad = os.path.join(tmp, "bad.apt")
+for name, data in (("truncated", raw[:-10]),
+                   ("no Mass", header.tobytes() + b"".join(sections[:-1])),
+                   ("bad section", raw + b"\0"*SEC_HEADER.itemsize),
+                   ("not apt", b"\0"*len(raw))):
+    with open(bad, 'wb') as f:
+        f.write(data)
+    try:
+        APT(bad)
+        assert False, name
+    except ReadError as e:
+        print("%s:" % name.capitalize(), e)
+
+shutil.rmtree(tmp)
+print("OK")
@@ -0,0 +1,78 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from apread import registry
+from apread.posload import EPOS, EPOS_DTYPE, EPOS_RECORD, ReadError, bounds
+
+# Synthetic epos file: every field distinct, integer fields beyond 16 bits
+# so a wrong byte order or field offset shows
+rs = np.random.RandomState(5)
+n = 30000
+records = np.empty(n, dtype=EPOS_DTYPE)
+for name in EPOS_DTYPE.names:
+    if EPOS_DTYPE[name].kind == 'i':
+        records[name] = rs.randint(-2**30, 2**30, n)
+    else:
+        records[name] = rs.uniform(-100, 100, n)
+
+tmp = tempfile.mkdtemp()
+path = os.path.join(tmp, "fields.epos")
+records.tofile(path)
+assert EPOS_RECORD == 44 and os.path.getsize(path) == n*EPOS_RECORD
+
+for mmap in (False, True):
+    epos = EPOS(path, mmap=mmap)
+    assert len(epos) == n
+    assert epos.fields == ('xyz',) + EPOS_DTYPE.names
+
+    # Zero-copy views are big-endian onto the records
+    assert np.array_equal(epos.view('xyz'), np.column_stack((records['x'], records['y'], records['z'])))
+    for name in EPOS_DTYPE.names:
+        assert np.array_equal(epos.view(name), records[name])
+
+    # Columns: native-endian contiguous copies, decoded once
+    assert not epos._columns
+    for name in epos.fields:
+        col = epos.column(name)
+        assert col.dtype.isnative and col.flags['C_CONTIGUOUS']
+        assert col.dtype.kind == EPOS_DTYPE[name if name != 'xyz' else 'x'].kind
+        assert np.array_equal(col, epos.view(name))
+        assert epos.column(name) is col
+    assert epos.xyz is epos.column('xyz') and epos.xyz.shape == (n, 3)
+    assert epos.mc is epos.column('mc')
+print("EPOS fields match records, columns native-endian and cached")
+
+# Blocks: undecoded columns are decoded per block and not cached
+epos = EPOS(path)
+blocks = list(epos.chunks(7000))
+assert not epos._columns
+assert np.array_equal(np.concatenate([xyz for xyz, mc in blocks]), epos.view('xyz'))
+assert np.array_equal(np.concatenate([mc for xyz, mc in blocks]), records['mc'])
+assert all(xyz.dtype.isnative and mc.dtype.isnative for xyz, mc in blocks)
+xyzmin, xyzmax = bounds(epos)
+assert np.array_equal(xyzmin, epos.xyz.min(axis=0)) and np.array_equal(xyzmax, epos.xyz.max(axis=0))
+print("EPOS chunks match columns")
+
+# Detected by extension and size
+assert isinstance(registry.load(path, 'pos'), EPOS)
+
+# Invalid sizes and missing files
+with open(path, 'ab') as f:
+    f.write(b"\0"*4)
+try:
+    EPOS(path)
+    assert False
+except ReadError as e:
+    print("Truncated:", e)
+try:
+    EPOS(os.path.join(tmp, "missing.epos"))
+    assert False
+except ReadError as e:
+    print("Missing:", e)
+
+shutil.rmtree(tmp)
+print("OK")
@@ -0,0 +1,118 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from apread import registry
+from apread.posload import EPOS_DTYPE, ReadError
+
+# Loader modules are only imported when a file of their format is loaded
+assert 'apread.atoload' not in sys.modules and 'apread.textload' not in sys.modules
+
+rngpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data/R04.rng")
+
+rs = np.random.RandomState(7)
+n = 2000
+xyz = rs.uniform(-40, 40, (n, 3)).astype(np.float32)
+mc = rs.uniform(0, 65, n).astype(np.float32)
+
+tmp = tempfile.mkdtemp()
+def write(name, data):
+    path = os.path.join(tmp, name)
+    with open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+    return path
+
+# One file of every format
+pos = np.column_stack((xyz, mc)).astype('>f4').tobytes()
+epos = np.zeros(n, dtype=EPOS_DTYPE)
+for axis, name in enumerate("xyz"):
+    epos[name] = xyz[:,axis]
+epos['mc'] = mc
+ato = np.zeros((n, 14), dtype='<f4')
+ato[:,0:3] = xyz
+ato[:,3] = mc
+ato[:,7] = rs.uniform(0, 1000, n) # tof
+ato = np.array([0, 3], dtype='<i4').tobytes() + ato.tobytes()
+rows = np.column_stack((xyz, mc, np.arange(n)))
+csv = "x,y,z,m/c,id\n" + "\n".join(",".join("%.9g" % v for v in row) for row in rows) + "\n"
+txt = "# x y z m/c\n" + "\n".join(" ".join("%.9g" % v for v in row[0:4]) for row in rows) + "\n"
+rrng = "[Ions]\nNumber=1\nIon1=Si\n[Ranges]\nNumber=1\nRange1=27.5 28.5 Vol:0.02 Si:1 Color:FF0000\n"
+env = "# env\n1 1\nSi 1.0 0.0 0.0\nSi 27.5 28.5\n"
+
+formats = [("pos", "pos", "a.pos", pos),
+           ("epos", "pos", "a.epos", epos.tobytes()),
+           ("apt", "pos", "a.apt", b"APT\x00" + b"\0"*1000),
+           ("ato", "pos", "a.ato", ato),
+           ("text", "pos", "a.csv", csv),
+           ("text", "pos", "a.xyz", txt),
+           ("text", "pos", "a.txt", txt.replace(" ", ";")),
+           ("rng", "rng", "a.rng", open(rngpath).read()),
+           ("rrng", "rng", "a.rrng", rrng),
+           ("env", "rng", "a.env", env)]
+for name, kind, filename, data in formats:
+    path = write(filename, data)
+    assert registry.detect(path, kind).name == name, filename
+    if kind == 'pos' and name != "apt":
+        assert len(registry.load(path, kind)) == n
+print("Formats detected by extension:", ", ".join(f[2] for f in formats))
+
+# Signature formats are also found under other extensions
+for name, kind, filename, data in formats:
+    reader = registry._readers[name]
+    if reader.magic:
+        assert registry.detect(write("noext", data), kind).name == name, name
+        assert registry.detect(write("other.dat", data), kind).name == name, name
+print("Signature formats detected without their extension")
+
+# Unknown, empty and mismatched files are rejected
+for filename, data, kind in (("empty.pos", b"", 'pos'),
+                             ("empty.rng", "", 'rng'),
+                             ("empty", b"", 'pos'),
+                             ("junk.dat", b"\x01\x02\x03", 'pos'),
+                             ("junk.rng", b"\x01\x02\x03", 'rng'),
+                             ("short.pos", pos[:-3], 'pos'),
+                             ("short.ato", ato[:-3], 'pos'),
+                             ("rng.pos", open(rngpath).read(), 'pos'),
+                             ("pos.rng", pos, 'rng')):
+    try:
+        reader = registry.detect(write(filename, data), kind)
+        assert False, "%s detected as %s" % (filename, reader.name)
+    except registry.FormatError as e:
+        print("Rejected:", e)
+try:
+    registry.detect(os.path.join(tmp, "missing.pos"), 'pos')
+    assert False
+except registry.FormatError as e:
+    print("Rejected:", e)
+
+# Round-trips: ATO and text files give back the values written
+tof = np.frombuffer(ato, dtype='<f4', offset=8).reshape(n, 14)[:,7]
+for mmap in (False, True):
+    a = registry.load(os.path.join(tmp, "a.ato"), 'pos', mmap=mmap)
+    assert type(a).__name__ == "ATO"
+    assert np.array_equal(a.xyz, xyz) and np.array_equal(a.mc, mc)
+    assert a.xyz.dtype.isnative and np.array_equal(a.column('tof'), tof)
+for filename in ("a.csv", "a.xyz", "a.txt"):
+    t = registry.load(os.path.join(tmp, filename), 'pos')
+    assert type(t).__name__ == "TextPOS"
+    assert np.array_equal(t.xyz, xyz) and np.array_equal(t.mc, mc), filename
+print("ATO and text files round-trip")
+
+write("bad.ato", b"\0\0\0\0\x02\0\0\0" + ato[8:])
+try:
+    registry.loader(registry._readers["ato"])(os.path.join(tmp, "bad.ato"))
+    assert False
+except ReadError as e:
+    print("Rejected:", e)
+write("bad.csv", "1,2,3,4\n1,2,x,4\n")
+try:
+    registry.load(os.path.join(tmp, "bad.csv"), 'pos')
+    assert False
+except ReadError as e:
+    print("Rejected:", e)
+
+shutil.rmtree(tmp)
+print("OK")
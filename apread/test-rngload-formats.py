@@ -0,0 +1,126 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from apread import rngload
+from apread.rngload import ORNLRNG, RRNG, ENV
+from apread.posload import POS
+
+rngpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data/R04.rng")
+
+def ornl(atoms, ranges, comp):
+    # ORNL .rng text of atoms (name, r, g, b), ranges and compositions
+    lines = ["%d %d" % (len(atoms), len(ranges))]
+    for name, r, g, b in atoms:
+        lines += [name, "%s %s %s %s" % (name, r, g, b)]
+    lines.append("-"*17 + " " + " ".join(a[0] for a in atoms))
+    for i, ((lower, upper), row) in enumerate(zip(ranges, comp)):
+        lines.append("%d %.4f %.4f " % (i+1, lower, upper) + " ".join(map(str, row)))
+    return "\n".join(lines) + "\n"
+
+def rrng(atoms, ranges, comp):
+    # IVAS .rrng text of the same, range colour of the first atom
+    lines = ["[Ions]", "Number=%d" % len(atoms)]
+    lines += ["Ion%d=%s" % (i+1, a[0]) for i, a in enumerate(atoms)]
+    lines += ["[Ranges]", "Number=%d" % len(ranges)]
+    for i, ((lower, upper), row) in enumerate(zip(ranges, comp)):
+        fields = " ".join("%s:%d" % (a[0], c) for a, c in zip(atoms, row) if c)
+        colour = "".join("%02X" % int(round(float(v)*255)) for v in atoms[np.flatnonzero(row)[0]][1:4])
+        lines.append("Range%d=%.4f %.4f Vol:0.01000 %s Color:%s" % (i+1, lower, upper, fields, colour))
+    return "\n".join(lines) + "\n"
+
+def env(atoms, ranges, comp):
+    # .env text of the same (single-atom ranges only)
+    lines = ["# Synthetic env", "%d %d" % (len(atoms), len(ranges))]
+    lines += ["%s %s %s %s" % tuple(a) for a in atoms]
+    lines += ["%s %.4f %.4f" % (atoms[np.flatnonzero(row)[0]][0], lower, upper)
+              for (lower, upper), row in zip(ranges, comp)]
+    return "\n".join(lines) + "\n"
+
+def check_same(rng, ref, pos):
+    # Same ranges, atoms (names, colours, ranges), ions and ranged points
+    assert rng.nranges == ref.nranges and rng.natoms == ref.natoms
+    assert np.array_equal(rng._ranges, ref._ranges)
+    assert list(rng.atomlist) == list(ref.atomlist)
+    assert np.allclose(rng._rawdata['atoms'][:,1:].astype(float),
+                       ref._rawdata['atoms'][:,1:].astype(float))
+    for name in ref.atomlist:
+        assert np.array_equal(rng._atoms[name], ref._atoms[name])
+    assert rng.ionlist == ref.ionlist
+    for name in ref.ionlist:
+        assert np.array_equal(rng._ions[name], ref._ions[name])
+    rng.loadpos(pos)
+    ref.loadpos(pos)
+    assert np.array_equal(rng._posmap, ref._posmap)
+
+# Synthetic pos file, m/c uniform over all ranges
+rs = np.random.RandomState(8)
+mc = rs.uniform(0, 65, 50000).astype(np.float32)
+xyz = rs.uniform(-20, 20, (len(mc), 3)).astype(np.float32)
+
+tmp = tempfile.mkdtemp()
+pospath = os.path.join(tmp, "formats.pos")
+np.column_stack((xyz, mc)).astype('>f4').tofile(pospath)
+pos = POS(pospath)
+
+# Single-atom ranges of R04.rng: same in all three formats
+ref = ORNLRNG(rngpath)
+atoms, ranges, comp = ref._rawdata['atoms'], ref._rawdata['ranges'], ref._rawdata['comp']
+for loader, text, ext in ((RRNG, rrng, ".rrng"), (ENV, env, ".env")):
+    path = os.path.join(tmp, "R04"+ext)
+    with open(path, 'w') as f:
+        f.write(text(atoms, ranges, comp))
+    check_same(loader(path), ORNLRNG(rngpath), pos)
+    print("%s matches ORNL rng: %d ranges, atoms %s" % \
+            (loader.__name__, ref.nranges, ", ".join(ref.atomlist)))
+
+# Molecular ions (rrng compositions), listed in another atom order
+atoms = np.array([['O', '1.00', '0.00', '0.00'], ['Fe', '0.00', '0.40', '1.00'],
+                  ['H', '0.20', '0.20', '0.20']])
+ranges = np.array([[15.9, 16.1], [17.9, 18.1], [27.9, 28.1], [36.0, 36.2], [1.0, 1.1]])
+comp = np.array([[1, 0, 0], [1, 0, 2], [0, 1, 0], [2, 0, 0], [0, 0, 1]])
+for ext, text in ((".rng", ornl), (".rrng", rrng)):
+    with open(os.path.join(tmp, "mol"+ext), 'w') as f:
+        f.write(text(atoms, ranges, comp))
+rng = RRNG(os.path.join(tmp, "mol.rrng"))
+check_same(rng, ORNLRNG(os.path.join(tmp, "mol.rng")), pos)
+assert np.array_equal(rng._rawdata['comp'], comp)
+print("RRNG molecular ions match ORNL rng:", rng.ionlist)
+
+# Parse cache: loaders get copies, editing one changes neither the cache
+# nor other loaders of the same file
+first = ORNLRNG(rngpath)
+second = ORNLRNG(rngpath)
+assert first._rawdata is not second._rawdata
+for key in ('ranges', 'atoms', 'comp'):
+    assert not np.shares_memory(first._rawdata[key], second._rawdata[key])
+lower, upper = first._ranges[0]
+first.loadpos(pos)
+first.setrange(0, lower + 0.05, upper - 0.05)
+first._rawdata['comp'][0] = 0
+first._rawdata['atoms'][0, 1] = '0.00'
+third = ORNLRNG(rngpath)
+for loaded in (second, third):
+    assert np.array_equal(loaded._ranges, ref._ranges)
+    assert np.array_equal(loaded._rawdata['comp'], ref._rawdata['comp'])
+    assert np.array_equal(loaded._rawdata['atoms'], ref._rawdata['atoms'])
+assert not np.array_equal(first._ranges, ref._ranges)
+for (loader, digest), rawdata in rngload._parsecache.items():
+    if loader is ORNLRNG:
+        for key in ('ranges', 'atoms', 'comp'):
+            assert not np.shares_memory(rawdata[key], first._rawdata[key])
+print("Edited copy leaves parse cache unchanged")
+
+# Identical contents at another path reuse the cached parse, entries are
+# kept per loader class
+ncached = len(rngload._parsecache)
+shutil.copyfile(rngpath, os.path.join(tmp, "R04.rng"))
+assert np.array_equal(ORNLRNG(os.path.join(tmp, "R04.rng"))._ranges, ref._ranges)
+assert len(rngload._parsecache) == ncached
+assert {loader for loader, digest in rngload._parsecache} == {ORNLRNG, RRNG, ENV}
+
+shutil.rmtree(tmp)
+print("OK")
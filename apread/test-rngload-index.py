@@ -0,0 +1,60 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from apread.rngload import ORNLRNG
+from apread.posload import POS
+
+rngpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data/R04.rng")
+
+def mask(rng, rnginds):
+    # Reference: boolean mask selection, as points were looked up before the
+    # grouped range index
+    ind = np.zeros(len(rng._posmap), dtype=bool)
+    for ri in np.unique(rnginds):
+        ind |= (rng._posmap == ri+1)
+    return ind
+
+# Synthetic pos file, m/c uniform over all ranges
+rs = np.random.RandomState(1)
+mc = rs.uniform(0, 65, 100000).astype(np.float32)
+xyz = rs.uniform(-20, 20, (len(mc), 3)).astype(np.float32)
+
+tmp = tempfile.mkdtemp()
+pospath = os.path.join(tmp, "index.pos")
+np.column_stack((xyz, mc)).astype('>f4').tofile(pospath)
+
+rngfile = ORNLRNG(rngpath)
+posfile = POS(pospath)
+rngfile.loadpos(posfile)
+
+# Single ranges: same points in the same (file) order
+for ri in rngfile.rangelist:
+    ind = mask(rngfile, [ri])
+    assert np.array_equal(rngfile.getrange(ri), posfile.xyz[ind])
+    assert rngfile.countrange(ri) == ind.sum()
+print("Ranges match boolean mask selection")
+
+# Range lists, atoms and ions: same points, grouped by range
+for rnginds in ([0, 1], [7, 2, 5], [3, 3], list(rngfile.rangelist)):
+    ind = mask(rngfile, rnginds)
+    assert np.array_equal(np.sort(rngfile._pointinds(rnginds)), np.flatnonzero(ind))
+    assert rngfile.countrange(rnginds) == ind.sum()
+
+for name in rngfile.atomlist:
+    ind = mask(rngfile, rngfile._atoms[name])
+    assert len(rngfile.getatom(name)) == rngfile.countatom(name) == ind.sum()
+    assert np.array_equal(np.sort(rngfile._pointinds(rngfile._atoms[name])), np.flatnonzero(ind))
+    print("Atom", name, len(rngfile.getatom(name)))
+
+for name in rngfile.ionlist:
+    ind = mask(rngfile, rngfile._ions[name])
+    assert len(rngfile.getion(name)) == rngfile.countion(name) == ind.sum()
+    assert np.array_equal(np.sort(rngfile._pointinds(rngfile._ions[name])), np.flatnonzero(ind))
+print("Atoms and ions match boolean mask selection")
+
+shutil.rmtree(tmp)
+print("OK")
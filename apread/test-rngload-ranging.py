@@ -0,0 +1,52 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from apread.rngload import ORNLRNG
+from apread.posload import POS, POSStream
+
+rngpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data/R04.rng")
+
+def posmap_loop(rng, mc):
+    # Reference: one pass per range, as ranging was done before the binary
+    # search (bounds exclusive)
+    rngmap = np.zeros(mc.shape)
+    for rngind in range(rng.nranges):
+        r = rng._ranges[rngind,:]
+        rngmap += ((mc > r[0]) & (mc < r[1])).astype(int)*(rngind + 1)
+    return rngmap
+
+# Synthetic pos file: uniform m/c over all ranges, plus points exactly on
+# every range bound
+rngfile = ORNLRNG(rngpath)
+rs = np.random.RandomState(0)
+mc = np.concatenate((rs.uniform(0, 65, 200000),
+                     rngfile._ranges.ravel(),
+                     rngfile._ranges.ravel()*(1+1e-7))).astype(np.float32)
+xyz = rs.uniform(-20, 20, (len(mc), 3)).astype(np.float32)
+
+tmp = tempfile.mkdtemp()
+pospath = os.path.join(tmp, "ranging.pos")
+np.column_stack((xyz, mc)).astype('>f4').tofile(pospath)
+
+print("Ranging", len(mc), "points with", rngfile.nranges, "ranges")
+posfile = POS(pospath)
+rngfile.loadpos(posfile)
+ref = posmap_loop(rngfile, posfile.mc)
+assert np.array_equal(rngfile._posmap, ref)
+print("POS map matches per-range loop")
+
+# Streamed ranging gives the same map, block by block
+stream = POSStream(pospath, chunksize=4096)
+streammap = np.concatenate([m for xyz, mc, m in rngfile.rangestream(stream)])
+assert np.array_equal(streammap, ref)
+print("Stream map matches per-range loop")
+
+print("Counts:", rngfile.rangecounts)
+assert np.array_equal(rngfile.rangecounts,
+                      np.bincount(ref.astype(int), minlength=rngfile.nranges+1)[1:])
+shutil.rmtree(tmp)
+print("OK")
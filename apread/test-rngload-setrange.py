@@ -0,0 +1,75 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from apread.rngload import ORNLRNG, ReadError, OverlapError, InvalidRngError
+from apread.posload import POS
+
+rngpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data/R04.rng")
+
+# Synthetic pos file, m/c uniform over all ranges
+rs = np.random.RandomState(3)
+mc = rs.uniform(0, 65, 100000).astype(np.float32)
+xyz = rs.uniform(-20, 20, (len(mc), 3)).astype(np.float32)
+
+tmp = tempfile.mkdtemp()
+pospath = os.path.join(tmp, "setrange.pos")
+np.column_stack((xyz, mc)).astype('>f4').tofile(pospath)
+
+posfile = POS(pospath)
+rngfile = ORNLRNG(rngpath)
+rngfile.loadpos(posfile)
+
+# Reference: range file with the same ranges, pos loaded from scratch
+ref = ORNLRNG(rngpath)
+
+edits = 0
+for n in range(40):
+    ri = rs.randint(rngfile.nranges)
+    lower, upper = rngfile._ranges[ri] + rs.uniform(-0.3, 0.3, 2)
+    oldmap = rngfile._posmap.copy()
+    count = rngfile.edits
+    try:
+        edit = rngfile.setrange(ri, lower, upper)
+    except ReadError:
+        # Inverted or overlapping: nothing changed
+        assert np.array_equal(rngfile._posmap, oldmap)
+        assert rngfile.edits == count
+        continue
+    edits += 1
+    # Edit counter: odd only while re-ranging
+    assert rngfile.edits == count + 2
+
+    ref._rawdata['ranges'] = rngfile._ranges.copy()
+    ref._genranges()
+    ref.loadpos(posfile)
+    assert np.array_equal(rngfile._posmap, ref._posmap)
+    assert np.array_equal(rngfile._order, ref._order)
+    assert np.array_equal(rngfile._offsets, ref._offsets)
+    assert np.array_equal(rngfile.rangecounts, ref.rangecounts)
+    for name in rngfile.atomlist:
+        assert np.array_equal(rngfile.getatom(name), ref.getatom(name))
+
+    # RangeEdit lists exactly the points that changed
+    changed = np.flatnonzero(oldmap != ref._posmap)
+    assert np.array_equal(edit.points, changed)
+    assert np.array_equal(edit.old, oldmap[changed])
+    assert np.array_equal(edit.new, ref._posmap[changed])
+print("Edits matching full reload:", edits, "last:", edit.ranges, edit.atoms, len(edit.points))
+
+try:
+    rngfile.setrange(rngfile.nranges, 1, 2)
+    assert False
+except InvalidRngError as e:
+    print("Unknown range:", e)
+try:
+    rngfile.setrange(0, 10, 100)
+    assert False
+except OverlapError as e:
+    print("Overlap:", e)
+
+shutil.rmtree(tmp)
+print("OK")
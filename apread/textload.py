@@ -0,0 +1,102 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   textload.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Delimited text (.csv/.xyz) point data loader
+# =============================================================================
+
+import re
+import numpy as np
+
+from .posload import ReadError, CHUNKSIZE, span
+
+# Column delimiters accepted besides whitespace
+DELIMITERS = re.compile(rb'[,;]')
+
+class TextPOS():
+    """
+    Delimited text point file loader (.csv, .xyz, .txt)
+
+    Usage::
+
+      pos = TextPOS("/path/to/file.csv")
+      pos.xyz, pos.mc, len(pos)       # As for POS
+
+    Each row holds x, y, z and mass-to-charge ratio in its first four
+    columns, separated by commas, semicolons or whitespace. Further columns
+    are ignored, as are a header row and lines starting with "#". Text is
+    always read into memory, mmap and cache are accepted for compatibility
+    with POS.
+    """
+
+    def __init__(self, textpath, mmap=False, cache=False):
+        with span("text load") as s:
+            data = self._parsefile(textpath)
+            s.count(points=len(data))
+
+        self.xyz = data[:,0:3] #: n x 3 numpy array of xyz points in text file
+        self.mc  = data[:,3]   #: n x 1 numpy array of corresponding mass-to-charge ratios
+
+    def _parsefile(self, path: str) -> np.ndarray:
+        """
+        Parse input text file into n x 4 float32 array of x, y, z, m/c
+
+        Arguments:
+
+        * **path** - Path to text file
+        """
+        try:
+            with open(path, 'rb') as content_file:
+                text = content_file.read()
+        except (IOError, FileNotFoundError):
+            raise ReadError('Error opening text file %s' % path)
+            return
+
+        # Drop comments and header, then parse all values in one pass
+        lines = [l for l in DELIMITERS.sub(b' ', text).splitlines()
+                 if l.strip() and not l.lstrip().startswith(b'#')]
+        if lines and _row(lines[0]) is None:
+            lines = lines[1:]
+        if not lines:
+            return np.empty((0, 4), dtype=np.float32)
+
+        ncols = len(_row(lines[0]) or ())
+        if ncols < 4:
+            raise ReadError('Text file %s needs x, y, z and m/c columns' % path)
+
+        try:
+            values = np.array(b' '.join(lines).split(), dtype=np.float32)
+        except ValueError:
+            raise ReadError('Invalid values in text file %s' % path)
+            return
+        if len(values) != ncols*len(lines):
+            raise ReadError('Invalid rows in text file %s' % path)
+        return values.reshape(-1, ncols)[:,0:4]
+
+    def chunks(self, chunksize=CHUNKSIZE):
+        """Yield (xyz, mc) views of consecutive blocks of chunksize points"""
+        for start in range(0, len(self.mc), chunksize):
+            stop = start + chunksize
+            yield self.xyz[start:stop], self.mc[start:stop]
+
+    def __iter__(self):
+        return self.chunks()
+
+    def __len__(self):
+        """Return number of points in text file"""
+        return len(self.mc)
+
+
+
+# === Helper functions ===
+def _row(line):
+    # Helper function: list of floats in line (None if not all numeric)
+    try:
+        return [float(v) for v in line.split()]
+    except ValueError:
+        return None
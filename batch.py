@@ -0,0 +1,213 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   batch.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Headless batch pipeline: range, voxelise and extract isosurfaces of many
+# datasets without Blender, one dataset per worker process.
+#
+# Usage:
+#   python batch.py run1.pos run2.pos -o out --isorange 0 5 --isorange 5 10
+#   python batch.py runs/*.pos --rng all.rng --species Si -o out \
+#                   --isorange 0.1 1 --workers 8
+#
+# Each pos file (.pos, .epos, .apt, .ato, .csv/.xyz) is ranged with the range
+# file (.rng, .rrng or .env) of the same name unless --rng is given. Results are written to the output directory as
+# <run>_iso<from>-<to>.<format> (binary PLY, OBJ, or npz of float32 verts
+# in nm and int32 faces) and, with --grid, <run>_grid.npy (voxel grid).
+# =============================================================================
+
+import os
+import sys
+import time
+import argparse
+import concurrent.futures
+import numpy as np
+
+from apread import apload
+from analysis import voxelisation
+from analysis import isosurface
+from analysis import export
+import profiling
+
+def process(task):
+    """
+    Run the pipeline on one dataset (worker process entry point)
+
+    task: dict with pospath, rngpath, outdir, bin, isoranges, species, grid,
+    format, normals, trace
+
+    Returns summary dict: name, points, elapsed time (s), written files,
+    error messages and per-stage profile table. Any exception is recorded as
+    an error of this dataset, so it does not stop the others.
+    """
+    name = _name(task)
+    start = time.perf_counter()
+    with profiling.Session(name) as prof:
+        try:
+            summary = _process(task, name)
+        except Exception as e:
+            summary = _failed(task, e, time.perf_counter() - start)
+    summary['profile'] = prof.table()
+    if task['trace']:
+        path = os.path.join(task['outdir'], name+"_trace.json")
+        prof.write_trace(path)
+        summary['files'].append(path)
+    return summary
+
+def _name(task):
+    # Helper function: dataset name of task, from its pos file name
+    return os.path.splitext(os.path.basename(task['pospath']))[0]
+
+def _failed(task, error, elapsed=0.0):
+    # Helper function: summary of task aborted by exception error
+    return {'name': _name(task), 'points': 0, 'files': [], 'time': elapsed,
+            'errors': ["%s: %s" % (type(error).__name__, error)], 'profile': ""}
+
+def _process(task, name):
+    # Helper function: process() within its profiling session
+    start = time.perf_counter()
+    summary = {'name': name, 'points': 0, 'files': [], 'errors': []}
+
+    try:
+        data = apload.APData(task['pospath'], task['rngpath'], mmap=True)
+    except apload.APReadError as e:
+        summary['errors'].append(str(e))
+        summary['time'] = time.perf_counter() - start
+        return summary
+    summary['points'] = len(data.pos)
+
+    # Grid of the dataset's bounds, to place isosurfaces in nm
+    xyz = data.pos.xyz
+    origin = np.nanmin(xyz, axis=0)
+    extent = np.nanmax(xyz, axis=0) - origin
+    origin, shape = voxelisation.grid(xyz, task['bin'], origin, extent)
+
+    species = task['species']
+    if species:
+        # Isosurfaces of atom concentration (atom count / total count)
+        if species not in data.rng._atoms:
+            summary['errors'].append("No atom %s in %s" % (species, task['rngpath']))
+            summary['time'] = time.perf_counter() - start
+            return summary
+        counts = voxelisation.generate_species(data.pos.xyz, data.rng._posmap,
+                                               [data.rng._atoms[species]],
+                                               task['bin'], origin, extent)
+        voxarray = voxelisation.concentration(counts)[0]
+    else:
+        voxarray = voxelisation.generate_stream(data.pos, task['bin'], origin, extent)
+
+    if task['grid']:
+        path = os.path.join(task['outdir'], name+"_grid.npy")
+        np.save(path, voxarray)
+        summary['files'].append(path)
+
+    for isorange in task['isoranges']:
+        try:
+            verts, faces = isosurface.generate(voxarray, isorange)
+        except ValueError as e:
+            summary['errors'].append("Isorange %g-%g: %s" % (isorange[0], isorange[1], e))
+            continue
+        # Voxel index units -> nm, as the points
+        verts = (origin + verts*origin.dtype.type(task['bin'])).astype(np.float32)
+        path = os.path.join(task['outdir'], "%s_iso%g-%g.%s" % \
+                (name, isorange[0], isorange[1], task['format']))
+        normals = export.vertex_normals(verts, faces) if task['normals'] else None
+        if task['format'] == 'ply':
+            export.write_ply(path, verts, faces, normals=normals)
+        elif task['format'] == 'obj':
+            export.write_obj(path, verts, faces, normals=normals)
+        else:
+            np.savez(path, verts=verts, faces=faces)
+        summary['files'].append(path)
+
+    summary['time'] = time.perf_counter() - start
+    return summary
+
+def tasks(args):
+    """Return list of process() tasks for parsed command line args"""
+    tasks = []
+    for pospath in args.pos:
+        rngpath = args.rng
+        if rngpath is None:
+            rngpath = _rngpath(pospath)
+        tasks.append({'pospath':   pospath,
+                      'rngpath':   rngpath,
+                      'outdir':    args.output,
+                      'bin':       args.bin,
+                      'isoranges': args.isorange or [],
+                      'species':   args.species,
+                      'grid':      args.grid,
+                      'format':    args.format,
+                      'normals':   args.normals,
+                      'trace':     args.trace})
+    return tasks
+
+def _rngpath(pospath):
+    # Helper function: range file of the same name as pospath (.rng if none)
+    stem = os.path.splitext(pospath)[0]
+    for ext in (".rng", ".rrng", ".env"):
+        if os.path.exists(stem+ext):
+            return stem+ext
+    return stem+".rng"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description="Range, voxelise and extract isosurfaces of atom probe datasets")
+    parser.add_argument("pos", nargs="+",
+                        help="Input pos files")
+    parser.add_argument("--rng",
+                        help="Range file used for all datasets (default: range file next to each pos)")
+    parser.add_argument("-o", "--output", default=".",
+                        help="Output directory (default: current directory)")
+    parser.add_argument("--bin", type=float, default=1.0,
+                        help="Voxel size in nm (default: 1)")
+    parser.add_argument("--isorange", type=float, nargs=2, action="append",
+                        metavar=("FROM", "TO"),
+                        help="Isosurface range, may be given several times")
+    parser.add_argument("--species",
+                        help="Atom to voxelise concentration of (default: point counts)")
+    parser.add_argument("--format", choices=("ply", "obj", "npz"), default="ply",
+                        help="Isosurface file format (default: binary PLY)")
+    parser.add_argument("--normals", action="store_true",
+                        help="Write vertex normals (PLY, OBJ)")
+    parser.add_argument("--grid", action="store_true",
+                        help="Also save voxel grids")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-stage timings of each dataset")
+    parser.add_argument("--trace", action="store_true",
+                        help="Write per-stage timings as Chrome trace <run>_trace.json")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [(task, pool.submit(process, task)) for task in tasks(args)]
+        for task, future in futures:
+            try:
+                summary = future.result()
+            except Exception as e:
+                # Worker died or result could not be sent back
+                summary = _failed(task, e)
+            print("%s: %d points, %d files in %.2fs" % \
+                    (summary['name'], summary['points'], len(summary['files']), summary['time']))
+            for error in summary['errors']:
+                print("  Error:", error)
+            if args.profile:
+                print(summary['profile'])
+            failed += bool(summary['errors'])
+
+    if failed:
+        print("%d of %d datasets had errors" % (failed, len(args.pos)))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
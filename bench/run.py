@@ -0,0 +1,193 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   bench/run.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Benchmark suite of the bpy-free loading and analysis code, run on
+# synthetic datasets (see bench/synth.py). Runs without Blender.
+#
+# Usage:
+#   python bench/run.py                          # 1e5 and 1e6 ions
+#   python bench/run.py --ions 1e7 1e8 -o new.json --compare old.json
+#   python bench/run.py --only voxel isosurface  # Benchmarks matching names
+#
+# Results are stored as JSON (one entry per benchmark and dataset size with
+# all repeat timings), --compare prints the speed ratio to an earlier run.
+# =============================================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from apread import posload
+from apread import rngload
+from analysis import voxelisation
+from analysis import isosurface
+
+import synth
+
+# Directory synthetic datasets are generated in (reused across runs)
+DATA_DIR = os.path.join(ROOT, "bench", "data")
+
+def dataset(nions, clusters):
+    """Return (pospath, rngpath) of synthetic dataset, generating it if needed"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    name = "synth-%d-c%d" % (nions, clusters)
+    pospath = os.path.join(DATA_DIR, name+".pos")
+    rngpath = os.path.join(DATA_DIR, name+".rng")
+    if not (os.path.exists(pospath) and os.path.exists(rngpath)):
+        print("Generating %s" % pospath)
+        synth.generate(pospath, rngpath, nions, clusters=clusters, cluster_species="Cu")
+    return pospath, rngpath
+
+def benchmarks(pospath, rngpath):
+    """
+    Return list of (name, setup, func[, restore]) benchmarks of dataset
+    pospath/rngpath. setup() returns the argument passed to func and
+    restore, only func is timed. restore(arg) undoes func's changes to arg
+    after each timed call.
+    """
+    def loaded():
+        pos = posload.POS(pospath)
+        rng = rngload.ORNLRNG(rngpath)
+        rng.loadpos(pos)
+        return rng
+
+    def edited():
+        rng = loaded()
+        rng.setrange(0, *rng._ranges[0]) # Builds the m/c index
+        return rng, rng._ranges[0].copy()
+
+    def grid():
+        pos = posload.POS(pospath)
+        return voxelisation.generate(pos.xyz)
+
+    def isorange(vox):
+        # Isorange enclosing the densest quarter of voxels
+        return [float(np.percentile(vox, 75)), float(vox.max()+1)]
+
+    def tris():
+        vox = grid()
+        return vox, isorange(vox), isosurface._marching_cubes(vox, isorange(vox))
+
+    return [
+        ("pos load",        lambda: None, lambda _: posload.POS(pospath)),
+        ("pos load mmap",   lambda: None, lambda _: posload.POS(pospath, mmap=True).xyz.min()),
+        ("pos stream",      lambda: None, lambda _: posload.bounds(posload.POSStream(pospath))),
+        ("rng parse",       lambda: rngload.ORNLRNG(rngpath),
+                            lambda rng: rng._parsefile(rngpath)),
+        ("ranging",         lambda: posload.POS(pospath),
+                            lambda pos: rngload.ORNLRNG(rngpath).loadpos(pos)),
+        ("range edit",      edited,
+                            lambda e: e[0].setrange(0, *(e[1]+[0.01, 0.01])),
+                            lambda e: e[0].setrange(0, *e[1])),
+        ("getatom",         loaded, lambda rng: [rng.getatom(a) for a in rng.atomlist]),
+        ("getion",          loaded, lambda rng: [rng.getion(i) for i in rng.ionlist]),
+        ("voxelisation",    lambda: posload.POS(pospath),
+                            lambda pos: voxelisation.generate(pos.xyz)),
+        ("voxelisation stream", lambda: None,
+                            lambda _: voxelisation.generate_stream(posload.POSStream(pospath))),
+        ("voxelisation species", loaded,
+                            lambda rng: voxelisation.generate_species(
+                                rng._pos.xyz, rng._posmap,
+                                [rng._atoms[a] for a in rng.atomlist])),
+        ("marching cubes",  grid, lambda vox: isosurface._marching_cubes(vox, isorange(vox))),
+        ("vertex welding",  tris, lambda t: isosurface._uniqueverts(t[2], t[0], t[1])),
+        ]
+
+def run(names, nions, clusters, repeat):
+    """Run benchmarks matching names (all if empty), return list of results"""
+    pospath, rngpath = dataset(nions, clusters)
+    results = []
+    for name, setup, func, *restore in benchmarks(pospath, rngpath):
+        if names and not any(n in name for n in names):
+            continue
+        arg = setup()
+        times = []
+        for n in range(repeat):
+            start = time.perf_counter()
+            func(arg)
+            times.append(time.perf_counter() - start)
+            for undo in restore:
+                undo(arg)
+        result = {'name': name, 'ions': nions, 'clusters': clusters,
+                  'times': times, 'min': min(times), 'median': float(np.median(times))}
+        print("%-22s %12d ions  min %8.4fs  median %8.4fs" % \
+                (name, nions, result['min'], result['median']))
+        results.append(result)
+    return results
+
+def metadata():
+    """Return dict describing the code and machine benchmarked"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'date': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+            'cpus': os.cpu_count()}
+
+def compare(results, oldpath):
+    """Print min time ratio of results to the results stored in oldpath"""
+    with open(oldpath) as f:
+        old = json.load(f)
+    oldmin = {(r['name'], r['ions'], r['clusters']): r['min'] for r in old['results']}
+    print("\nCompared to %s (commit %s):" % (oldpath, old['meta'].get('commit')))
+    for r in results:
+        key = (r['name'], r['ions'], r['clusters'])
+        if key in oldmin:
+            print("%-22s %12d ions  %6.2fx %s" % (r['name'], r['ions'], oldmin[key]/r['min'],
+                  "faster" if r['min'] <= oldmin[key] else "SLOWER"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run AtomBlend benchmarks")
+    parser.add_argument("--ions", type=float, nargs="+", default=[1e5, 1e6],
+                        help="Dataset sizes in ions (default: 1e5 1e6)")
+    parser.add_argument("--clusters", type=int, default=20,
+                        help="Number of precipitate clusters per dataset (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timed runs per benchmark (default: 3)")
+    parser.add_argument("--only", nargs="+", default=[],
+                        help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("-o", "--output",
+                        help="JSON results file (default: bench/results/<commit or date>.json)")
+    parser.add_argument("--compare",
+                        help="Earlier JSON results file to compare with")
+    args = parser.parse_args(argv)
+
+    meta = metadata()
+    results = []
+    for nions in args.ions:
+        results += run(args.only, int(nions), args.clusters, args.repeat)
+
+    output = args.output
+    if output is None:
+        resultdir = os.path.join(ROOT, "bench", "results")
+        os.makedirs(resultdir, exist_ok=True)
+        output = os.path.join(resultdir, "%s.json" % (meta['commit'] or meta['date'])[0:12])
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=1)
+    print("Results written to", output)
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   bench/synth.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Synthetic .pos/.rng dataset generator for benchmarks
+#
+# Usage:
+#   python bench/synth.py out.pos out.rng --ions 1e7
+#   python bench/synth.py out.pos out.rng --ions 1e8 --species Fe:0.8,Cr:0.15,Cu:0.05 \
+#                         --clusters 200 --cluster-species Cu --cluster-radius 2
+# =============================================================================
+
+import sys
+import argparse
+import numpy as np
+
+# Default species mix, name -> fraction of ranged ions
+SPECIES = {'Fe': 0.75, 'Cr': 0.15, 'Ni': 0.07, 'Cu': 0.03}
+
+# Detected ion density in ions/nm^3, sets the size of the specimen
+DENSITY = 50.0
+
+# Fraction of unranged background ions
+BACKGROUND = 0.05
+
+# Ions generated and written at once
+CHUNKSIZE = 2**22
+
+def ranges(species):
+    """
+    Return list of (atoms, lower, upper) ranges of species (list of names),
+    atoms being the tuple of species names of the range's ion.
+
+    Species n gets two isotope peaks at 10*(n+1) and 10*(n+1)+1 Da, each
+    range 0.5 Da wide. Every pair of neighbouring species also shares a
+    molecular ion peak at 10*(n+1)+5 Da.
+    """
+    rngs = []
+    for n, name in enumerate(species):
+        centre = 10.0*(n+1)
+        rngs.append(((name,), centre-0.25, centre+0.25))
+        rngs.append(((name,), centre+0.75, centre+1.25))
+        if n+1 < len(species):
+            rngs.append(((name, species[n+1]), centre+4.75, centre+5.25))
+    return rngs
+
+def write_rng(rngpath, species):
+    """Write ORNL .rng file for species (list of names), see ranges()"""
+    rngs = ranges(species)
+    colours = np.random.RandomState(0).random_sample((len(species), 3))
+
+    lines = ["%d %d" % (len(species), len(rngs))]
+    for name, colour in zip(species, colours):
+        lines.append(name)
+        lines.append("%s %.2f %.2f %.2f" % ((name,) + tuple(colour)))
+    lines.append("-"*17 + " " + " ".join(species))
+    for n, (atoms, lower, upper) in enumerate(rngs):
+        comp = ["1" if atom in atoms else "0" for atom in species]
+        lines.append("%d %.4f %.4f %s" % (n+1, lower, upper, " ".join(comp)))
+
+    with open(rngpath, 'w') as f:
+        f.write("\n".join(lines)+"\n")
+
+def write_pos(pospath, nions, species=SPECIES, clusters=0, cluster_species=None,
+              cluster_radius=2.0, cluster_fraction=0.5, seed=0, chunksize=CHUNKSIZE):
+    """
+    Write synthetic .pos file of nions ions.
+
+    Ions fill a box specimen of DENSITY ions/nm^3 (height 2x width) and are
+    written in depth order, like the acquisition order of a real run. Ion
+    mass-to-charge ratios are drawn from the ranges of species (dict of name
+    -> fraction), plus BACKGROUND unranged ions.
+
+    clusters: number of spherical precipitates of cluster_radius nm. Ions
+    inside them are cluster_species with probability cluster_fraction.
+
+    Output is written chunksize ions at a time, so any nions fits in memory.
+    """
+    names = list(species)
+    fractions = np.array([species[name] for name in names], dtype=float)
+    fractions /= fractions.sum()
+    rngs = ranges(names)
+
+    # Ranges of each species: two isotopes (drawn 2:1) and the molecular
+    # ion with the next species (-1 for the last species)
+    isotopes = np.array([[n for n, r in enumerate(rngs) if r[0] == (name,)]
+                         for name in names])
+    molecule = np.array([([n for n, r in enumerate(rngs) if r[0][0] == name and len(r[0]) > 1]
+                          or [-1])[0] for name in names])
+    centres = np.array([(r[1]+r[2])/2 for r in rngs])
+    maxmc = centres.max() + 10
+
+    rs = np.random.RandomState(seed)
+    width = (nions/DENSITY/2)**(1/3)
+    height = 2*width
+
+    if clusters:
+        if cluster_species not in names:
+            raise ValueError("synth.write_pos: cluster species %s not in species" % cluster_species)
+        centers = rs.random_sample((clusters, 3))*[width, width, height]
+
+    with open(pospath, 'wb') as f:
+        for start in range(0, nions, chunksize):
+            n = min(chunksize, nions-start)
+
+            # Depth slab of this chunk
+            z0 = height*start/nions
+            z1 = height*(start+n)/nions
+            xyz = rs.random_sample((n, 3))
+            xyz[:,0:2] *= width
+            xyz[:,2] = np.sort(z0 + xyz[:,2]*(z1-z0))
+
+            # Species and isotope of each ion
+            spec = rs.choice(len(names), size=n, p=fractions)
+            if clusters:
+                near = (centers[:,2] > z0-cluster_radius) & (centers[:,2] < z1+cluster_radius)
+                for c in centers[near]:
+                    inside = ((xyz - c)**2).sum(axis=1) < cluster_radius**2
+                    enrich = inside & (rs.random_sample(n) < cluster_fraction)
+                    spec[enrich] = names.index(cluster_species)
+            peak = np.where(rs.random_sample(n) < 2/3, isotopes[spec,0], isotopes[spec,1])
+
+            # Molecular ions: 5% of ions of species with a molecular peak
+            mol = molecule[spec]
+            molecular = (mol >= 0) & (rs.random_sample(n) < 0.05)
+            peak[molecular] = mol[molecular]
+
+            mc = centres[peak] + rs.normal(0, 0.05, n)
+            background = rs.random_sample(n) < BACKGROUND
+            mc[background] = rs.random_sample(background.sum())*maxmc
+
+            rec = np.empty((n, 4), dtype='>f4')
+            rec[:,0:3] = xyz
+            rec[:,3] = mc
+            f.write(rec.tobytes())
+
+def generate(pospath, rngpath, nions, species=SPECIES, **kwargs):
+    """Write synthetic .pos and matching .rng file, see write_pos()"""
+    write_rng(rngpath, list(species))
+    write_pos(pospath, nions, species, **kwargs)
+
+def parse_species(text):
+    """Parse species mix "Fe:0.8,Cr:0.2" -> {'Fe': 0.8, 'Cr': 0.2}"""
+    species = {}
+    for item in text.split(","):
+        name, fraction = item.split(":")
+        species[name.strip()] = float(fraction)
+    return species
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic .pos/.rng dataset")
+    parser.add_argument("pos", help="Output .pos file")
+    parser.add_argument("rng", help="Output .rng file")
+    parser.add_argument("--ions", type=float, default=1e6,
+                        help="Number of ions (default: 1e6)")
+    parser.add_argument("--species", type=parse_species, default=SPECIES,
+                        help="Species mix as name:fraction,... (default: %s)" % \
+                             ",".join("%s:%g" % item for item in SPECIES.items()))
+    parser.add_argument("--clusters", type=int, default=0,
+                        help="Number of precipitate clusters")
+    parser.add_argument("--cluster-species", default="Cu",
+                        help="Species enriched in clusters (default: Cu)")
+    parser.add_argument("--cluster-radius", type=float, default=2.0,
+                        help="Cluster radius in nm (default: 2)")
+    parser.add_argument("--cluster-fraction", type=float, default=0.5,
+                        help="Fraction of cluster species inside clusters (default: 0.5)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    generate(args.pos, args.rng, int(args.ions), args.species,
+             clusters=args.clusters, cluster_species=args.cluster_species,
+             cluster_radius=args.cluster_radius, cluster_fraction=args.cluster_fraction,
+             seed=args.seed)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,9 +13,14 @@
 
 import bpy
 import os
+import contextlib
 import numpy as np
 
 from . import space
+from ..profiling import span
+
+# Objects linked inside the current batch() block (None outside a batch)
+_batched = None
 
 # === Object creation ===
 def icosphere_add(name, size=1, origin=(0, 0, 0), smooth=True):
@@ -39,9 +44,8 @@ def cube_add_from_verts(name, origin, verts):
     # Verts must be defined: bottom face first clockwise, top face clockwise
     # starting from (-x, -y, -z)
     faces = [(0,1,2,3), (4,5,6,7), (0,4,5,1), (1,5,6,2), (2,6,7,3), (3,7,4,0)]
-    edges = []
 
-    mesh = mesh_add_from_pydata(name, verts, edges, faces)
+    mesh = mesh_add_from_arrays(name, verts, faces=faces)
     obj = bpy.data.objects.new(name, mesh)
     obj.location = origin
     return link_and_update(obj)
@@ -52,11 +56,7 @@ def object_add_from_verts(verts, name, trunc=None):
         verts = verts[0:trunc]
 
     # Create new mesh with verts as its vertices, obj
-    verts = list(verts)
-    edges = []
-    faces = []
-
-    mesh = mesh_add_from_pydata(name, verts, edges, faces)
+    mesh = mesh_add_from_arrays(name, verts)
     obj = bpy.data.objects.new(name, mesh)
     return link_and_update(obj)
 
@@ -67,42 +67,124 @@ def pointcloud_add(verts, name, trunc=None):
 
     # Create new mesh with verts as its vertices, obj
     length = len(verts)
-    verts = list(verts)+list(verts)
-
-    edges = []
+    verts = np.concatenate((verts, verts))
 
     # create edges of 0 length for pointcloud viz w/ wireframe material
-    for i in range(length):
-        edges.append([i, i+length])
-    faces = []
+    inds = np.arange(length, dtype=np.int32)
+    edges = np.column_stack((inds, inds+length))
 
-    mesh = mesh_add_from_pydata(name, verts, edges, faces)
+    mesh = mesh_add_from_arrays(name, verts, edges=edges)
     obj = bpy.data.objects.new(name, mesh)
     return link_and_update(obj)
 
 def object_add_from_pydata(name, verts, edges, faces):
     """Create object from vert, edge and face defs"""
-    mesh = mesh_add_from_pydata(name+"_mesh", verts, edges, faces)
+    mesh = mesh_add_from_arrays(name+"_mesh", verts, edges, faces)
     obj = bpy.data.objects.new(name, mesh)
     return link_and_update(obj)
 
 # === Mesh creation ===
-def mesh_add_from_pydata(name, verts, edges, faces):
-    """Create mesh from vert, edge and face definitions"""
+def mesh_add_from_arrays(name, verts, edges=None, faces=None):
+    """Create mesh from vert (n x 3), edge (m x 2) and face definitions
+
+    Data is uploaded in bulk with foreach_set from flat float32/int32
+    buffers, no per-vertex Python objects are created.
+
+    faces: m x k array of vertex indices, or list of vertex index
+           sequences of varying length
+    """
+    with span("mesh upload", verts=len(verts),
+              faces=0 if faces is None else len(faces)):
+        return _mesh_add_from_arrays(name, verts, edges, faces)
+
+def _mesh_add_from_arrays(name, verts, edges, faces):
+    # Helper function: mesh_add_from_arrays without instrumentation
     mesh = bpy.data.meshes.new(name+"_mesh")
-    mesh.from_pydata(verts, edges, faces)
+
+    co = np.ascontiguousarray(verts, dtype=np.float32).reshape(-1)
+    mesh.vertices.add(len(co)//3)
+    mesh.vertices.foreach_set("co", co)
+
+    if edges is not None and len(edges):
+        edges = np.ascontiguousarray(edges, dtype=np.int32).reshape(-1)
+        mesh.edges.add(len(edges)//2)
+        mesh.edges.foreach_set("vertices", edges)
+
+    hasfaces = faces is not None and len(faces)
+    if hasfaces:
+        if isinstance(faces, np.ndarray):
+            totals = np.full(len(faces), faces.shape[1], dtype=np.int32)
+        else:
+            totals = np.array([len(f) for f in faces], dtype=np.int32)
+            faces = np.concatenate([np.asarray(f) for f in faces])
+        loops = np.ascontiguousarray(faces, dtype=np.int32).reshape(-1)
+        starts = (np.cumsum(totals) - totals).astype(np.int32)
+
+        mesh.loops.add(len(loops))
+        mesh.loops.foreach_set("vertex_index", loops)
+        mesh.polygons.add(len(totals))
+        mesh.polygons.foreach_set("loop_start", starts)
+        mesh.polygons.foreach_set("loop_total", totals)
+
+    # Faces need their edges generated
+    mesh.update(calc_edges=bool(hasfaces))
     return mesh
 
+def mesh_add_from_pydata(name, verts, edges, faces):
+    """Create mesh from vert, edge and face definitions"""
+    return mesh_add_from_arrays(name, verts, edges, faces)
+
 # === Object manipulation ===
 def link_and_update(obj):
-    """Link object to scene, select, make active and update"""
+    """Link object to scene, select, make active and update
+
+    Inside a batch() block selection, active object and scene update are
+    deferred to the end of the block.
+    """
     scene = bpy.context.scene
     scene.objects.link(obj)
+    if _batched is not None:
+        _batched.append(obj)
+        return obj
     scene.objects.active = obj
     obj.select = True
     scene.update()
     return obj
 
+@contextlib.contextmanager
+def batch():
+    """Context manager batching object creation
+
+    Objects created with the helpers in this module inside the block are
+    linked to the scene straight away, but selected, made active (last
+    object) and the scene updated only once when the block exits, instead
+    of one full scene update per object. Nested blocks join the outermost.
+
+    Usage::
+
+        with blend.object.batch() as objs:
+            for name, verts in items:
+                object_add_from_verts(verts, name)
+        # objs: list of all created objects
+    """
+    global _batched
+    if _batched is not None:
+        yield _batched
+        return
+
+    _batched = objs = []
+    try:
+        yield objs
+    finally:
+        _batched = None
+        with span("scene update", objects=len(objs)):
+            scene = bpy.context.scene
+            for obj in objs:
+                obj.select = True
+            if objs:
+                scene.objects.active = objs[-1]
+            scene.update()
+
 def delete(obj):
     """Remove object"""
     scene = bpy.context.scene
@@ -126,6 +208,69 @@ def vertices_get(obj):
         verts.append((vert.co[0], vert.co[1], vert.co[2]))
     return verts
 
+def vertices_get_array(obj):
+    """Get n x 3 float32 array of vertex coordinates for the given object
+
+    Filled with a single foreach_get into a preallocated buffer.
+    """
+    mesh = obj.data
+    co = np.empty(len(mesh.vertices)*3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+# === Vertex attributes ===
+def vertex_layer_int_set(obj, name, values):
+    """Set integer vertex layer name of obj's mesh to values (one per vertex)
+
+    The layer is created if it does not exist yet and filled with a single
+    foreach_set.
+    """
+    mesh = obj.data
+    layer = mesh.vertex_layers_int.get(name)
+    if layer is None:
+        layer = mesh.vertex_layers_int.new(name=name)
+    layer.data.foreach_set("value", np.ascontiguousarray(values, dtype=np.int32))
+    return layer
+
+def vertex_layer_int_get(obj, name):
+    """Get integer vertex layer name of obj's mesh as int32 array
+
+    Returns None if obj has no such layer.
+    """
+    mesh = obj.data
+    layer = mesh.vertex_layers_int.get(name)
+    if layer is None:
+        return None
+    values = np.empty(len(mesh.vertices), dtype=np.int32)
+    layer.data.foreach_get("value", values)
+    return values
+
+def has_vertex_layer_int(obj, name):
+    """Check whether obj is a mesh object with integer vertex layer name"""
+    return obj.type == 'MESH' and name in obj.data.vertex_layers_int
+
+def vertex_group_add(obj, name, indices):
+    """Add vertices indices of obj to vertex group name (created if needed)
+
+    indices may be a range (contiguous vertices), passed on without
+    building a list.
+    """
+    grp = obj.vertex_groups.get(name)
+    if grp is None:
+        grp = obj.vertex_groups.new(name)
+    if len(indices):
+        if not isinstance(indices, range):
+            indices = np.asarray(indices).tolist()
+        grp.add(indices, 1.0, 'REPLACE')
+    return grp
+
+def vertex_group_remove(obj, name, indices):
+    """Remove vertices indices of obj from vertex group name"""
+    grp = obj.vertex_groups.get(name)
+    if grp is not None and len(indices):
+        grp.remove(np.asarray(indices).tolist())
+    return grp
+
 def modifier_add_wireframe(obj, thickness=0.2):
     """Add wireframe modifier to obj
 
@@ -136,6 +281,35 @@ def modifier_add_wireframe(obj, thickness=0.2):
     mod.show_in_editmode = True
     return mod
 
+def modifier_add_mask(obj, vgroup, invert=False):
+    """Add mask modifier to obj showing only vertices in vertex group vgroup
+
+    invert: show only vertices not in vgroup instead
+    """
+    mod = obj.modifiers.new("Mask", type='MASK')
+    mod.vertex_group = vgroup
+    mod.invert_vertex_group = invert
+    return mod
+
+def modifier_add_weight_mix(obj, name, vgroup_a, vgroup_b, show=True):
+    """Add vertex weight mix modifier name to obj adding vertex group
+    vgroup_b to vgroup_a (weights set from vgroup_b)
+
+    show: modifier enabled in viewport and render
+    """
+    mod = obj.modifiers.new(name, type='VERTEX_WEIGHT_MIX')
+    mod.vertex_group_a = vgroup_a
+    mod.vertex_group_b = vgroup_b
+    mod.mix_mode = 'SET'
+    mod.mix_set  = 'B'
+    modifier_show(mod, show)
+    return mod
+
+def modifier_show(mod, show):
+    """Enable or disable modifier mod in viewport and render"""
+    mod.show_viewport = show
+    mod.show_render   = show
+
 def dupli_set(obj, type):
     """Set duplication type on obj"""
     obj.dupli_type = type
@@ -0,0 +1,148 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   jobs.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Background jobs for long-running operators. Heavy (numpy) work runs in a
+# worker thread, only the final step touching bpy runs on the main thread
+# (see the atomblend.job_monitor modal operator).
+# =============================================================================
+
+import threading
+import traceback
+
+class JobCancelled(Exception): pass
+
+class Job():
+    """
+    Background job
+
+    Usage::
+
+      def work(job):
+          job.progress(0.5, "Voxelising")  # Report progress (0 to 1)
+          job.check()                      # Stop here if cancelled
+          return result                    # Passed to finish
+
+      def finish(result):
+          # Runs on main thread, may use bpy. Returns report message
+          return "Done"
+
+      jobs.submit(jobs.Job("Isosurface", work, finish))
+
+    work(job) runs in a worker thread and must not use bpy. Exceptions it
+    raises are kept in job.error and reported instead of calling finish.
+    """
+    def __init__(self, name, work, finish=None):
+        self.name = name
+        self.fraction = 0.0     #: Progress of work (0 to 1)
+        self.message = ""       #: Current stage of work
+        self.result = None      #: Return value of work
+        self.error = None       #: Exception raised by work
+        self.cancelled = False  #: Job was cancelled before finishing
+
+        self._work = work
+        self._finish = finish
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="atomblend "+name)
+        self._thread.daemon = True
+
+    def start(self):
+        """Start work in worker thread"""
+        self._thread.start()
+
+    def cancel(self):
+        """Ask work to stop at its next check()"""
+        self._stop.set()
+
+    def check(self):
+        """Raise JobCancelled if job was cancelled (call from work)"""
+        if self._stop.is_set():
+            raise JobCancelled(self.name)
+
+    def progress(self, fraction, message=None):
+        """Report progress fraction (0 to 1) and stage message (call from work)"""
+        self.check()
+        self.fraction = fraction
+        if message is not None:
+            self.message = message
+
+    def track(self, chunks, total, start=0.0, stop=1.0):
+        """
+        Wrap re-iterable of (xyz, mc) blocks chunks, eg. posload.POS, so
+        that iterating it reports progress from start to stop and stops
+        when the job is cancelled. total is the number of points iterated
+        over all passes (eg. 2*len(pos) for two passes)
+        """
+        return _Tracked(self, chunks, total, start, stop)
+
+    @property
+    def done(self):
+        """Work has returned, failed or been cancelled"""
+        return not self._thread.is_alive() and self._thread.ident is not None
+
+    def finish(self):
+        """Run finish on result of work (call from main thread once done)"""
+        if self._finish is not None:
+            return self._finish(self.result)
+
+    def _run(self):
+        try:
+            self.result = self._work(self)
+            self.fraction = 1.0
+        except JobCancelled:
+            self.cancelled = True
+        except Exception as e:
+            traceback.print_exc()
+            self.error = e
+
+class _Tracked():
+    # Re-iterable of (xyz, mc) blocks reporting progress to job (see
+    # Job.track)
+    def __init__(self, job, chunks, total, start, stop):
+        self._job = job
+        self._chunks = chunks
+        self._total = max(total, 1)
+        self._start = start
+        self._stop = stop
+        self._done = 0  # Points iterated over all passes so far
+
+    def __iter__(self):
+        for xyz, mc in self._chunks:
+            fraction = min(self._done/self._total, 1.0)
+            self._job.progress(self._start + (self._stop-self._start)*fraction)
+            yield xyz, mc
+            self._done += len(xyz)
+
+# === Job queue ===
+_jobs = []              # Submitted jobs not yet collected
+_lock = threading.Lock()
+
+def submit(job):
+    """Start job and add it to the jobs reported by the job monitor"""
+    with _lock:
+        _jobs.append(job)
+    job.start()
+    return job
+
+def active():
+    """Return list of submitted jobs not yet collected"""
+    with _lock:
+        return list(_jobs)
+
+def collect():
+    """Remove and return list of jobs that are done"""
+    with _lock:
+        done = [job for job in _jobs if job.done]
+        for job in done:
+            _jobs.remove(job)
+    return done
+
+def cancel_all():
+    """Cancel all submitted jobs"""
+    for job in active():
+        job.cancel()
@@ -14,40 +14,73 @@
 import bpy
 import numpy as np
 import ntpath
+import threading
+import traceback
+import collections
 
 from .apread import apload
+from .apread import posload
+from .apread import rngload
 from . import blend
 from . import analysis
+from . import jobs
+from . import profiling
 
 # === Operator execute functions ===
 def analysis_isosurface_gen(self, context):
-    """Perform isosurface analysis on current dataset"""
-    # Get POS xyz data
+    """Perform isosurface analysis on current dataset in a background job"""
     props = context.scene.pos_panel_props
     # Get user specified isorange
     isorange = [props.analysis_isosurf_rangefrom, props.analysis_isosurf_rangeto]
-    # FIXME don't load this again!!! save as global var for now?
-    data = apload.APData(props.pos_filename, props.rng_filename)
-
-    print("Calculating voxelisation")
-    voxarray = analysis.voxelisation.generate(data.pos.xyz)
-    print("Calculating isosurface for isorange", isorange)
-    verts, faces = analysis.isosurface.generate(voxarray, isorange)
-    print("Calculating isosurface done!")
-    edges = []
-
-    # Draw object
-    blend.object.object_add_from_pydata("Isosurface", verts, edges, faces)
-
+    pospath = props.pos_filename
+    rngpath = props.rng_filename
+    species = props.analysis_isosurf_species
+
+    trace = props.profile_trace
+    prof = profiling.Session("Isosurface")
+
+    def work(job):
+        with prof:
+            job.progress(0.0, "Loading")
+            data = apload.cache.get(pospath, rngpath, cache=True)
+
+            if species:
+                # Isosurface of atom concentration (atom count / total count)
+                if species not in data.rng._atoms:
+                    raise ValueError("No atom %s in loaded range file" % species)
+                job.progress(0.1, "Calculating %s concentration" % species)
+                counts = _species_counts(data, species)
+                with _grids_lock:
+                    voxarray = analysis.voxelisation.concentration(counts)[0]
+            else:
+                # Two passes over the points: bounds, then binning
+                job.progress(0.1, "Calculating voxelisation")
+                chunks = job.track(data.pos, 2*len(data.pos), 0.1, 0.6)
+                voxarray = analysis.voxelisation.generate_stream(chunks)
+
+            job.progress(0.6, "Calculating isosurface for isorange %s" % isorange)
+            return analysis.isosurface.generate(voxarray, isorange)
+
+    def finish(result):
+        # Draw object
+        verts, faces = result
+        edges = []
+        with prof:
+            blend.object.object_add_from_pydata("Isosurface", verts, edges, faces)
+        return "Generated isosurface with %d vertices, %d faces (%s)" % \
+                (len(verts), len(faces), _profile_report(prof, trace))
+
+    _submit(jobs.Job("Isosurface", work, finish))
     return {'FINISHED'}
 
 def animation_add(self, context):
     """Add animation to selected object"""
     # Get POS xyz data
     props = context.scene.pos_panel_props
-    # FIXME don't load this again!!! save as global var for now?
-    data = apload.APData(props.pos_filename, props.rng_filename)
-    data_centre = np.average(data.pos.xyz, axis=0)
+    data = _cached_data(self, props.pos_filename, props.rng_filename)
+    if data is None:
+        return {'CANCELLED'}
+    data_centre = posload.centroid(data.pos)
 
     # Set camera location and offset from dataset (user)
     cam_target = data_centre
@@ -92,12 +125,11 @@ def add_bounding_box(self, context):
     padding = props.boundbox_padding
     #padding = self.padding
 
-    # FIXME don't load this again!!! save as global var for now?
-    data = apload.APData(props.pos_filename, props.rng_filename)
-
-    pointlist = data.pos.xyz
-    xyzmax = np.amax(pointlist, axis=0) # max locations in data
-    xyzmin = np.amin(pointlist, axis=0) # min locations in data
+    data = _cached_data(self, props.pos_filename, props.rng_filename)
+    if data is None:
+        return {'CANCELLED'}
+    # min/max locations in data
+    xyzmin, xyzmax = posload.bounds(data.pos)
 
     # add padding to extremal xyz coords
     xyzmax += padding
@@ -159,16 +191,15 @@ def pointcloud_add(self, context):
 
     obj = context.object
 
-    # Get list of verts from active object
-    verts = blend.object.vertices_get(obj)
+    # Get array of verts from active object
+    verts = blend.object.vertices_get_array(obj)
 
     # Create pointcloud from these verts and set its parent to active obj
     ptcld = blend.object.pointcloud_add(verts, obj.name+"_pointcloud")
     blend.object.parent_set(obj, ptcld)
 
     # Add wireframe material
-    # TODO FIXME
-    mat = drawing.create_material_wire(ptcld.name+"_mat", color=color, emit=emit)
+    mat = blend.material.surface_add(ptcld.name+"_mat", mtype='WIRE', color=color, specular=color, emit=emit)
     blend.material.set(ptcld, mat)
     return {'FINISHED'}
 
@@ -245,75 +276,565 @@ def bake(self, context):
                                     # Atomic/Ionic/Isotopic
 
     if apid:
-        data = context.scene.apdata[apid]
+        pospath, rngpath = context.scene.apdata[apid]
+        data = _cached_data(self, pospath, rngpath)
+        if data is None:
+            return {'CANCELLED'}
     else:
         self.report({'ERROR'}, "No files loaded yet")
         return {'CANCELLED'}
 
-    if plot_type == 'ISO':
-        groupname = apid+" isotopic"
-        listfunc = "rangelist"
-        getfunc = "getrange"
-    elif plot_type == 'EA':
-        groupname = apid+" atomic"
-        listfunc = "atomlist"
-        getfunc = "getatom"
-    elif plot_type == 'ION':
-        groupname = apid+" ionic"
-        listfunc = "ionlist"
-        getfunc = "getion"
+    if props.bake_mode == 'SINGLE':
+        return _bake_single(self, context, apid, data, plot_type)
+
+    suffix, listfunc, getfunc = _PLOT_TYPES[plot_type]
+    groupname = apid+" "+suffix
 
     # Populate item names and point locations
     itemlist = getattr(data.rng, listfunc)
 
-    namelist = []
-    pointlist = []
-    for item in itemlist:
-        # Convert item to string name if needed
-        namelist.append(str(item))
-        # Get points (vertices) for current item and append
-        print("ITEMLIST ITEM TYPE", type(item), item)
-        pointlist.append(getattr(data.rng, getfunc)(item))
+    with profiling.Session("Bake") as prof:
+        with profiling.span("points"):
+            namelist = []
+            pointlist = []
+            for item in itemlist:
+                # Convert item to string name if needed
+                namelist.append(str(item))
+                # Get points (vertices) for current item and append
+                pointlist.append(getattr(data.rng, getfunc)(item))
+            counts = [len(verts) for verts in pointlist]
+            if props.viewport_budget:
+                # Viewport subsample, full resolution is only loaded for render
+                shares = analysis.sampling.shares(counts, props.viewport_budget)
+                pointlist = [verts[analysis.sampling.stratified(verts, share)]
+                             for verts, share in zip(pointlist, shares)]
+
+        # Create group for meshes of same type
+        grp = blend.space.group_add(groupname)
+
+        # Draw all meshes in pointlist and link to group, scene is only
+        # updated once at the end of the batch
+        with blend.object.batch():
+            with profiling.span("meshes", objects=len(namelist)):
+                for name, verts, count in zip(namelist, pointlist, counts):
+                    obj = blend.object.object_add_from_verts(verts, name, trunc=None)
+
+                    obj.datatype = 'DATA'
+
+                    obj.apid     = apid     # AP ID name used in C.scene.apdata dict
+                    obj.apfunc   = getfunc  # AP function used to build dataset (eg "getion")
+                    obj.apname   = name     # Name of imported atom/ion/range (eg "Si")
+                    obj.apcount  = count    # Number of points (mesh may hold fewer)
+
+                    blend.space.group_add_object(grp, obj)
+
+        # Centre view on created group
+        with profiling.span("view"):
+            blend.space.view_selected_group(groupname)
+
+    self.report({'INFO'}, "Loaded %s data into %s group (%s)" % \
+            (apid, groupname, _profile_report(prof, props.profile_trace)))
+    return {'FINISHED'}
 
-    # Create group for meshes of same type
-    grp = blend.space.group_add(groupname)
+def viewport_budget_apply(self, context):
+    """Resample all baked objects to the current viewport point budget"""
+    props = context.scene.pos_panel_props
+    objs = [obj for obj in context.scene.objects if _has_lod(obj)]
+    if not objs:
+        self.report({'ERROR'}, "No baked objects to resample")
+        return {'CANCELLED'}
 
-    # Draw all meshes in pointlist and link to group
-    for ind, (name, verts) in enumerate(zip(namelist, pointlist)):
-        obj = blend.object.object_add_from_verts(verts, name, trunc=None)
+    budget = props.viewport_budget
+    counts = [obj.apcount for obj in objs]
+    if budget:
+        shares = analysis.sampling.shares(counts, budget)
+    else:
+        shares = counts
+
+    resampled = 0
+    for obj, count, share in zip(objs, counts, shares):
+        if share == len(obj.data.vertices):
+            continue
+        data = _object_data(self, obj)
+        if data is None:
+            return {'CANCELLED'}
+        verts = _species_points(data, obj.apfunc, obj.apname)
+        verts = verts[analysis.sampling.stratified(verts, share)]
+        _mesh_swap(obj, blend.object.mesh_add_from_arrays(obj.name, verts))
+        resampled += 1
+
+    context.scene.update()
+    self.report({'INFO'}, "Resampled %d objects to %d of %d points" % \
+            (resampled, sum(shares), sum(counts)))
+    return {'FINISHED'}
 
-        obj.datatype = 'DATA'
+def range_edit(self, context):
+    """
+    Move one range of the selected dataset to new bounds. Points are
+    re-ranged incrementally, and only baked objects and voxel grids of
+    species whose points changed are rebuilt.
+    """
+    props = context.scene.pos_panel_props
+    apid = props.apdata_list
+    if not apid:
+        self.report({'ERROR'}, "No files loaded yet")
+        return {'CANCELLED'}
+    pospath, rngpath = context.scene.apdata[apid]
+    data = _cached_data(self, pospath, rngpath)
+    if data is None:
+        return {'CANCELLED'}
 
-        obj.apid     = apid     # AP ID name used in C.scene.apdata dict
-        obj.apfunc   = getfunc  # AP function used to build dataset (eg "getion")
-        obj.apname   = name     # Name of imported atom/ion/range (eg "Si")
+    rngind = props.range_index
+    try:
+        edit = data.rng.setrange(rngind, props.range_lower, props.range_upper)
+    except (rngload.ReadError, rngload.InvalidRngError) as err:
+        self.report({'ERROR'}, "Range %d not changed: %s" % (rngind, err))
+        return {'CANCELLED'}
+    # The first edit builds the m/c sort index: recount the cached size
+    apload.cache.resize(data)
+
+    if not len(edit.points):
+        self.report({'INFO'}, "Range %d moved, no points changed range" % rngind)
+        return {'FINISHED'}
+
+    _species_grids_update(data, edit)
+    rebuilt = []
+    with blend.object.batch():
+        for obj in context.scene.objects:
+            if obj.datatype == 'DATA' and obj.type == 'MESH' and obj.apid == apid and \
+                    _object_rerange(obj, data, edit):
+                rebuilt.append(obj.name)
+
+    self.report({'INFO'}, "Range %d moved: %d points changed range, rebuilt %s" % \
+            (rngind, len(edit.points), ", ".join(rebuilt) or "no objects"))
+    return {'FINISHED'}
 
-        blend.space.group_add_object(grp, obj)
+@bpy.app.handlers.persistent
+def lod_render_pre(scene):
+    """
+    Render handler: swap full resolution meshes into subsampled objects.
+    Full meshes are built from the cached dataset for each render and
+    removed again by lod_render_post, so they are never saved.
+    """
+    for obj in scene.objects:
+        if not _has_lod(obj) or obj.apview or obj.apcount == len(obj.data.vertices):
+            continue
+
+        if obj.apid not in scene.apdata:
+            print("Dataset %s not loaded, rendering %s subsampled" % (obj.apid, obj.name))
+            continue
+        pospath, rngpath = scene.apdata[obj.apid]
+        try:
+            data = apload.cache.get(pospath, rngpath, cache=True)
+        except apload.APReadError as e:
+            print("Error loading %s, rendering %s subsampled: %s" % (obj.apid, obj.name, e))
+            continue
+        verts = _species_points(data, obj.apfunc, obj.apname)
+        full = blend.object.mesh_add_from_arrays(obj.name+"_full", verts)
+
+        obj.apview = obj.data.name
+        _mesh_swap(obj, full, remove=False)
+
+@bpy.app.handlers.persistent
+def lod_render_post(scene):
+    """
+    Render handler (render finished or cancelled): swap viewport meshes
+    back after lod_render_pre, removing the full resolution meshes
+    """
+    for obj in scene.objects:
+        if obj.datatype == 'DATA' and obj.apview:
+            view = bpy.data.meshes.get(obj.apview)
+            if view is not None:
+                _mesh_swap(obj, view)
+            obj.apview = ""
+
+def species_remap(self, context):
+    """Switch single-mesh dataset to the selected plot type"""
+    props = context.scene.pos_panel_props
+    obj = context.object
+    data = _object_data(self, obj)
+    if data is None:
+        return {'CANCELLED'}
 
-    # Centre view on created group
-    blend.space.view_selected_group(groupname)
+    _species_remap(obj, data, props.plot_type)
+    self.report({'INFO'}, "Remapped %s to %s species" % \
+            (obj.name, _PLOT_TYPES[props.plot_type][0]))
+    return {'FINISHED'}
 
-    self.report({'INFO'}, "Loaded %s data into %s group" % (apid, groupname))
+def species_toggle(self, context):
+    """Hide or show species self.species of single-mesh dataset"""
+    obj = context.object
+    data = _object_data(self, obj)
+    if data is None:
+        return {'CANCELLED'}
+
+    hidden = _splitnames(obj.aphidden)
+    if self.species in hidden:
+        hidden.remove(self.species)
+    else:
+        hidden.append(self.species)
+    _species_hide(obj, data, _object_plot_type(obj), hidden)
     return {'FINISHED'}
 
 def load_posrng(self, context):
     """
-    Load APT pos/rng data to apdata scene variable
+    Load APT pos/rng data to apdata scene variable in a background job
     """
     props = context.scene.pos_panel_props
     pospath = props.pos_filename
     rngpath = props.rng_filename
+    dataname = ntpath.basename(pospath)
 
-    try:
-        data = apload.APData(pospath, rngpath)
+    trace = props.profile_trace
+    prof = profiling.Session("Load")
+
+    def work(job):
+        job.progress(0.0, "Loading %s" % dataname)
+        with prof:
+            return apload.cache.get(pospath, rngpath, cache=True)
+
+    def finish(data):
         print("Loaded rng data: ", data.rng.atomlist)
-        self.report({'INFO'}, "Loaded %s as POS, %s as RNG" % \
-                (props.pos_filename, props.rng_filename))
-    except apload.APReadError:
-        self.report({'ERROR'}, "Error reading pos or rng file. Double check file names.")
-        return {'CANCELLED'}
+        # Add reference to scene.apdata (data itself lives in apload.cache)
+        bpy.context.scene.apdata[dataname] = (pospath, rngpath)
+        return "Loaded %s as POS, %s as RNG (%s)" % \
+                (pospath, rngpath, _profile_report(prof, trace))
 
-    # Add reference to scene.apdata
-    dataname = ntpath.basename(props.pos_filename)
-    context.scene.apdata[dataname] = data
+    _submit(jobs.Job("Load "+dataname, work, finish))
     return {'FINISHED'}
+
+def job_monitor(self, context):
+    """
+    Finish background jobs that are done and show progress of the others.
+    Called on every timer event of the job monitor modal operator.
+
+    Returns {'FINISHED'} once no jobs are left, {'PASS_THROUGH'} otherwise.
+    """
+    for job in jobs.collect():
+        if job.cancelled:
+            self.report({'WARNING'}, "%s cancelled" % job.name)
+        elif job.error is not None:
+            self.report({'ERROR'}, "%s failed: %s" % (job.name, job.error))
+        else:
+            # bpy work of the job, on the main thread. A failing job must
+            # not stop the monitor finishing the others
+            try:
+                message = job.finish()
+            except Exception as e:
+                traceback.print_exc()
+                self.report({'ERROR'}, "%s failed: %s" % (job.name, e))
+                continue
+            if message:
+                self.report({'INFO'}, message)
+
+    active = jobs.active()
+    if context.area is not None:
+        if active:
+            status = ", ".join("%s: %s %d%%" % (job.name, job.message, 100*job.fraction)
+                               for job in active)
+            context.area.header_text_set("%s (Esc to cancel)" % status)
+        else:
+            context.area.header_text_set()
+    for area in context.screen.areas:
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+
+    if active:
+        return {'PASS_THROUGH'}
+    return {'FINISHED'}
+
+def job_cancel(self, context):
+    """Cancel all background jobs"""
+    jobs.cancel_all()
+    return {'FINISHED'}
+
+
+
+# === Helper functions ===
+def _profile_report(prof, trace):
+    """
+    Print stage table of profiling session prof, write it to Chrome trace
+    file trace (if set) and return its one line summary for self.report
+    """
+    print(prof.table())
+    if trace:
+        path = bpy.path.abspath(trace)
+        prof.write_trace(path)
+        print("Profile trace written to", path)
+    return prof.summary() or "no stages recorded"
+
+def _submit(job):
+    """Start background job and make sure the job monitor is running"""
+    jobs.submit(job)
+    bpy.ops.atomblend.job_monitor('INVOKE_DEFAULT')
+
+# Plot type -> (group name suffix, species list, species points function)
+# Vertex group and weight mix modifier of each range of single-mesh datasets
+_RANGE_GROUP = "ap_range %d"
+
+_PLOT_TYPES = collections.OrderedDict([
+        ('EA',  ("atomic",   "atomlist",  "getatom")),
+        ('ION', ("ionic",    "ionlist",   "getion")),
+        ('ISO', ("isotopic", "rangelist", "getrange")),
+        ])
+
+def _bake_single(self, context, apid, data, plot_type):
+    """
+    Bake all ranged points of data into a single mesh object.
+
+    Vertices are grouped by range. The range index of every vertex is
+    stored once in the integer vertex layer "ap_range", and every range's
+    vertices once in its own vertex group. One disabled vertex weight mix
+    modifier per range adds the range's group to the "ap_hidden" group,
+    which a mask modifier hides (the mask modifier reads vertex groups
+    only). Hiding species of the plot type then only toggles the modifiers
+    of their ranges, so switching plot type or hiding a species never
+    uploads points or vertex weights again.
+
+    Species are not coloured separately: all vertices duplicate the same
+    child object, which has a single material.
+    """
+    props = context.scene.pos_panel_props
+    rng = data.rng
+    groupname = apid+" species"
+
+    with profiling.Session("Bake") as prof:
+        # All ranged points, grouped by range
+        with profiling.span("points"):
+            inds = rng._order[rng._offsets[1]:]
+            verts = data.pos.xyz[inds]
+            rngids = rng._posmap[inds].astype(np.int32) - 1
+
+        grp = blend.space.group_add(groupname)
+
+        with blend.object.batch():
+            with profiling.span("mesh"):
+                obj = blend.object.object_add_from_verts(verts, apid)
+                blend.object.vertex_layer_int_set(obj, "ap_range", rngids)
+                _range_groups(obj, data)
+                blend.object.vertex_group_add(obj, "ap_hidden", [])
+                for rngind in rng.rangelist:
+                    blend.object.modifier_add_weight_mix(obj, _RANGE_GROUP % rngind, "ap_hidden",
+                                                         _RANGE_GROUP % rngind, show=False)
+                blend.object.modifier_add_mask(obj, "ap_hidden", invert=True)
+
+                obj.datatype = 'DATA'
+                obj.apid     = apid
+                obj.apname   = ""       # All species
+                _species_remap(obj, data, plot_type)
+
+                blend.space.group_add_object(grp, obj)
+
+        with profiling.span("view"):
+            blend.space.view_selected_group(groupname)
+
+    self.report({'INFO'}, "Loaded %s data into single mesh %s (%s)" % \
+            (apid, obj.name, _profile_report(prof, props.profile_trace)))
+    return {'FINISHED'}
+
+def _species_points(data, getfunc, name):
+    """
+    Return points of species name as got with getfunc (eg "getion"), name
+    being the object's apname
+    """
+    if getfunc == "getrange":
+        name = int(name)
+    return getattr(data.rng, getfunc)(name)
+
+def _has_lod(obj):
+    # Helper function: obj is a baked single-species dataset object whose
+    # points can be resampled from its dataset
+    return obj.datatype == 'DATA' and obj.type == 'MESH' and \
+            bool(obj.apname) and obj.apcount > 0
+
+def _mesh_swap(obj, mesh, remove=True):
+    # Helper function: replace obj's mesh with mesh, keeping its materials.
+    # The old mesh is deleted if remove and no longer used
+    old = obj.data
+    for ind, mat in enumerate(old.materials):
+        if ind < len(mesh.materials):
+            mesh.materials[ind] = mat
+        else:
+            mesh.materials.append(mat)
+    obj.data = mesh
+    if remove and old.users == 0:
+        bpy.data.meshes.remove(old)
+
+def _species_ranges(data, plot_type):
+    """
+    Return (names, ranges) of the species of plot_type: species names and
+    the range indices each species is made up of.
+    """
+    rng = data.rng
+    names = [str(item) for item in getattr(rng, _PLOT_TYPES[plot_type][1])]
+    if plot_type == 'EA':
+        ranges = [rng._atoms[name] for name in names]
+    elif plot_type == 'ION':
+        ranges = [rng._ions[name] for name in names]
+    else:
+        ranges = [[ind] for ind in rng.rangelist]
+    return names, ranges
+
+def _species_remap(obj, data, plot_type):
+    """
+    Map the vertices of single-mesh dataset obj to the species of plot_type.
+    Vertices are not touched, species are hidden by their ranges (see
+    _species_hide). All species are shown.
+    """
+    names = _species_ranges(data, plot_type)[0]
+
+    _species_hide(obj, data, _object_plot_type(obj), [])
+
+    obj.apfunc    = _PLOT_TYPES[plot_type][2]
+    obj.apspecies = "\n".join(names)
+
+def _species_hide(obj, data, plot_type, hidden):
+    """
+    Hide species names hidden of single-mesh dataset obj, show all others.
+
+    A range is hidden once all species it belongs to are hidden, by
+    enabling the modifier adding its vertex group to the masked "ap_hidden"
+    group. No vertex data is written.
+    """
+    for rngind, hide in enumerate(_hidden_ranges(data, plot_type, hidden)):
+        mod = obj.modifiers.get(_RANGE_GROUP % rngind)
+        if mod is not None and mod.show_viewport != hide:
+            blend.object.modifier_show(mod, bool(hide))
+    obj.aphidden = "\n".join(hidden)
+
+def _range_groups(obj, data):
+    # Helper function: fill vertex group of each range of single-mesh
+    # dataset obj with its vertices. Vertices are grouped by range, so every
+    # group is one contiguous block
+    offsets = data.rng._offsets - data.rng._offsets[1]
+    for rngind in data.rng.rangelist:
+        blend.object.vertex_group_add(obj, _RANGE_GROUP % rngind,
+                                      range(int(offsets[rngind+1]), int(offsets[rngind+2])))
+
+def _hidden_ranges(data, plot_type, hidden):
+    # Helper function: boolean mask of ranges all of whose species of
+    # plot_type are in hidden (range -> species lookup of plot_type)
+    shown = np.zeros(data.rng.nranges, dtype=bool)
+    if plot_type is None:
+        return shown
+    for name, ranges in zip(*_species_ranges(data, plot_type)):
+        if name not in hidden:
+            shown[np.asarray(ranges, dtype=np.intp)] = True
+    return ~shown
+
+def _object_plot_type(obj):
+    # Helper function: plot type obj was last mapped to (None if not yet)
+    for plot_type, (suffix, listfunc, getfunc) in _PLOT_TYPES.items():
+        if obj.apfunc == getfunc:
+            return plot_type
+    return None
+
+def _object_data(self, obj):
+    # Helper function: cached APData dataset obj was baked from
+    if obj.apid not in bpy.context.scene.apdata:
+        self.report({'ERROR'}, "Dataset %s is not loaded, load its POS/RNG files first" % obj.apid)
+        return None
+    pospath, rngpath = bpy.context.scene.apdata[obj.apid]
+    return _cached_data(self, pospath, rngpath)
+
+def _object_rerange(obj, data, edit):
+    """
+    Rebuild the mesh of baked object obj of data after range edit (see
+    RNG.setrange) if its points changed. Returns True if rebuilt.
+
+    Single-species objects keep their viewport subsampling, single-mesh
+    datasets are rebuilt from all ranged points keeping plot type and
+    hidden species.
+    """
+    if obj.apname:
+        species = {'getatom': edit.atoms, 'getion': edit.ions,
+                   'getrange': edit.ranges}.get(obj.apfunc, [])
+        if obj.apname not in species:
+            return False
+        verts = _species_points(data, obj.apfunc, obj.apname)
+        count = len(verts)
+        if len(obj.data.vertices) < obj.apcount:
+            # Viewport subsampled: keep the object's share of the budget
+            share = min(len(obj.data.vertices), count)
+            verts = verts[analysis.sampling.stratified(verts, share)]
+        obj.apcount = count
+        _mesh_swap(obj, blend.object.mesh_add_from_arrays(obj.name, verts))
+        return True
+
+    if not blend.object.has_vertex_layer_int(obj, "ap_range"):
+        return False
+    rng = data.rng
+    inds = rng._order[rng._offsets[1]:]
+    _mesh_swap(obj, blend.object.mesh_add_from_arrays(obj.name, data.pos.xyz[inds]))
+    blend.object.vertex_layer_int_set(obj, "ap_range", rng._posmap[inds].astype(np.int32) - 1)
+
+    # New mesh has no vertex weights: refill range groups, hidden species
+    # stay hidden by their (object) modifiers
+    _range_groups(obj, data)
+    return True
+
+# Guards the count grids kept in APData.grids, read by isosurface jobs and
+# updated in place by range edits
+_grids_lock = threading.Lock()
+
+def _species_counts(data, species):
+    """
+    Return generate_species() counts of atom species of dataset data,
+    computed once per dataset and kept up to date by range edits.
+
+    Counts and their grid origin are kept in data.grids, so they are freed
+    with the dataset when the dataset cache evicts it. Counts are computed
+    without holding _grids_lock; if the dataset's ranging changed meanwhile
+    (data.rng.edits) they may have missed an edit and are computed again.
+    """
+    key = ("species", species)
+    with _grids_lock:
+        entry = data.grids.get(key)
+        if entry is not None:
+            return entry[0]
+
+    origin = analysis.voxelisation.grid(data.pos.xyz)[0]
+    while True:
+        edits = data.rng.edits
+        counts = analysis.voxelisation.generate_species(data.pos.xyz, data.rng._posmap,
+                                                        [data.rng._atoms[species]],
+                                                        origin=origin)
+        with _grids_lock:
+            if data.rng.edits == edits and not edits % 2:
+                # Up to date with the ranging after edit number edits
+                data.grids[key] = (counts, origin, edits)
+                break
+    apload.cache.resize(data)
+    return counts
+
+def _species_grids_update(data, edit):
+    # Helper function: update kept count grids of data's atoms changed by
+    # range edit in place, only the points that changed range are binned.
+    # Grids computed after the edit (see _species_counts) already count it
+    xyz = None
+    with _grids_lock:
+        for key, (counts, origin, edits) in list(data.grids.items()):
+            kind, species = key
+            if kind != "species" or edits == data.rng.edits:
+                continue
+            if species in edit.atoms:
+                if xyz is None:
+                    xyz = data.pos.xyz[edit.points]
+                analysis.voxelisation.update_species(counts, xyz, edit.old, edit.new,
+                                                     [data.rng._atoms[species]], origin)
+            data.grids[key] = (counts, origin, data.rng.edits)
+
+def _splitnames(names):
+    # Helper function: newline separated species names -> list
+    return [name for name in names.split("\n") if name]
+
+def _cached_data(self, pospath, rngpath):
+    """
+    Return APData for pospath/rngpath from the process-wide dataset cache,
+    loading it on first use. Reports and returns None on read errors.
+    """
+    try:
+        return apload.cache.get(pospath, rngpath, cache=True)
+    except apload.APReadError:
+        self.report({'ERROR'}, "Error reading pos or rng file. Double check file names.")
+        return None
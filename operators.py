@@ -22,6 +22,8 @@ from bpy.types import Operator
 
 # Own pkgs
 from . import operatorexec as opexec
+from . import blend
+from . import jobs
 
 # TODO move this to a default settings module
 HALO_IMG_PATH = os.path.dirname(__file__)+"/atomtex.png"
@@ -29,7 +31,7 @@ HALO_IMG_PATH = os.path.dirname(__file__)+"/atomtex.png"
 
 # === Operator classes ===
 class VIEW3D_OT_pospath_button(Operator, ImportHelper):
-    """Select POS file from dialogue"""
+    """Select pos file (.pos, .epos, .apt, .ato, .csv, .xyz) from dialogue"""
     bl_idname = "atomblend.import_pospath"
     bl_label = "Select .pos file"
 
@@ -37,7 +39,7 @@ class VIEW3D_OT_pospath_button(Operator, ImportHelper):
     filename_ext = ".pos"
 
     filter_glob = StringProperty(
-            default="*.pos",
+            default="*.pos;*.epos;*.apt;*.ato;*.csv;*.xyz",
             options={'HIDDEN'},
             )
 
@@ -48,7 +50,7 @@ class VIEW3D_OT_pospath_button(Operator, ImportHelper):
         return {'FINISHED'}
 
 class VIEW3D_OT_rngpath_button(Operator, ImportHelper):
-    """Select RNG file from dialogue"""
+    """Select range file (.rng, .rrng, .env) from dialogue"""
     bl_idname = "atomblend.import_rngpath"
     bl_label = "Select .rng file"
 
@@ -56,7 +58,7 @@ class VIEW3D_OT_rngpath_button(Operator, ImportHelper):
     filename_ext = ".rng"
 
     filter_glob = StringProperty(
-            default="*.rng",
+            default="*.rng;*.rrng;*.env",
             options={'HIDDEN'},
             )
 
@@ -74,6 +76,56 @@ class VIEW3D_OT_load_posrng_button(Operator):
     def execute(self, context):
         return opexec.load_posrng(self, context)
 
+class VIEW3D_OT_job_monitor(Operator):
+    """Show progress of background jobs and add their results to the scene"""
+    bl_idname = "atomblend.job_monitor"
+    bl_label = "Background jobs"
+
+    _timer = None
+    _running = False # Only one monitor runs at a time
+
+    def invoke(self, context, event):
+        if VIEW3D_OT_job_monitor._running:
+            return {'CANCELLED'}
+        VIEW3D_OT_job_monitor._running = True
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.2, context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            jobs.cancel_all()
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        result = {'CANCELLED'}
+        try:
+            result = opexec.job_monitor(self, context)
+        finally:
+            # Monitor ends (also on errors): free timer for the next one
+            if 'PASS_THROUGH' not in result:
+                self.cancel(context)
+        return result
+
+    def cancel(self, context):
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+        VIEW3D_OT_job_monitor._running = False
+
+class VIEW3D_OT_job_cancel(Operator):
+    """Cancel all running background jobs"""
+    bl_idname = "atomblend.job_cancel"
+    bl_label = "Cancel"
+
+    @classmethod
+    def poll(cls, context):
+        return bool(jobs.active())
+
+    def execute(self, context):
+        return opexec.job_cancel(self, context)
+
 class VIEW3D_OT_bake_button(Operator):
     """Bake POS data to object"""
     bl_idname = "atomblend.bake_button"
@@ -88,6 +140,66 @@ class VIEW3D_OT_bake_button(Operator):
     def execute(self, context):
         return opexec.bake(self, context)
 
+class VIEW3D_OT_viewport_budget_apply(Operator):
+    """Resample baked objects to the viewport point budget"""
+    bl_idname = "atomblend.viewport_budget_apply"
+    bl_label = "Apply"
+
+    @classmethod
+    def poll(cls, context):
+        area = context.area.type
+        mode = context.mode
+        return (area == 'VIEW_3D') and (mode == 'OBJECT')
+
+    def execute(self, context):
+        return opexec.viewport_budget_apply(self, context)
+
+class VIEW3D_OT_range_edit(Operator):
+    """Move range to new bounds, re-ranging only the points and objects it changes"""
+    bl_idname = "atomblend.range_edit"
+    bl_label = "Apply range"
+
+    @classmethod
+    def poll(cls, context):
+        area = context.area.type
+        mode = context.mode
+        return (area == 'VIEW_3D') and (mode == 'OBJECT')
+
+    def execute(self, context):
+        return opexec.range_edit(self, context)
+
+class VIEW3D_OT_species_remap(Operator):
+    """Switch single-mesh dataset to the selected plot type without rebaking"""
+    bl_idname = "atomblend.species_remap"
+    bl_label = "Remap"
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return (obj is not None) and (obj.datatype == 'DATA') and \
+                blend.object.has_vertex_layer_int(obj, "ap_range")
+
+    def execute(self, context):
+        return opexec.species_remap(self, context)
+
+class VIEW3D_OT_species_toggle(Operator):
+    """Hide or show a species of single-mesh dataset"""
+    bl_idname = "atomblend.species_toggle"
+    bl_label = "Toggle species"
+
+    species = StringProperty(
+            description = "Name of species to hide or show"
+            )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return (obj is not None) and (obj.datatype == 'DATA') and \
+                blend.object.has_vertex_layer_int(obj, "ap_range")
+
+    def execute(self, context):
+        return opexec.species_toggle(self, context)
+
 class VIEW3D_OT_clear_button(Operator):
     """Clears all meshes in the scene"""
     bl_idname = "atomblend.clear_button"
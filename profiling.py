@@ -0,0 +1,202 @@
+# =============================================================================
+# (C) Copyright 2026
+# AtomBlend contributors
+# =============================================================================
+# File:   profiling.py
+# Date:   2026-10-17
+# Author: AtomBlend contributors
+#
+# Description:
+# Per-stage timing and memory instrumentation. Stages of loading, analysis
+# and mesh creation are wrapped in spans, which are recorded by the
+# profiling sessions active in the current thread (none: spans cost next to
+# nothing).
+# =============================================================================
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import contextlib
+import collections
+
+try:
+    import resource
+except ImportError:
+    resource = None # Not available on Windows, peak RSS is not recorded
+
+# Active sessions of each thread
+_local = threading.local()
+
+class Span():
+    """
+    Single recorded stage
+
+    name  -- Stage name (eg "voxelisation")
+    start -- Start time (time.perf_counter, s)
+    wall  -- Wall time (s)
+    cpu   -- CPU time of the process (s)
+    rss   -- Peak resident set size of the process at the end of the stage
+             (bytes, None if unknown)
+    counts -- Dict of element counts (eg points, triangles)
+    tid, depth -- Thread ID and nesting depth of the span
+    """
+    def __init__(self, name, counts):
+        self.name = name
+        self.counts = dict(counts)
+        self.start = time.perf_counter()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rss = None
+        self.tid = threading.get_ident()
+        self.depth = 0
+
+    def count(self, **counts):
+        """Record element counts of the stage, eg. span.count(points=n)"""
+        self.counts.update(counts)
+
+class _NullSpan():
+    # Span handed out when no session is active
+    def count(self, **counts):
+        pass
+
+_NULLSPAN = _NullSpan()
+
+class Session():
+    """
+    Profiling session, records spans run in threads it is active in
+
+    Usage::
+
+      with profiling.Session("Isosurface") as prof:
+          data = apload.APData(...)       # Stages of apread, analysis and
+          verts, faces = ...              # blend.object record spans
+          with profiling.span("my stage", points=n):
+              ...
+      print(prof.summary())
+      prof.write_trace("trace.json")    # chrome://tracing / Perfetto
+
+    A session may be entered again, also from another thread (eg. a
+    background job's worker and its finish step on the main thread).
+    """
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if not hasattr(_local, 'sessions'):
+            _local.sessions = []
+            _local.depth = 0
+        _local.sessions.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _local.sessions.remove(self)
+
+    def _add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def stages(self):
+        """
+        Return OrderedDict of stage name -> totals (calls, wall, cpu, rss,
+        counts) over all spans of that name, in order of first start
+        """
+        stages = collections.OrderedDict()
+        for span in sorted(self.spans, key=lambda s: s.start):
+            stage = stages.setdefault(span.name,
+                    {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'rss': None, 'counts': {},
+                     'depth': span.depth})
+            stage['calls'] += 1
+            stage['wall'] += span.wall
+            stage['cpu'] += span.cpu
+            if span.rss is not None:
+                stage['rss'] = max(stage['rss'] or 0, span.rss)
+            for key, n in span.counts.items():
+                stage['counts'][key] = stage['counts'].get(key, 0) + n
+        return stages
+
+    def summary(self):
+        """Return one line summary of the top-level stages' wall times"""
+        stages = self.stages()
+        text = ", ".join("%s %.2fs" % (name, stage['wall'])
+                         for name, stage in stages.items() if stage['depth'] == 0)
+        rss = [stage['rss'] for stage in stages.values() if stage['rss'] is not None]
+        if rss:
+            text += ", peak RSS %d MB" % (max(rss)//2**20)
+        return text
+
+    def table(self):
+        """Return multi-line table of all stages (nested stages indented)"""
+        lines = ["%s profile:" % self.name,
+                 "%-32s %6s %9s %9s %9s  %s" % ("stage", "calls", "wall (s)", "cpu (s)",
+                                                "RSS (MB)", "counts")]
+        for name, stage in self.stages().items():
+            rss = "-" if stage['rss'] is None else "%d" % (stage['rss']//2**20)
+            counts = ", ".join("%s %d" % item for item in stage['counts'].items())
+            lines.append("%-32s %6d %9.3f %9.3f %9s  %s" % \
+                    ("  "*stage['depth'] + name, stage['calls'], stage['wall'],
+                     stage['cpu'], rss, counts))
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """Write spans as Chrome trace event JSON file (chrome://tracing)"""
+        pid = os.getpid()
+        events = []
+        for span in self.spans:
+            args = dict(span.counts)
+            args['cpu (s)'] = span.cpu
+            if span.rss is not None:
+                args['peak RSS (MB)'] = span.rss/2**20
+            events.append({'name': span.name, 'cat': self.name, 'ph': 'X',
+                           'ts': span.start*1e6, 'dur': span.wall*1e6,
+                           'pid': pid, 'tid': span.tid, 'args': args})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+@contextlib.contextmanager
+def span(name, **counts):
+    """
+    Context manager recording stage name in the sessions active in this
+    thread. Keyword arguments and span.count() record element counts
+    """
+    sessions = getattr(_local, 'sessions', None)
+    if not sessions:
+        yield _NULLSPAN
+        return
+
+    sessions = list(sessions)
+    s = Span(name, counts)
+    s.depth = _local.depth
+    _local.depth += 1
+    cpu = time.process_time()
+    try:
+        yield s
+    finally:
+        _local.depth -= 1
+        s.wall = time.perf_counter() - s.start
+        s.cpu = time.process_time() - cpu
+        s.rss = peak_rss()
+        for session in sessions:
+            session._add(s)
+
+def profiled(name):
+    """Decorator recording each call of the function as span name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def peak_rss():
+    """Return peak resident set size of the process in bytes (None if unknown)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kB, macOS bytes
+    return rss if sys.platform == 'darwin' else rss*1024
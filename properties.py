@@ -14,13 +14,16 @@ import bpy
 
 from bpy.types import PropertyGroup
 from bpy.props import BoolProperty, StringProperty, EnumProperty, \
-                      FloatProperty, FloatVectorProperty
+                      FloatProperty, FloatVectorProperty, IntProperty
+
+from .apread import apload
 
 # TODO this should go in some global settings module
 DEFAULT_COLOR = (0, 0.144, 0.554)
 
 # === Global scene properties ===
-# Dictionary for APData objects
+# Dictionary of loaded AP data IDs -> (pos path, rng path)
+# APData objects themselves are held in apload.cache
 bpy.types.Scene.apdata = {}
 
 # === Custom AtomBlend object RNA properties ===
@@ -45,6 +48,16 @@ bpy.types.Object.apfunc  = StringProperty() # APData function used to build
 bpy.types.Object.apname  = StringProperty() # Human-readable name of imported
                                             # data (eg "Si")
 
+# Viewport level of detail (see viewport_budget), the object's mesh may hold
+# a subsample of the dataset's points
+bpy.types.Object.apcount = IntProperty()    # Number of points in full dataset
+bpy.types.Object.apview  = StringProperty() # Viewport mesh while rendering
+
+# Species state of single-mesh datasets (see bake_mode 'SINGLE'),
+# newline separated names
+bpy.types.Object.apspecies = StringProperty() # Species of current plot type
+bpy.types.Object.aphidden  = StringProperty() # Species currently hidden
+
 # Type of visualisation applied
 vtypes = [('NONE',  "None",  "None"),
           ('HALO',  "Halo",  "Halo"),
@@ -88,11 +101,91 @@ class VIEW3D_PT_pos_panel_props(PropertyGroup):
 
     apdata_list = EnumProperty(name="File", items=apdata_enum)
 
+    # Set memory budget of process-wide APData cache
+    def cache_budget_update(self, context):
+        apload.cache.budget = int(self.cache_budget*2**30)
+
+    cache_budget = FloatProperty(
+            name="Cache (GB)",
+            description="Memory budget for loaded datasets, least recently used datasets are unloaded first",
+            default=apload.CACHE_BUDGET/2**30,
+            min=0.0,
+            update=cache_budget_update,
+            )
+
     plot_options = [('EA',  "Atomic",   "Atomic"  ), \
                     ('ION', "Ionic",    "Ionic"   ), \
                     ('ISO', "Isotopic", "Isotopic")]
     plot_type = EnumProperty(name="Bake options", items=plot_options)
 
+    bake_modes = [('SPLIT',  "Object per species", "One mesh object per atom/ion/range"), \
+                  ('SINGLE', "Single mesh",        "All ranged points in one mesh, species stored per vertex")]
+    bake_mode = EnumProperty(name="Bake mode", items=bake_modes)
+
+    # Viewport level of detail
+    viewport_budget = IntProperty(
+            name="Viewport points",
+            description="Maximum number of points displayed over all baked objects, shared in proportion to object size (0: no limit). Renders always use all points",
+            default=0,
+            min=0,
+            )
+
+    # Range editing (see RNG.setrange), bounds are filled in from the
+    # selected dataset's range when the index changes
+    def range_index_update(self, context):
+        apid = self.apdata_list
+        if not apid or apid not in context.scene.apdata:
+            return
+        pospath, rngpath = context.scene.apdata[apid]
+        if (pospath, rngpath) not in apload.cache:
+            return
+        rng = apload.cache.get(pospath, rngpath, cache=True).rng
+        if self.range_index < rng.nranges:
+            self.range_lower, self.range_upper = rng._ranges[self.range_index]
+
+    range_index = IntProperty(
+            name="Range",
+            description="Index of the range to edit in the selected dataset",
+            default=0,
+            min=0,
+            update=range_index_update,
+            )
+    range_lower = FloatProperty(
+            name="From",
+            description="New lower mass-to-charge bound of the range (Da)",
+            default=0.0,
+            min=0.0,
+            precision=3,
+            )
+    range_upper = FloatProperty(
+            name="To",
+            description="New upper mass-to-charge bound of the range (Da)",
+            default=1.0,
+            min=0.0,
+            precision=3,
+            )
+
+    # Instrumentation
+    profile_trace = StringProperty(
+            name="Trace",
+            description="Chrome trace file (chrome://tracing) to write per-stage timings of load, bake and isosurface operators to (empty: none)",
+            default="",
+            subtype='FILE_PATH',
+            )
+
+    # Pointcloud wireframe material
+    ptcld_color = FloatVectorProperty(
+            name="Color",
+            subtype='COLOR',
+            default=DEFAULT_COLOR,
+            min=0.0, max=1.0,
+            )
+    ptcld_emit = FloatProperty(
+            name="Emit",
+            default=0.0,
+            min=0.0,
+            )
+
     # Boundbox padding
     boundbox_padding = FloatProperty(
             name="Padding",
@@ -111,3 +204,8 @@ class VIEW3D_PT_pos_panel_props(PropertyGroup):
 
     analysis_isosurf_rangefrom = FloatProperty(default=0,  min=0)
     analysis_isosurf_rangeto   = FloatProperty(default=1, min=0)
+    analysis_isosurf_species   = StringProperty(
+            name = "Atom",
+            description = "Atom to generate concentration isosurface of (empty: all points)",
+            default = ""
+        )